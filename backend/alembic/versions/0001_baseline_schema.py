@@ -0,0 +1,246 @@
+"""Baseline schema with indexes for the scheduling access paths
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('constraints',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('kind', sa.Enum('HARD', 'SOFT', name='constraintkind'), nullable=False),
+    sa.Column('expression_json', sa.JSON(), nullable=False),
+    sa.Column('weight', sa.Integer(), nullable=True),
+    sa.Column('source', sa.Enum('UI', 'GEMINI', 'IMPORT', name='constraintsource'), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('note', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_constraints_active'), 'constraints', ['active'], unique=False)
+    op.create_table('courses',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('code', sa.String(), nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('type', sa.Enum('MAJOR', 'MINOR', 'LAB', 'SEC', 'AEC', 'VAC', name='coursetype'), nullable=False),
+    sa.Column('credits', sa.Integer(), nullable=False),
+    sa.Column('hours_theory', sa.Integer(), nullable=True),
+    sa.Column('hours_practical', sa.Integer(), nullable=True),
+    sa.Column('has_lab', sa.Boolean(), nullable=True),
+    sa.Column('branch', sa.String(), nullable=False),
+    sa.Column('prerequisites', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_courses_code'), 'courses', ['code'], unique=True)
+    op.create_table('faculty',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('code', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('short_name', sa.String(), nullable=False),
+    sa.Column('department', sa.String(), nullable=False),
+    sa.Column('max_load', sa.Integer(), nullable=True),
+    sa.Column('expertise_tags', sa.JSON(), nullable=True),
+    sa.Column('availability_json', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_faculty_code'), 'faculty', ['code'], unique=True)
+    op.create_index(op.f('ix_faculty_short_name'), 'faculty', ['short_name'], unique=False)
+    op.create_table('rooms',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('code', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('type', sa.Enum('CLASS', 'LAB', 'SEMINAR', 'AUDITORIUM', name='roomtype'), nullable=False),
+    sa.Column('capacity', sa.Integer(), nullable=False),
+    sa.Column('features', sa.JSON(), nullable=True),
+    sa.Column('building', sa.String(), nullable=False),
+    sa.Column('floor', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_rooms_code'), 'rooms', ['code'], unique=True)
+    op.create_table('rulesets',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('program', sa.String(), nullable=False),
+    sa.Column('semester', sa.Integer(), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('students',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('enrollment_number', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('program', sa.String(), nullable=False),
+    sa.Column('semester', sa.Integer(), nullable=False),
+    sa.Column('branch', sa.String(), nullable=False),
+    sa.Column('credit_cap_min', sa.Integer(), nullable=True),
+    sa.Column('credit_cap_max', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_students_enrollment_number'), 'students', ['enrollment_number'], unique=True)
+    op.create_index('ix_students_program_semester', 'students', ['program', 'semester'], unique=False)
+    op.create_table('time_slots',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('day', sa.Enum('MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', 'SUNDAY', name='dayofweek'), nullable=False),
+    sa.Column('start_time', sa.String(), nullable=False),
+    sa.Column('end_time', sa.String(), nullable=False),
+    sa.Column('slot_index', sa.Integer(), nullable=False),
+    sa.Column('duration_minutes', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('enrollments',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('student_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('course_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('semester', sa.Integer(), nullable=False),
+    sa.Column('academic_year', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('student_id', 'course_id', 'academic_year', name='uq_enrollments_student_course_year')
+    )
+    op.create_index('ix_enrollments_course', 'enrollments', ['course_id'], unique=False)
+    op.create_index('ix_enrollments_student_semester', 'enrollments', ['student_id', 'semester'], unique=False)
+    op.create_table('faculty_leave',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('faculty_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('start_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('end_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('reason', sa.Text(), nullable=True),
+    sa.Column('approved', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['faculty_id'], ['faculty.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_faculty_leave_faculty_dates', 'faculty_leave', ['faculty_id', 'start_date', 'end_date'], unique=False)
+    op.create_table('ruleset_constraints',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('ruleset_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('constraint_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['constraint_id'], ['constraints.id'], ),
+    sa.ForeignKeyConstraint(['ruleset_id'], ['rulesets.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('ruleset_id', 'constraint_id', name='uq_ruleset_constraints_ruleset_constraint')
+    )
+    op.create_table('scenarios',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('program', sa.String(), nullable=False),
+    sa.Column('semester', sa.Integer(), nullable=False),
+    sa.Column('ruleset_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('status', sa.Enum('DRAFT', 'SOLVING', 'READY', 'FAILED', name='scenariostatus'), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=True),
+    sa.Column('objective_score', sa.Float(), nullable=True),
+    sa.Column('solve_metadata', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['ruleset_id'], ['rulesets.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_scenarios_program'), 'scenarios', ['program'], unique=False)
+    op.create_index(op.f('ix_scenarios_semester'), 'scenarios', ['semester'], unique=False)
+    op.create_table('timetables',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('scenario_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('objective_score', sa.Float(), nullable=False),
+    sa.Column('solve_time_seconds', sa.Integer(), nullable=False),
+    sa.Column('is_final', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['scenario_id'], ['scenarios.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_timetables_scenario_final', 'timetables', ['scenario_id', 'is_final'], unique=False)
+    op.create_table('assignments',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('timetable_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('course_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('slot_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('room_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('faculty_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('cohort_key', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ),
+    sa.ForeignKeyConstraint(['faculty_id'], ['faculty.id'], ),
+    sa.ForeignKeyConstraint(['room_id'], ['rooms.id'], ),
+    sa.ForeignKeyConstraint(['slot_id'], ['time_slots.id'], ),
+    sa.ForeignKeyConstraint(['timetable_id'], ['timetables.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('timetable_id', 'faculty_id', 'slot_id', name='uq_assignments_faculty_slot'),
+    sa.UniqueConstraint('timetable_id', 'room_id', 'slot_id', name='uq_assignments_room_slot')
+    )
+    op.create_index('ix_assignments_faculty_timetable', 'assignments', ['faculty_id', 'timetable_id'], unique=False)
+    op.create_index('ix_assignments_timetable_cohort', 'assignments', ['timetable_id', 'cohort_key'], unique=False)
+    op.create_index('ix_assignments_timetable_course', 'assignments', ['timetable_id', 'course_id'], unique=False)
+    op.create_table('simulations',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('base_scenario_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('modifications_json', sa.JSON(), nullable=False),
+    sa.Column('result_timetable_id', postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column('status', postgresql.ENUM('DRAFT', 'SOLVING', 'READY', 'FAILED', name='scenariostatus', create_type=False), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['base_scenario_id'], ['scenarios.id'], ),
+    sa.ForeignKeyConstraint(['result_timetable_id'], ['timetables.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('simulations')
+    op.drop_index('ix_assignments_timetable_course', table_name='assignments')
+    op.drop_index('ix_assignments_timetable_cohort', table_name='assignments')
+    op.drop_index('ix_assignments_faculty_timetable', table_name='assignments')
+    op.drop_table('assignments')
+    op.drop_index('ix_timetables_scenario_final', table_name='timetables')
+    op.drop_table('timetables')
+    op.drop_index(op.f('ix_scenarios_semester'), table_name='scenarios')
+    op.drop_index(op.f('ix_scenarios_program'), table_name='scenarios')
+    op.drop_table('scenarios')
+    op.drop_table('ruleset_constraints')
+    op.drop_index('ix_faculty_leave_faculty_dates', table_name='faculty_leave')
+    op.drop_table('faculty_leave')
+    op.drop_index('ix_enrollments_student_semester', table_name='enrollments')
+    op.drop_index('ix_enrollments_course', table_name='enrollments')
+    op.drop_table('enrollments')
+    op.drop_table('time_slots')
+    op.drop_index('ix_students_program_semester', table_name='students')
+    op.drop_index(op.f('ix_students_enrollment_number'), table_name='students')
+    op.drop_table('students')
+    op.drop_table('rulesets')
+    op.drop_index(op.f('ix_rooms_code'), table_name='rooms')
+    op.drop_table('rooms')
+    op.drop_index(op.f('ix_faculty_short_name'), table_name='faculty')
+    op.drop_index(op.f('ix_faculty_code'), table_name='faculty')
+    op.drop_table('faculty')
+    op.drop_index(op.f('ix_courses_code'), table_name='courses')
+    op.drop_table('courses')
+    op.drop_index(op.f('ix_constraints_active'), table_name='constraints')
+    op.drop_table('constraints')
+    for enum_name in ('scenariostatus', 'constraintsource', 'constraintkind', 'dayofweek', 'roomtype', 'coursetype'):
+        sa.Enum(name=enum_name).drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,37 @@
+"""Append-only audit log
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('audit_logs',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('action', sa.String(), nullable=False),
+    sa.Column('actor', sa.String(), nullable=True),
+    sa.Column('target_type', sa.String(), nullable=True),
+    sa.Column('target_id', sa.String(), nullable=True),
+    sa.Column('details', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_audit_logs_created_id', 'audit_logs', ['created_at', 'id'], unique=False)
+    op.create_index('ix_audit_logs_action_created', 'audit_logs', ['action', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_audit_logs_action_created', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_created_id', table_name='audit_logs')
+    op.drop_table('audit_logs')
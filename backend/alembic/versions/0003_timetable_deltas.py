@@ -0,0 +1,39 @@
+"""Stored diffs between timetables of a scenario
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 14:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('timetable_deltas',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('scenario_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('from_timetable_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('to_timetable_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('changes', sa.JSON(), nullable=False),
+    sa.Column('summary', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['from_timetable_id'], ['timetables.id'], ),
+    sa.ForeignKeyConstraint(['scenario_id'], ['scenarios.id'], ),
+    sa.ForeignKeyConstraint(['to_timetable_id'], ['timetables.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('from_timetable_id', 'to_timetable_id', name='uq_timetable_deltas_pair')
+    )
+    op.create_index('ix_timetable_deltas_to', 'timetable_deltas', ['to_timetable_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_timetable_deltas_to', table_name='timetable_deltas')
+    op.drop_table('timetable_deltas')
@@ -1,10 +1,14 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import students, faculty, admin, timetables, constraints
+from app.api.v1.endpoints import students, faculty, admin, timetables, constraints, simulations
 
 api_router = APIRouter()
+websocket_router = APIRouter()
 
 api_router.include_router(students.router, prefix="/students", tags=["students"])
 api_router.include_router(faculty.router, prefix="/faculty", tags=["faculty"])
 api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
 api_router.include_router(timetables.router, prefix="/timetables", tags=["timetables"])
-api_router.include_router(constraints.router, prefix="/constraints", tags=["constraints"])
\ No newline at end of file
+api_router.include_router(constraints.router, prefix="/constraints", tags=["constraints"])
+api_router.include_router(simulations.router, prefix="/simulations", tags=["simulations"])
+
+websocket_router.include_router(timetables.ws_router, prefix="/timetables")
\ No newline at end of file
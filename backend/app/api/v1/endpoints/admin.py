@@ -1,59 +1,186 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, UploadFile, File
+from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_db
+from app.core.compression import etag_matches
+from app.core.config import settings
+from app.core.database import get_db, pool_metrics
+from app.core.instrumentation import profile_path
+from app.models.scheduling import Timetable
+from app.schemas.export import BulkStudentExportRequest
+from app.schemas.notification import SendNotificationRequest
+from app.services.audit import CursorError, actor_of, audit, flush_audit_log, list_audit_logs
+from app.services.bulk_exports import get_bulk_export, run_bulk_export, start_bulk_export
+from app.services.dashboard import get_dashboard_stats as load_dashboard_stats
+from app.services.notifications import (
+    export_ready, get_notification_batch, get_notification_dispatcher, render_notification, start_batch,
+)
+from app.services.csv_import import IMPORT_SPECS, get_import_status, run_import, spool_upload, start_import
 
 router = APIRouter()
 
 
 @router.post("/upload/csv")
 async def upload_csv_data(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     data_type: str = "students",  # students, faculty, courses, rooms, enrollments
-    db: AsyncSession = Depends(get_db)
+    actor: Optional[str] = Depends(actor_of),
 ):
     """Upload and process CSV data"""
-    # TODO: Implement CSV processing
+    if data_type not in IMPORT_SPECS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported data type, expected one of: {', '.join(IMPORT_SPECS)}"
+        )
+
+    path = await spool_upload(file)
+    status = start_import(data_type, file.filename)
+    background_tasks.add_task(run_import, status, path)
+    audit("import.started", actor, "import", status.id, dataType=data_type, filename=file.filename)
     return {
         "message": f"CSV upload for {data_type} initiated",
         "filename": file.filename,
-        "status": "processing"
+        "status": "processing",
+        "importId": status.id
     }
 
 
-@router.get("/dashboard/stats")
-async def get_dashboard_stats(db: AsyncSession = Depends(get_db)):
-    """Get admin dashboard statistics"""
-    # TODO: Implement dashboard stats
+@router.get("/upload/csv/{import_id}")
+async def get_csv_import_status(import_id: str):
+    """Get progress and row errors of a CSV import"""
+    status = get_import_status(import_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return status
+
+
+@router.post("/exports/students")
+async def export_student_timetables(
+    request: BulkStudentExportRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    actor: Optional[str] = Depends(actor_of)
+):
+    """Write every student's timetable of a timetable's cohorts to files"""
+    if await db.get(Timetable, request.timetableId) is None:
+        raise HTTPException(status_code=404, detail="Timetable not found")
+
+    status = start_bulk_export(request.timetableId, list(dict.fromkeys(request.formats)), request.package)
+    background_tasks.add_task(run_bulk_export, status, request.weekStart, request.weeks)
+    audit("export.started", actor, "timetable", request.timetableId, exportId=status.id, formats=status.formats)
     return {
-        "students": 1250,
-        "faculty": 85,
-        "courses": 120,
-        "rooms": 45,
-        "activeScenarios": 3,
-        "lastGenerated": "2024-01-15T10:30:00Z"
+        "message": "Student timetable export initiated",
+        "status": status.status,
+        "exportId": status.id
     }
 
 
+@router.get("/exports/students/{export_id}")
+async def get_student_export_status(export_id: str):
+    """Get progress and output location of a bulk student export"""
+    status = get_bulk_export(export_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return status.as_dict()
+
+
+@router.get("/exports/students/{export_id}/download")
+async def download_student_export(export_id: str):
+    """Download the zip bundle of a completed bulk student export"""
+    status = get_bulk_export(export_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Export not found")
+    if status.zip_path is None:
+        raise HTTPException(status_code=409, detail="Export has no zip bundle ready")
+    return FileResponse(status.zip_path, media_type="application/zip", filename=f"{export_id}.zip")
+
+
+@router.get("/dashboard/stats")
+async def get_dashboard_stats(request: Request):
+    """Get admin dashboard statistics"""
+    etag, body = await load_dashboard_stats()
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={settings.DASHBOARD_STATS_TTL_SECONDS // 2}"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/database/pool")
+async def get_database_pool():
+    """Get connection pool utilization of this API process"""
+    return pool_metrics()
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """Get the collapsed stacks of a request profiled with the X-Profile header"""
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"profile-{profile_id}.folded")
+
+
 @router.get("/audit/logs")
 async def get_audit_logs(
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    action: Optional[str] = None,
+    actor: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
-    """Get audit logs with pagination"""
-    # TODO: Implement audit log retrieval
-    return {
-        "logs": [],
-        "total": 0,
-        "limit": limit,
-        "offset": offset
-    }
+    """Get audit logs, newest first; pass the returned nextCursor for the next page"""
+    if cursor is None:
+        # The first page shows actions recorded moments ago
+        await flush_audit_log()
+    try:
+        return await list_audit_logs(db, limit, cursor=cursor, action=action, actor=actor)
+    except CursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @router.post("/notifications/send")
 async def send_notification(
-    db: AsyncSession = Depends(get_db)
+    request: SendNotificationRequest,
+    db: AsyncSession = Depends(get_db),
+    actor: Optional[str] = Depends(actor_of)
 ):
-    """Send notifications to students/faculty"""
-    # TODO: Implement notification sending
-    raise HTTPException(status_code=501, detail="Notification system not yet implemented")
\ No newline at end of file
+    """Queue notifications to students/faculty"""
+    if not settings.SMTP_HOST:
+        raise HTTPException(status_code=503, detail="Email is not configured")
+    if not (request.exportId or request.timetableId or request.enrollmentNumbers
+            or request.facultyCodes or request.emails):
+        raise HTTPException(status_code=400, detail="No recipients given")
+    try:
+        render_notification(request.kind, "", request.details, request.message)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if request.exportId and not export_ready(request.exportId):
+        raise HTTPException(status_code=409, detail="Export is not complete")
+    if request.timetableId and await db.get(Timetable, request.timetableId) is None:
+        raise HTTPException(status_code=404, detail="Timetable not found")
+
+    batch = start_batch(request.kind)
+    get_notification_dispatcher().enqueue_batch(
+        batch, request.details, request.message,
+        export_id=request.exportId,
+        timetable_id=request.timetableId,
+        enrollment_numbers=request.enrollmentNumbers,
+        faculty_codes=request.facultyCodes,
+        emails=request.emails,
+    )
+    audit("notifications.queued", actor, "notificationBatch", batch.id, kind=request.kind)
+    return {
+        "message": f"{request.kind} notifications queued",
+        "status": batch.status,
+        "batchId": batch.id
+    }
+
+
+@router.get("/notifications/{batch_id}")
+async def get_notification_status(batch_id: str):
+    """Get delivery progress and dead letters of a notification batch"""
+    batch = get_notification_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Notification batch not found")
+    return batch.as_dict()
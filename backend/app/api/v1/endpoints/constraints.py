@@ -1,33 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_db
+from fastapi import APIRouter, HTTPException
+from app.core.config import settings
+from app.schemas.constraint import NaturalLanguageRequest, ValidateConstraintsRequest
+from app.services.translation import get_translation_service
+from app.solver.validation import ValidationOptions, validate_ruleset
 
 router = APIRouter()
 
 
 @router.post("/natural-language")
-async def process_natural_language_constraint(
-    db: AsyncSession = Depends(get_db)
-):
+async def process_natural_language_constraint(request: NaturalLanguageRequest):
     """Convert natural language to structured constraint using Gemini AI"""
-    # TODO: Implement Gemini integration
+    service = get_translation_service()
+    translations = await service.translate(request.all_sentences)
     return {
-        "input": "No classes on Friday after 2 PM",
-        "structuredConstraint": {
-            "type": "time_restriction",
-            "day": "Friday",
-            "afterTime": "14:00",
-            "restriction": "no_classes"
-        },
-        "confidence": 0.95,
-        "explanation": "This constraint prevents scheduling any classes on Friday after 2:00 PM"
+        "backend": service.backend.name,
+        "translations": [translation.as_dict() for translation in translations],
     }
 
 
 @router.get("/")
 async def list_constraints(
-    active_only: bool = True,
-    db: AsyncSession = Depends(get_db)
+    active_only: bool = True
 ):
     """List all constraints with filtering options"""
     # TODO: Implement constraint listing
@@ -38,9 +31,7 @@ async def list_constraints(
 
 
 @router.post("/")
-async def create_constraint(
-    db: AsyncSession = Depends(get_db)
-):
+async def create_constraint():
     """Create new constraint"""
     # TODO: Implement constraint creation
     return {
@@ -51,22 +42,28 @@ async def create_constraint(
 
 @router.post("/validate")
 async def validate_constraint(
-    db: AsyncSession = Depends(get_db)
+    request: ValidateConstraintsRequest
 ):
     """Validate constraint syntax and compatibility"""
-    # TODO: Implement constraint validation
-    return {
-        "valid": True,
-        "errors": [],
-        "warnings": [],
-        "conflicts": []
-    }
+    time_limit = request.timeLimitSeconds or settings.SOLVER_VALIDATION_TIME_LIMIT_SECONDS
+    options = ValidationOptions(
+        time_limit_seconds=time_limit,
+        conflict_time_limit_seconds=time_limit,
+        num_workers=settings.SOLVER_CPU_BUDGET,
+    )
+    proposed = [
+        {"id": f"proposed-{index}", **constraint.model_dump()}
+        for index, constraint in enumerate(request.constraints)
+    ]
+    try:
+        return await validate_ruleset(request.scenarioId, options, proposed)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Scenario not found")
 
 
 @router.post("/{constraint_id}/explain")
 async def explain_constraint_impact(
-    constraint_id: str,
-    db: AsyncSession = Depends(get_db)
+    constraint_id: str
 ):
     """Get AI explanation of constraint impact using Gemini"""
     # TODO: Implement constraint explanation
@@ -1,48 +1,170 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import timedelta
+from typing import List, Optional
+import uuid
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.serialization import FastJSONResponse
+from app.models.academic import Faculty, FacultyLeave, DayOfWeek
+from app.models.scheduling import Assignment, Timetable
+from app.repositories.assignments import fetch_final_assignment_rows
+from app.schemas.faculty import FacultyLeaveCreate
+from app.services.audit import actor_of, audit
+from app.services.leave_repairs import start_leave_repairs
+from app.services.substitutes import get_substitute_index, leave_recorded
+from app.services.workload import department_report, workload_summary
+from app.solver.jobs import get_job_runner
+from app.solver.problem import DAY_ORDER
+from app.solver.repair import RepairOptions
 
 router = APIRouter()
 
 
+@router.get("/workload")
+async def get_workload_report(
+    department: Optional[str] = None,
+    timetableId: Optional[uuid.UUID] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get workload of all faculty, by department, for one or all published timetables"""
+    if timetableId is not None and await db.get(Timetable, timetableId) is None:
+        raise HTTPException(status_code=404, detail="Timetable not found")
+    summary = await workload_summary(db, timetableId)
+    return FastJSONResponse(department_report(summary, department))
+
+
 @router.get("/{faculty_code}/schedule")
 async def get_faculty_schedule(
     faculty_code: str,
     db: AsyncSession = Depends(get_db)
 ):
     """Get faculty personal schedule and workload summary"""
-    # TODO: Implement faculty schedule retrieval
-    return {
+    result = await db.execute(select(Faculty).where(Faculty.code == faculty_code))
+    faculty = result.scalar_one_or_none()
+    if not faculty:
+        raise HTTPException(status_code=404, detail="Faculty not found")
+
+    assignments = await fetch_final_assignment_rows(db, faculty.id)
+    assignments.sort(key=lambda a: (DAY_ORDER[a.day], a.slot_index))
+
+    summary = await workload_summary(db)
+    workload = next((entry for entry in summary if entry["code"] == faculty.code), None)
+    return FastJSONResponse({
         "faculty": {
-            "code": faculty_code,
-            "name": "Dr. Sample Faculty",
-            "department": "Computer Science"
+            "code": faculty.code,
+            "name": faculty.name,
+            "department": faculty.department
         },
-        "schedule": [],
+        "schedule": [
+            {
+                "courseCode": a.course_code,
+                "courseTitle": a.course_title,
+                "roomNumber": a.room_code,
+                "cohortKey": a.cohort_key,
+                "timeSlot": {
+                    "day": a.day,
+                    "startTime": a.start_time,
+                    "endTime": a.end_time,
+                    "slotIndex": a.slot_index
+                }
+            }
+            for a in assignments
+        ],
         "workload": {
-            "totalHours": 18,
-            "maxHours": 20,
-            "freeSlots": 12,
-            "busySlots": 8
+            "totalHours": workload["totalHours"] if workload else 0,
+            "maxHours": faculty.max_load,
+            "headroomHours": workload["headroomHours"] if workload else faculty.max_load,
+            "freeSlots": workload["freeSlots"] if workload else 0,
+            "busySlots": workload["busySlots"] if workload else 0
         }
-    }
+    })
 
 
 @router.post("/{faculty_code}/leave")
 async def add_faculty_leave(
     faculty_code: str,
-    db: AsyncSession = Depends(get_db)
+    leave: FacultyLeaveCreate,
+    db: AsyncSession = Depends(get_db),
+    actor: Optional[str] = Depends(actor_of)
 ):
-    """Add faculty leave record"""
-    # TODO: Implement leave management
-    raise HTTPException(status_code=501, detail="Leave management not yet implemented")
+    """Add faculty leave record and queue repairs of the affected final timetables"""
+    result = await db.execute(select(Faculty).where(Faculty.code == faculty_code))
+    faculty = result.scalar_one_or_none()
+    if not faculty:
+        raise HTTPException(status_code=404, detail="Faculty not found")
+
+    record = FacultyLeave(
+        faculty_id=faculty.id,
+        start_date=leave.startDate,
+        end_date=leave.endDate,
+        reason=leave.reason,
+        approved=leave.approved,
+    )
+    db.add(record)
+    await db.commit()
+    if record.approved:
+        await leave_recorded(faculty.id, record.start_date, record.end_date)
+
+    audit(
+        "faculty.leave_recorded", actor, "faculty", faculty.code,
+        leaveId=record.id, startDate=record.start_date, endDate=record.end_date, approved=record.approved,
+    )
+
+    affected = []
+    repair_job_id = None
+    if leave.approved and leave.repair:
+        affected = (await db.execute(
+            select(Assignment.timetable_id)
+            .join(Timetable, Timetable.id == Assignment.timetable_id)
+            .where(Assignment.faculty_id == faculty.id, Timetable.is_final.is_(True))
+            .distinct()
+        )).scalars().all()
+    if affected:
+        start = leave.startDate.date()
+        options = RepairOptions(
+            time_limit_seconds=leave.timeLimitSeconds or settings.SOLVER_REPAIR_TIME_LIMIT_SECONDS,
+            num_workers=settings.SOLVER_CPU_BUDGET,
+        )
+        repair_job_id = start_leave_repairs(
+            faculty.code, record.id, list(affected), start - timedelta(days=start.weekday()), options,
+        )
+
+    return {
+        "id": str(record.id),
+        "facultyCode": faculty.code,
+        "startDate": record.start_date,
+        "endDate": record.end_date,
+        "approved": record.approved,
+        "repairJobId": repair_job_id,
+        "affectedTimetableIds": [str(timetable_id) for timetable_id in affected]
+    }
+
+
+@router.get("/repairs/{job_id}")
+async def get_leave_repair(job_id: str):
+    """Get progress and diffs of the repairs queued for a faculty leave"""
+    status = get_job_runner().status(job_id)
+    if not status or status.get("kind") != "leave_repair":
+        raise HTTPException(status_code=404, detail="Leave repair not found")
+    return status
 
 
 @router.get("/{faculty_code}/substitutes")
 async def get_substitute_suggestions(
     faculty_code: str,
+    day: Optional[List[DayOfWeek]] = Query(default=None),
+    limit: int = Query(default=5, ge=1, le=50),
     db: AsyncSession = Depends(get_db)
 ):
     """Get substitute faculty suggestions"""
-    # TODO: Implement substitute suggestions
-    return {"substitutes": []}
\ No newline at end of file
+    result = await db.execute(select(Faculty.id).where(Faculty.code == faculty_code))
+    faculty_id = result.scalar_one_or_none()
+    if not faculty_id:
+        raise HTTPException(status_code=404, detail="Faculty not found")
+
+    index = await get_substitute_index(db)
+    days = {d.value for d in day} if day else None
+    return {"substitutes": index.suggest(faculty_id, limit=limit, days=days)}
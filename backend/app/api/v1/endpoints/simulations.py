@@ -0,0 +1,72 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+import uuid
+
+from app.core.database import get_db
+from app.models.scheduling import Scenario, Simulation
+from app.schemas.simulation import RunSimulationsRequest
+from app.services.audit import actor_of, audit
+from app.services.simulations import start_simulations
+from app.solver.jobs import get_job_runner
+from app.solver.whatif import ModificationError
+
+router = APIRouter()
+
+
+@router.post("/")
+async def run_simulations(
+    request: RunSimulationsRequest,
+    db: AsyncSession = Depends(get_db),
+    actor: Optional[str] = Depends(actor_of)
+):
+    """Solve what-if variants of a scenario in parallel"""
+    scenario = await db.get(Scenario, request.scenarioId)
+    if not scenario:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+
+    try:
+        batch = await start_simulations(
+            db,
+            scenario.id,
+            [(variant.name, variant.modifications) for variant in request.variants],
+            request.timeLimitSeconds,
+        )
+    except ModificationError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    audit("simulation.started", actor, "scenario", scenario.id, variants=[variant.name for variant in request.variants])
+    return {
+        "message": "Simulations started",
+        "status": "queued",
+        **batch
+    }
+
+
+@router.get("/runs/{job_id}")
+async def get_simulation_run(job_id: str):
+    """Get progress and comparison table of a simulation batch"""
+    status = get_job_runner().status(job_id)
+    if not status or status.get("kind") != "simulation":
+        raise HTTPException(status_code=404, detail="Simulation run not found")
+    return status
+
+
+@router.get("/{simulation_id}")
+async def get_simulation(
+    simulation_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a single simulation variant"""
+    simulation = await db.get(Simulation, simulation_id)
+    if not simulation:
+        raise HTTPException(status_code=404, detail="Simulation not found")
+    return {
+        "id": str(simulation.id),
+        "name": simulation.name,
+        "baseScenarioId": str(simulation.base_scenario_id),
+        "modifications": simulation.modifications_json,
+        "status": simulation.status.value if simulation.status else None,
+        "resultTimetableId": str(simulation.result_timetable_id) if simulation.result_timetable_id else None,
+        "createdAt": simulation.created_at
+    }
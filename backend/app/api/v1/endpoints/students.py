@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from datetime import date
 from typing import Optional
+import gzip
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.models.academic import Student, Assignment, Course, Faculty, Room, TimeSlot
-from app.schemas.student import StudentTimetableResponse, TimetableCard
+from app.core.compression import entity_tags, etag_matches, negotiate
+from app.core.database import get_db, get_read_db
+from app.schemas.student import StudentTimetableResponse
+from app.services.exports import ExportSubject, export_timetable
+from app.services.student_timetables import current_student_timetable, get_student_timetable_payload
+from app.services.sync import get_sync_bundle
 
 router = APIRouter()
 
@@ -13,114 +18,88 @@ router = APIRouter()
 @router.get("/{enrollment_number}/timetable", response_model=StudentTimetableResponse)
 async def get_student_timetable(
     enrollment_number: str,
+    request: Request,
     week_offset: int = 0,
     db: AsyncSession = Depends(get_db)
 ):
     """Get student timetable by enrollment number"""
-    
-    # Find student
-    result = await db.execute(
-        select(Student).where(Student.enrollment_number == enrollment_number)
-    )
-    student = result.scalar_one_or_none()
-    
-    if not student:
+    payload = await get_student_timetable_payload(db, enrollment_number)
+    if payload is None:
         raise HTTPException(status_code=404, detail="Student not found")
-    
-    # For now, return mock data with proper structure
-    # In production, this would query actual assignments
-    mock_assignments = [
-        TimetableCard(
-            courseCode="CS101",
-            courseTitle="Computer Science Fundamentals",
-            roomNumber="A-101",
-            branch="CSE",
-            facultyShortForm="RK",
-            courseType="Major",
-            timeSlot={
-                "day": "Monday",
-                "startTime": "09:00",
-                "endTime": "10:00",
-                "slotIndex": 0
-            }
-        ),
-        TimetableCard(
-            courseCode="MA201",
-            courseTitle="Advanced Mathematics",
-            roomNumber="B-205",
-            branch="CSE",
-            facultyShortForm="SP",
-            courseType="Minor",
-            timeSlot={
-                "day": "Monday",
-                "startTime": "10:00",
-                "endTime": "11:00",
-                "slotIndex": 1
-            }
-        ),
-        TimetableCard(
-            courseCode="CS102L",
-            courseTitle="Programming Lab",
-            roomNumber="Lab-1",
-            branch="CSE",
-            facultyShortForm="AK",
-            courseType="Lab",
-            timeSlot={
-                "day": "Tuesday",
-                "startTime": "14:00",
-                "endTime": "16:00",
-                "slotIndex": 4
-            }
-        ),
-        TimetableCard(
-            courseCode="EN101",
-            courseTitle="Technical Communication",
-            roomNumber="C-301",
-            branch="CSE",
-            facultyShortForm="MJ",
-            courseType="SEC",
-            timeSlot={
-                "day": "Wednesday",
-                "startTime": "11:00",
-                "endTime": "12:00",
-                "slotIndex": 2
-            }
-        )
-    ]
-    
-    faculty_legend = {
-        "RK": "Dr. Rajesh Kumar",
-        "SP": "Prof. Sunita Patel", 
-        "AK": "Dr. Amit Khanna",
-        "MJ": "Ms. Meera Joshi"
-    }
-    
-    return StudentTimetableResponse(
-        student={
-            "name": student.name,
-            "program": student.program,
-            "semester": student.semester
-        },
-        assignments=mock_assignments,
-        facultyLegend=faculty_legend
+
+    etag, body = payload
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    # Stored gzipped, as compressing the same body per request cost ~40% of throughput
+    if negotiate(request.headers.get("accept-encoding", ""), ["gzip"]) == "gzip":
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body = gzip.decompress(body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/{enrollment_number}/sync")
+async def sync_student_timetable(
+    enrollment_number: str,
+    request: Request,
+    since: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a student's timetable as a compact bundle, or what changed since a version"""
+    tags = entity_tags(request.headers.get("if-none-match", ""))
+    known = since or (tags[0].strip('"') if tags else None) or None
+    result = await get_sync_bundle(db, enrollment_number, since=known)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    version, bundle = result
+    headers = {"Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    if version is not None:
+        # Weak, as the bundle is sent compressed or not
+        headers["ETag"] = f'W/"{version}"'
+    if bundle is None:
+        return Response(status_code=304, headers=headers)
+    # Bundles are stored gzipped; only the rare client without gzip costs a decompression
+    if negotiate(request.headers.get("accept-encoding", ""), ["gzip"]) == "gzip":
+        headers["Content-Encoding"] = "gzip"
+    else:
+        bundle = gzip.decompress(bundle)
+    return Response(content=bundle, media_type="application/json", headers=headers)
+
+
+async def _student_export(db: AsyncSession, enrollment_number: str, export_format: str, week_start=None):
+    current = await current_student_timetable(db, enrollment_number)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+    student, final, course_ids = current
+    if final is None:
+        raise HTTPException(status_code=404, detail="No published timetable")
+    # Rendering can take seconds; don't hold a pooled connection meanwhile
+    await db.close()
+    subject = ExportSubject(
+        kind="student",
+        title=f"{student.name} ({enrollment_number})",
+        course_ids=frozenset(course_ids),
+        value=enrollment_number,
     )
+    return await export_timetable(final[0], subject, export_format, f"timetable-{enrollment_number}", week_start=week_start)
 
 
 @router.get("/{enrollment_number}/export/pdf")
 async def export_student_timetable_pdf(
     enrollment_number: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Export student timetable as PDF"""
-    # TODO: Implement PDF generation
-    raise HTTPException(status_code=501, detail="PDF export not yet implemented")
+    return await _student_export(db, enrollment_number, "pdf")
 
 
 @router.get("/{enrollment_number}/export/ical")
 async def export_student_timetable_ical(
     enrollment_number: str,
-    db: AsyncSession = Depends(get_db)
+    weekStart: Optional[date] = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Export student timetable as iCal"""
-    # TODO: Implement iCal generation
-    raise HTTPException(status_code=501, detail="iCal export not yet implemented")
\ No newline at end of file
+    return await _student_export(db, enrollment_number, "ical", week_start=weekStart)
@@ -1,65 +1,351 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from collections import Counter
+from datetime import date
+from typing import Optional
+import asyncio
+import uuid
+
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.serialization import FastJSONResponse
+from app.models.academic import Faculty, Room
+from app.models.scheduling import Scenario, Timetable
+from app.repositories.assignments import fetch_assignment_rows, fetch_session_keys
+from app.schemas.timetable import GenerateTimetableRequest, RepairTimetableRequest
+from app.solver.engine import SolveOptions
+from app.solver.repair import RepairOptions, repair_timetable
+from app.services.exports import (
+    EXPORT_FORMATS, ExportSubject, export_timetable as export_timetable_artifact, invalidate_exports,
+)
+from app.services.audit import actor_of, audit
+from app.services.dashboard import invalidate_dashboard_stats
+from app.services.student_timetables import invalidate_timetable, publish_projection
+from app.services.sync import invalidate_sync, publish_sync_bundles
+from app.services.timetable_diff import DiffError, diff_payload, get_delta, reconstruct_timetable, store_delta
+from app.services.substitutes import timetables_published
+from app.solver.jobs import get_job_runner
 
 router = APIRouter()
+ws_router = APIRouter()
+
+# Idle connections get a keepalive so proxies don't time them out
+PROGRESS_KEEPALIVE_SECONDS = 15
 
 
 @router.post("/generate")
 async def generate_timetable(
-    background_tasks: BackgroundTasks,
-    db: AsyncSession = Depends(get_db)
+    request: GenerateTimetableRequest,
+    db: AsyncSession = Depends(get_db),
+    actor: Optional[str] = Depends(actor_of)
 ):
     """Generate optimized timetable using OR-Tools solver"""
-    # TODO: Implement timetable generation
+    scenario = await db.get(Scenario, request.scenarioId)
+    if not scenario:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+
+    options = SolveOptions(
+        time_limit_seconds=request.timeLimitSeconds,
+        num_workers=request.numWorkers,
+    )
+    job_id = await get_job_runner().submit(scenario.id, options)
+    audit("solve.requested", actor, "scenario", scenario.id, jobId=job_id, timeLimitSeconds=request.timeLimitSeconds)
+
     return {
         "message": "Timetable generation started",
-        "jobId": "job_123456",
+        "jobId": job_id,
         "status": "queued"
     }
 
 
 @router.get("/generation/{job_id}/status")
-async def get_generation_status(
-    job_id: str,
-    db: AsyncSession = Depends(get_db)
-):
+async def get_generation_status(job_id: str):
     """Get timetable generation progress"""
-    # TODO: Implement status tracking
-    return {
-        "jobId": job_id,
-        "status": "solving",
-        "progress": 65,
-        "stage": "LNS",
-        "estimatedTimeRemaining": 120
-    }
+    status = get_job_runner().status(job_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Generation job not found")
+    return status
+
+
+@router.get("/generation/{job_id}/events")
+async def stream_generation_events(job_id: str, request: Request):
+    """Stream timetable generation progress as Server-Sent Events"""
+    subscription = get_job_runner().subscribe(job_id)
+    if subscription is None:
+        raise HTTPException(status_code=404, detail="Generation job not found")
+
+    async def event_stream():
+        async with subscription:
+            while not await request.is_disconnected():
+                try:
+                    message = await subscription.get(timeout=PROGRESS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield f"data: {message}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@ws_router.websocket("/generation/{job_id}")
+async def generation_progress_socket(websocket: WebSocket, job_id: str):
+    """Push timetable generation progress over a WebSocket"""
+    subscription = get_job_runner().subscribe(job_id)
+    if subscription is None:
+        await websocket.close(code=4404, reason="Generation job not found")
+        return
+
+    await websocket.accept()
+    async with subscription:
+        try:
+            while True:
+                try:
+                    message = await subscription.get(timeout=PROGRESS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    await websocket.send_text('{"event": "keepalive"}')
+                    continue
+                if message is None:
+                    break
+                await websocket.send_text(message)
+            await websocket.close()
+        except WebSocketDisconnect:
+            pass
+
+
+@router.post("/generation/{job_id}/cancel")
+async def cancel_generation(job_id: str, actor: Optional[str] = Depends(actor_of)):
+    """Cancel a queued or running timetable generation"""
+    if not get_job_runner().cancel(job_id):
+        raise HTTPException(status_code=404, detail="Generation job not found")
+    audit("solve.cancelled", actor, "job", job_id)
+    return {"jobId": job_id, "message": "Cancellation requested"}
 
 
 @router.get("/{timetable_id}")
 async def get_timetable(
-    timetable_id: str,
+    timetable_id: uuid.UUID,
     db: AsyncSession = Depends(get_db)
 ):
     """Get specific timetable by ID"""
-    # TODO: Implement timetable retrieval
+    row = (await db.execute(
+        select(Timetable, Scenario.name)
+        .join(Scenario, Scenario.id == Timetable.scenario_id)
+        .where(Timetable.id == timetable_id)
+    )).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Timetable not found")
+    timetable, scenario_name = row
+
+    assignments = await fetch_assignment_rows(db, timetable_id)
+    # Returned as a response, so thousands of assignments skip jsonable_encoder
+    return FastJSONResponse({
+        "id": str(timetable.id),
+        "scenario": scenario_name,
+        "objectiveScore": timetable.objective_score,
+        "isFinal": timetable.is_final,
+        "assignments": [
+            {
+                "courseCode": a.course_code,
+                "courseTitle": a.course_title,
+                "roomNumber": a.room_code,
+                "facultyCode": a.faculty_code,
+                "cohortKey": a.cohort_key,
+                "timeSlot": {
+                    "day": a.day,
+                    "startTime": a.start_time,
+                    "endTime": a.end_time,
+                    "slotIndex": a.slot_index
+                }
+            }
+            for a in assignments
+        ],
+        "createdAt": timetable.created_at
+    })
+
+
+@router.post("/{timetable_id}/finalize")
+async def finalize_timetable(
+    timetable_id: uuid.UUID,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    actor: Optional[str] = Depends(actor_of)
+):
+    """Publish a timetable as the final version of its program's semester"""
+    timetable = await db.get(Timetable, timetable_id)
+    if not timetable:
+        raise HTTPException(status_code=404, detail="Timetable not found")
+
+    scenario = await db.get(Scenario, timetable.scenario_id)
+    # Students see one timetable per program and semester, whichever scenario published it
+    previous = (await db.execute(
+        select(Timetable)
+        .join(Scenario, Scenario.id == Timetable.scenario_id)
+        .where(
+            Scenario.program == scenario.program,
+            Scenario.semester == scenario.semester,
+            Timetable.is_final.is_(True),
+            Timetable.id != timetable.id,
+        )
+    )).scalars().all()
+    for other in previous:
+        other.is_final = False
+    # Diffs only exist between timetables of one scenario
+    same_scenario = [other.id for other in previous if other.scenario_id == timetable.scenario_id]
+
+    scenario.version = (scenario.version or 1) + 1
+    timetable.is_final = True
+    await db.commit()
+
+    # Students read from the projection, so rebuild it once per publication
+    for other in previous:
+        await invalidate_timetable(other.id)
+    await invalidate_timetable(timetable.id)
+    await invalidate_sync(scenario.program, scenario.semester)
+    await invalidate_dashboard_stats()
+    background_tasks.add_task(publish_projection, timetable.id)
+    background_tasks.add_task(publish_sync_bundles, timetable.id, same_scenario)
+    # Clients that hold the previous version only need what changed
+    for other_id in same_scenario:
+        background_tasks.add_task(store_delta, other_id, timetable.id)
+    # Nobody downloads a retired timetable routinely; render it again if someone does
+    for other in previous:
+        background_tasks.add_task(invalidate_exports, other.id)
+    await timetables_published(db, timetable.id, retired=[other.id for other in previous])
+    audit(
+        "timetable.published", actor, "timetable", timetable.id,
+        scenarioId=timetable.scenario_id, version=scenario.version, retired=[other.id for other in previous],
+    )
+
     return {
-        "id": timetable_id,
-        "scenario": "Fall 2024 CSE",
-        "objectiveScore": 0.85,
-        "assignments": [],
-        "createdAt": "2024-01-15T10:30:00Z"
+        "id": str(timetable.id),
+        "version": scenario.version,
+        "message": "Timetable finalized"
     }
 
 
-@router.post("/{timetable_id}/export")
+@router.post("/{timetable_id}/repair")
+async def repair_timetable_endpoint(
+    timetable_id: uuid.UUID,
+    request: RepairTimetableRequest,
+    db: AsyncSession = Depends(get_db),
+    actor: Optional[str] = Depends(actor_of)
+):
+    """Re-place only the sessions disrupted by room outages or faculty leave"""
+    if not await db.get(Timetable, timetable_id):
+        raise HTTPException(status_code=404, detail="Timetable not found")
+
+    codes = {outage.roomCode for outage in request.roomOutages}
+    rooms = {}
+    if codes:
+        rooms = dict((await db.execute(select(Room.code, Room.id).where(Room.code.in_(codes)))).all())
+    unknown = codes - rooms.keys()
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Room not found: {', '.join(sorted(unknown))}")
+
+    outages = {}
+    for outage in request.roomOutages:
+        days = None if outage.days is None else {day.value for day in outage.days}
+        previous = outages.get(rooms[outage.roomCode], set())
+        outages[rooms[outage.roomCode]] = None if days is None or previous is None else previous | days
+
+    options = RepairOptions(
+        time_limit_seconds=request.timeLimitSeconds or settings.SOLVER_REPAIR_TIME_LIMIT_SECONDS,
+        num_workers=settings.SOLVER_CPU_BUDGET,
+    )
+    # Waiting for cores and solving can take a while; don't hold a pooled connection meanwhile
+    await db.close()
+    result = await repair_timetable(timetable_id, options, week_start=request.weekStart, room_outages=outages)
+    audit(
+        "timetable.repaired", actor, "timetable", timetable_id,
+        repairedTimetableId=result.get("timetableId"), roomOutages=sorted(codes),
+    )
+    return result
+
+
+@router.get("/{timetable_id}/diff")
+async def get_timetable_diff(
+    timetable_id: uuid.UUID,
+    from_: uuid.UUID = Query(alias="from"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the changes from another timetable of the same scenario to this one"""
+    try:
+        delta = await get_delta(db, from_, timetable_id)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Timetable not found")
+    except DiffError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return FastJSONResponse(await diff_payload(db, delta))
+
+
+@router.get("/{timetable_id}/reconstruct")
+async def reconstruct_timetable_sessions(
+    timetable_id: uuid.UUID,
+    from_: uuid.UUID = Query(alias="from"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Rebuild this timetable's sessions from another one and the stored diffs, checked against its own"""
+    for requested in {from_, timetable_id}:
+        if await db.get(Timetable, requested) is None:
+            raise HTTPException(status_code=404, detail="Timetable not found")
+    try:
+        sessions = await reconstruct_timetable(db, from_, timetable_id)
+    except DiffError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    stored = await fetch_session_keys(db, timetable_id)
+    return FastJSONResponse({
+        "timetableId": str(timetable_id),
+        "baseTimetableId": str(from_),
+        "matchesStored": Counter(sessions) == Counter(stored),
+        "sessions": [
+            {
+                "courseId": str(session.course_id),
+                "cohortKey": session.cohort_key,
+                "slotId": str(session.slot_id),
+                "roomId": str(session.room_id),
+                "facultyId": str(session.faculty_id),
+            }
+            for session in sorted(sessions, key=str)
+        ],
+    })
+
+
+@router.api_route("/{timetable_id}/export", methods=["GET", "POST"])
 async def export_timetable(
-    timetable_id: str,
+    timetable_id: uuid.UUID,
     format: str = "pdf",  # pdf, excel, ical
+    faculty: Optional[str] = None,
+    cohort: Optional[str] = None,
+    weekStart: Optional[date] = None,
+    weeks: Optional[int] = Query(default=None, ge=1, le=52),
     db: AsyncSession = Depends(get_db)
 ):
     """Export timetable in specified format"""
-    # TODO: Implement export functionality
-    return {
-        "message": f"Export in {format} format initiated",
-        "downloadUrl": f"/downloads/{timetable_id}.{format}"
-    }
\ No newline at end of file
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    if not await db.get(Timetable, timetable_id):
+        raise HTTPException(status_code=404, detail="Timetable not found")
+
+    subject = ExportSubject(kind="all", title="Timetable")
+    if faculty:
+        member = (await db.execute(select(Faculty).where(Faculty.code == faculty))).scalar_one_or_none()
+        if not member:
+            raise HTTPException(status_code=404, detail="Faculty not found")
+        subject = ExportSubject(kind="faculty", title=member.name, faculty_id=member.id, value=member.code)
+    elif cohort:
+        subject = ExportSubject(kind="cohort", title=cohort, cohort_key=cohort, value=cohort)
+
+    filename = f"timetable-{timetable_id.hex[:8]}" + (f"-{subject.value}" if subject.value else "")
+    # Rendering can take seconds; don't hold a pooled connection meanwhile
+    await db.close()
+    return await export_timetable_artifact(
+        timetable_id, subject, format, filename, week_start=weekStart, weeks=weeks,
+    )
\ No newline at end of file
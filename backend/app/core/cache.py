@@ -0,0 +1,150 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import logging
+import time
+
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+from app.core.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+def _count_lookups(keys: List[str], values: List[Optional[bytes]]):
+    # Labelled by the key's first segment (timetable, student, workload, ...)
+    for key, value in zip(keys, values):
+        CACHE_REQUESTS.inc(keyspace=key.partition(":")[0], result="miss" if value is None else "hit")
+
+
+class MemoryCache:
+    """In-process LRU cache of bytes values with optional per-key TTL"""
+
+    def __init__(self, max_entries: int = 50000):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _lookup(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = self._lookup(key)
+        _count_lookups([key], [value])
+        return value
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        values = [self._lookup(key) for key in keys]
+        _count_lookups(keys, values)
+        return values
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def set_many(self, mapping: Dict[str, bytes], ttl: Optional[int] = None):
+        for key, value in mapping.items():
+            await self.set(key, value, ttl)
+
+    async def incr(self, key: str) -> int:
+        """Add one to an integer value, starting from 0, and return the result"""
+        value = int(self._lookup(key) or 0) + 1
+        await self.set(key, str(value).encode())
+        return value
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def delete_prefix(self, prefix: str) -> int:
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        await self.delete(*keys)
+        return len(keys)
+
+
+class RedisCache:
+    """Redis-backed cache sharing values between API workers"""
+
+    def __init__(self, client, batch_size: int = 1000):
+        self._client = client
+        self._batch_size = batch_size
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = await self._client.get(key)
+        _count_lookups([key], [value])
+        return value
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        values = await self._client.mget(keys)
+        _count_lookups(keys, values)
+        return values
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        await self._client.set(key, value, ex=ttl)
+
+    async def set_many(self, mapping: Dict[str, bytes], ttl: Optional[int] = None):
+        items = list(mapping.items())
+        for start in range(0, len(items), self._batch_size):
+            async with self._client.pipeline(transaction=False) as pipe:
+                for key, value in items[start:start + self._batch_size]:
+                    pipe.set(key, value, ex=ttl)
+                await pipe.execute()
+
+    async def incr(self, key: str) -> int:
+        """Add one to an integer value, starting from 0, and return the result; atomic across workers"""
+        return await self._client.incr(key)
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self._client.unlink(*keys)
+
+    async def delete_prefix(self, prefix: str) -> int:
+        deleted = 0
+        batch = []
+        async for key in self._client.scan_iter(match=f"{prefix}*", count=self._batch_size):
+            batch.append(key)
+            if len(batch) >= self._batch_size:
+                await self._client.unlink(*batch)
+                deleted += len(batch)
+                batch = []
+        if batch:
+            await self._client.unlink(*batch)
+            deleted += len(batch)
+        return deleted
+
+
+_cache = None
+
+
+async def get_cache():
+    """Shared cache: Redis when reachable, otherwise an in-process LRU"""
+    global _cache
+    if _cache is None:
+        _cache = await _connect()
+    return _cache
+
+
+async def _connect():
+    if settings.CACHE_BACKEND != "memory":
+        try:
+            client = aioredis.from_url(settings.REDIS_URL, socket_connect_timeout=1)
+            await client.ping()
+            return RedisCache(client)
+        except Exception as exc:
+            if settings.CACHE_BACKEND == "redis":
+                raise
+            logger.warning("Redis unavailable (%s), falling back to in-memory cache", exc)
+    return MemoryCache(settings.CACHE_MAX_ENTRIES)
+
@@ -0,0 +1,138 @@
+"""Content negotiation and compression of complete responses.
+
+Only responses sent in one body message are compressed, so streamed
+responses (server-sent events, files) pass through untouched, as do
+responses that already carry a Content-Encoding. Brotli is used when the
+`brotli` package is installed and the client prefers it.
+
+Entity tags are weak wherever a body may be sent in more than one
+encoding, and If-None-Match is compared weakly, as RFC 9110 asks.
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+import gzip
+import re
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/javascript", "application/xml", "text/", "image/svg+xml",
+)
+
+# Larger bodies are compressed off the event loop
+THREADED_MIN_BYTES = 256 * 1024
+
+
+def _encoders(gzip_level: int, brotli_quality: int) -> Dict[str, Callable[[bytes], bytes]]:
+    encoders = {"gzip": lambda body: gzip.compress(body, compresslevel=gzip_level, mtime=0)}
+    if brotli is not None:
+        encoders["br"] = lambda body: brotli.compress(body, quality=brotli_quality)
+    return encoders
+
+
+def negotiate(accept_encoding: str, available: List[str]) -> Optional[str]:
+    """The best of `available` (in order of preference) by the client's q-values, if any"""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+
+    best: Tuple[float, int, Optional[str]] = (0.0, 0, None)
+    for rank, coding in enumerate(available):
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if quality > 0 and (quality, -rank) > best[:2]:
+            best = (quality, -rank, coding)
+    return best[2]
+
+
+_ENTITY_TAG = re.compile(r'(?:W/)?("[^"]*")')
+
+
+def entity_tags(if_none_match: str) -> List[str]:
+    """The opaque tags an If-None-Match header lists, without their W/ prefix"""
+    return _ENTITY_TAG.findall(if_none_match)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches `etag` by weak comparison"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in entity_tags(if_none_match)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders = _encoders(gzip_level, brotli_quality)
+        # Brotli first: smaller at a similar speed for JSON
+        self.preference = sorted(self.encoders, key=lambda coding: coding != "br")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.preference)
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            passthrough = True
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            encode = self.encoders[coding]
+            if len(body) >= THREADED_MIN_BYTES:
+                body = await run_in_threadpool(encode, body)
+            else:
+                body = encode(body)
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                # A strong tag names one byte sequence, and this is no longer it
+                headers["ETag"] = "W/" + etag
+            headers["Content-Encoding"] = coding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,23 +1,105 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from typing import Dict
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from app.core.config import settings
 
-# Convert PostgreSQL URL to async version
-database_url = settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
 
-engine = create_async_engine(
-    database_url,
-    echo=settings.DEBUG,
-    pool_pre_ping=True,
-    pool_recycle=300,
+def _async_url(url: str) -> str:
+    # Convert PostgreSQL URL to async version
+    return url.replace("postgresql://", "postgresql+asyncpg://")
+
+
+database_url = _async_url(settings.DATABASE_URL)
+
+
+class PoolStats:
+    """Checkout counters of one engine's pool, kept by pool events"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.peak_checked_out = 0
+        self.timeouts = 0
+        self.held_seconds_total = 0.0
+        self.held_seconds_max = 0.0
+        self._checked_out = 0
+
+    def watch(self, engine: AsyncEngine):
+        pool = engine.sync_engine.pool
+
+        @event.listens_for(pool, "checkout")
+        def _checkout(dbapi_connection, record, proxy):
+            record.info["checked_out_at"] = time.perf_counter()
+            self.checkouts += 1
+            self._checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self._checked_out)
+
+        @event.listens_for(pool, "checkin")
+        def _checkin(dbapi_connection, record):
+            started = record.info.pop("checked_out_at", None)
+            if started is None:
+                return
+            self._checked_out -= 1
+            held = time.perf_counter() - started
+            self.held_seconds_total += held
+            self.held_seconds_max = max(self.held_seconds_max, held)
+
+
+def _create_engine(url: str, application_name: str) -> AsyncEngine:
+    options = {
+        "echo": settings.DATABASE_ECHO,
+        "pool_pre_ping": True,
+        "pool_recycle": settings.DATABASE_POOL_RECYCLE_SECONDS,
+    }
+    backend = make_url(url).get_backend_name()
+    if backend != "sqlite":
+        options.update(
+            pool_size=settings.DATABASE_POOL_SIZE,
+            max_overflow=settings.DATABASE_MAX_OVERFLOW,
+            pool_timeout=settings.DATABASE_POOL_TIMEOUT_SECONDS,
+            # Reuse the most recently returned connection, so surplus ones go idle and get recycled
+            pool_use_lifo=True,
+        )
+    if backend == "postgresql" and make_url(url).get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            # asyncpg's own cache, and SQLAlchemy's cache of prepared statements per connection;
+            # set DATABASE_STATEMENT_CACHE_SIZE=0 behind pgbouncer in transaction mode
+            "statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+            "server_settings": {"application_name": application_name},
+        }
+    return create_async_engine(url, **options)
+
+
+engine = _create_engine(database_url, "kairo-api")
+# Reads that tolerate replication lag; the primary when no replica is configured
+read_engine = (
+    _create_engine(_async_url(settings.DATABASE_READ_URL), "kairo-api-read")
+    if settings.DATABASE_READ_URL else engine
 )
 
+pool_stats: Dict[str, PoolStats] = {"primary": PoolStats()}
+pool_stats["primary"].watch(engine)
+if read_engine is not engine:
+    pool_stats["replica"] = PoolStats()
+    pool_stats["replica"].watch(read_engine)
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
     expire_on_commit=False
 )
 
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -25,5 +107,49 @@ async def get_db():
     async with AsyncSessionLocal() as session:
         try:
             yield session
+        except PoolTimeoutError:
+            pool_stats["primary"].timeouts += 1
+            raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+
+async def get_read_db():
+    """Session on the read replica, for GET endpoints that neither write nor cache what they read"""
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        except PoolTimeoutError:
+            pool_stats["replica" if read_engine is not engine else "primary"].timeouts += 1
+            raise
+        finally:
+            await session.close()
+
+
+def _pool_status(engine: AsyncEngine, stats: PoolStats) -> dict:
+    pool = engine.sync_engine.pool
+    status = {
+        "checkouts": stats.checkouts,
+        "peakCheckedOut": stats.peak_checked_out,
+        "timeouts": stats.timeouts,
+        "heldSecondsTotal": round(stats.held_seconds_total, 3),
+        "heldSecondsMax": round(stats.held_seconds_max, 3),
+    }
+    # SQLite's pools have no size or overflow
+    if hasattr(pool, "size") and hasattr(pool, "overflow"):
+        capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+        status.update(
+            size=pool.size(),
+            checkedOut=pool.checkedout(),
+            checkedIn=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            capacity=capacity,
+            utilization=round(pool.checkedout() / capacity, 3) if capacity else None,
+        )
+    return status
+
+
+def pool_metrics() -> dict:
+    """Utilization and checkout counters of every engine's connection pool"""
+    engines: Dict[str, AsyncEngine] = {"primary": engine, "replica": read_engine}
+    return {name: _pool_status(engines[name], stats) for name, stats in pool_stats.items()}
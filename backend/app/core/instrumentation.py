@@ -0,0 +1,202 @@
+"""Per-request timing, database statement counts and an opt-in profiler.
+
+`InstrumentationMiddleware` times every HTTP request by route template and
+attributes database statements to the request that issued them through a
+context variable set for its duration. Sending the `X-Profile` header with
+the configured token samples the event loop thread while the request runs
+and stores the stacks in collapsed format (for flamegraph.pl or
+speedscope); the response names the profile in `X-Profile-Id`.
+"""
+from collections import Counter as StackCounter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.routing import Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.database import pool_metrics
+from app.core.metrics import (
+    DB_QUERIES, DB_QUERY_SECONDS, HTTP_REQUEST_DB_QUERIES, HTTP_REQUEST_DB_SECONDS, HTTP_REQUEST_SECONDS,
+    Gauge, register,
+)
+
+logger = logging.getLogger(__name__)
+
+# [statements, seconds] of the request being handled, if any
+_request_db: ContextVar[Optional[list]] = ContextVar("kairo_request_db", default=None)
+
+
+def instrument_engine(engine: AsyncEngine, name: str):
+    """Count statements and their time, globally and for the current request"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("kairo_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["kairo_started"].pop()
+        DB_QUERIES.inc(engine=name)
+        DB_QUERY_SECONDS.inc(elapsed, engine=name)
+        current = _request_db.get()
+        if current is not None:
+            current[0] += 1
+            current[1] += elapsed
+
+
+def _pool_connections() -> Dict[tuple, float]:
+    values = {}
+    for engine, status in pool_metrics().items():
+        for state, field in (("checked_out", "checkedOut"), ("checked_in", "checkedIn"), ("overflow", "overflow")):
+            if field in status:
+                values[(engine, state)] = status[field]
+    return values
+
+
+register(Gauge(
+    "kairo_db_pool_connections", "Pooled database connections by state", ("engine", "state"), _pool_connections,
+))
+register(Gauge(
+    "kairo_db_pool_timeouts_total", "Requests that waited out the pool timeout", ("engine",),
+    lambda: {(engine,): status["timeouts"] for engine, status in pool_metrics().items()},
+    kind="counter",
+))
+
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval from a helper thread"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: StackCounter = StackCounter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="kairo-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> str:
+        """Collapsed stacks, one `frame;frame;... samples` line each"""
+        self._stop.set()
+        self._thread.join()
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def profile_dir() -> Path:
+    path = Path(settings.PROFILE_DIR or os.path.join(tempfile.gettempdir(), "kairo-profiles"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def profile_path(profile_id: str) -> Optional[Path]:
+    """Stored profile by id, or None for an unknown or malformed id"""
+    try:
+        name = uuid.UUID(hex=profile_id).hex
+    except ValueError:
+        return None
+    path = profile_dir() / f"{name}.folded"
+    return path if path.exists() else None
+
+
+class InstrumentationMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._templates: Optional[Dict[object, str]] = None
+
+    def _route(self, scope: Scope) -> str:
+        # Templates rather than paths, so labels don't grow with ids in URLs
+        if self._templates is None:
+            self._templates = {
+                route.endpoint: route.path for route in scope["app"].routes if isinstance(route, Route)
+            }
+        return self._templates.get(scope.get("endpoint"), "unmatched")
+
+    def _profiler(self, scope: Scope) -> Optional[SamplingProfiler]:
+        token = settings.PROFILER_TOKEN
+        if not token or Headers(scope=scope).get("x-profile") != token:
+            return None
+        profiler = SamplingProfiler(threading.get_ident(), settings.PROFILER_INTERVAL_SECONDS)
+        profiler.start()
+        return profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        db = [0, 0.0]
+        reset = _request_db.set(db)
+        profiler = self._profiler(scope)
+        profile_id = uuid.uuid4().hex if profiler else None
+        status = 500
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            elapsed = time.perf_counter() - started
+            route = self._route(scope)
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.observe(elapsed, method=method, route=route, status=status)
+            HTTP_REQUEST_DB_QUERIES.observe(db[0], method=method, route=route)
+            HTTP_REQUEST_DB_SECONDS.observe(db[1], method=method, route=route)
+
+        async def send_instrumented(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                elapsed = (time.perf_counter() - started) * 1000
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={db[1] * 1000:.1f};desc="{db[0]} queries", app;dur={elapsed:.1f}',
+                )
+                if profile_id:
+                    headers.append("X-Profile-Id", profile_id)
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                # The response is complete; background tasks run after this and
+                # their time and queries are not the request's
+                record()
+
+        try:
+            await self.app(scope, receive, send_instrumented)
+        finally:
+            # Reached first only when the response was never completed, e.g. on errors
+            record()
+            _request_db.reset(reset)
+            if profiler is not None:
+                stacks = profiler.stop()
+                (profile_dir() / f"{profile_id}.folded").write_text(stacks)
+                logger.info(
+                    "Profiled %s %s in %.3fs as %s",
+                    scope["method"], scope["path"], time.perf_counter() - started, profile_id,
+                )
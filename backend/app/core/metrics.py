@@ -0,0 +1,180 @@
+"""Process-local metrics in the Prometheus text exposition format.
+
+A small registry rather than a client library: counters and histograms
+keyed by label values, updated in O(1) (histograms walk their buckets) and
+rendered on scrape. Values are per process; scrape every API worker.
+"""
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+import threading
+import time
+
+# Seconds, from a cache hit to a long export
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+SOLVER_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 900)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    @abstractmethod
+    def samples(self) -> Iterable[str]:
+        """Exposition lines for every label set"""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # Per label set: non-cumulative bucket counts (last one is +Inf), sum
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, key)} {_number(round(total, 6))}"
+            yield f"{self.name}_count{_labels(self.label_names, key)} {cumulative}"
+
+
+class Gauge(_Metric):
+    """Values read from a callback at scrape time, as {label values: value}.
+
+    `kind="counter"` exposes totals that are kept elsewhere.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str],
+        read: Callable[[], Dict[Tuple[str, ...], float]],
+        kind: str = "gauge",
+    ):
+        super().__init__(name, documentation, labels)
+        self._read = read
+        self.kind = kind
+
+    def samples(self):
+        for key, value in sorted(self._read().items()):
+            yield f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+
+
+REGISTRY: List[_Metric] = []
+
+
+def register(metric: _Metric) -> _Metric:
+    REGISTRY.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUEST_SECONDS = register(Histogram(
+    "kairo_http_request_duration_seconds", "Time to complete a request, by route template",
+    ("method", "route", "status"),
+))
+HTTP_REQUEST_DB_QUERIES = register(Histogram(
+    "kairo_http_request_db_queries", "Database statements executed per request",
+    ("method", "route"), buckets=COUNT_BUCKETS,
+))
+HTTP_REQUEST_DB_SECONDS = register(Histogram(
+    "kairo_http_request_db_seconds", "Time spent in database statements per request",
+    ("method", "route"),
+))
+DB_QUERIES = register(Counter(
+    "kairo_db_queries_total", "Database statements executed, in and outside requests", ("engine",),
+))
+DB_QUERY_SECONDS = register(Counter(
+    "kairo_db_query_seconds_total", "Time spent in database statements", ("engine",),
+))
+CACHE_REQUESTS = register(Counter(
+    "kairo_cache_requests_total", "Cache lookups by key space and result", ("keyspace", "result"),
+))
+SOLVER_PHASE_SECONDS = register(Histogram(
+    "kairo_solver_phase_seconds", "Duration of each phase of a solver job", ("phase",), buckets=SOLVER_BUCKETS,
+))
+SOLVER_JOBS = register(Counter(
+    "kairo_solver_jobs_total", "Finished solver jobs by solver status", ("status",),
+))
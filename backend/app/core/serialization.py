@@ -0,0 +1,78 @@
+"""JSON encoding of API responses.
+
+orjson is used when installed; otherwise responses are encoded the way
+FastAPI does by default, with `jsonable_encoder` and the json module.
+"""
+from typing import Any, Callable, Dict
+import json
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+
+def _stdlib_dumps(content: Any) -> bytes:
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+    ).encode()
+
+
+def _orjson_default(value: Any) -> Any:
+    # orjson handles UUIDs, datetimes, enums and dataclasses itself
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return jsonable_encoder(value)
+
+
+def _orjson_dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+JSON_BACKENDS: Dict[str, Callable[[Any], bytes]] = {"stdlib": _stdlib_dumps}
+if orjson is not None:
+    JSON_BACKENDS["orjson"] = _orjson_dumps
+
+_dumps: Callable[[Any], bytes] = _stdlib_dumps
+
+
+def use_json_backend(name: str):
+    """Switch the encoder used by `dumps`: "auto", "orjson" or "stdlib" """
+    global _dumps
+    if name == "auto":
+        name = "orjson" if orjson is not None else "stdlib"
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"JSON backend {name!r} is not available")
+    _dumps = JSON_BACKENDS[name]
+
+
+use_json_backend(settings.JSON_BACKEND)
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON of plain data, pydantic models, UUIDs, datetimes and enums"""
+    return _dumps(content)
+
+
+def dump_model(model: BaseModel) -> bytes:
+    """JSON of a pydantic model, written by pydantic-core without building a dict first"""
+    return model.__pydantic_serializer__.to_json(model)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with `dumps`.
+
+    Endpoints that return one directly also skip FastAPI's
+    `jsonable_encoder` pass over the content.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return dump_model(content)
+        return dumps(content)
@@ -1,35 +1,46 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
 import os
 from contextlib import asynccontextmanager
 
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
-from app.core.database import engine, Base
-from app.api.v1.api import api_router
+from app.core.database import PoolTimeoutError, engine, read_engine
+from app.core.instrumentation import InstrumentationMiddleware, instrument_engine
+from app.core.metrics import render_metrics
+from app.core.serialization import FastJSONResponse
+from app.api.v1.api import api_router, websocket_router
+from app.services.audit import shutdown_audit_log
+from app.services.exports import shutdown_export_pool
+from app.services.notifications import shutdown_notifications
+from app.solver.jobs import shutdown_job_runner
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("Starting Kairo NEP Timetable System...")
-    
-    # Create database tables
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Schema is managed by Alembic: run `alembic upgrade head` before starting
     
     yield
     
     # Shutdown
     print("Shutting down Kairo...")
+    await shutdown_job_runner()
+    await shutdown_notifications()
+    # Last, so actions recorded while shutting down are still written
+    await shutdown_audit_log()
+    shutdown_export_pool()
 
 
 app = FastAPI(
     title="Kairo NEP Timetable System",
     description="AI-powered timetable management for educational institutions",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware
@@ -40,9 +51,34 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_BYTES,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+# Outermost, so latency includes compression
+app.add_middleware(InstrumentationMiddleware)
+
+instrument_engine(engine, "primary")
+if read_engine is not engine:
+    instrument_engine(read_engine, "replica")
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_exhausted(request: Request, exc: PoolTimeoutError):
+    # Every pooled connection stayed busy for DATABASE_POOL_TIMEOUT_SECONDS
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database busy, retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
 
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
+# WebSocket routes live under /ws, which nginx proxies with connection upgrade
+app.include_router(websocket_router, prefix="/ws/v1")
 
 
 @app.get("/")
@@ -50,6 +86,11 @@ async def root():
     return {"message": "Kairo NEP Timetable System API", "version": "1.0.0"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "kairo-api"}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, ForeignKey, Enum, JSON
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, ForeignKey, Enum, JSON, Index, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -50,6 +50,10 @@ class Student(Base):
     # Relationships
     enrollments = relationship("Enrollment", back_populates="student")
 
+    __table_args__ = (
+        Index("ix_students_program_semester", "program", "semester"),
+    )
+
 
 class Faculty(Base):
     __tablename__ = "faculty"
@@ -138,6 +142,12 @@ class Enrollment(Base):
     student = relationship("Student", back_populates="enrollments")
     course = relationship("Course", back_populates="enrollments")
 
+    __table_args__ = (
+        UniqueConstraint("student_id", "course_id", "academic_year", name="uq_enrollments_student_course_year"),
+        Index("ix_enrollments_student_semester", "student_id", "semester"),
+        Index("ix_enrollments_course", "course_id"),
+    )
+
 
 class FacultyLeave(Base):
     __tablename__ = "faculty_leave"
@@ -151,4 +161,8 @@ class FacultyLeave(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
-    faculty = relationship("Faculty", back_populates="leave_records")
\ No newline at end of file
+    faculty = relationship("Faculty", back_populates="leave_records")
+
+    __table_args__ = (
+        Index("ix_faculty_leave_faculty_dates", "faculty_id", "start_date", "end_date"),
+    )
\ No newline at end of file
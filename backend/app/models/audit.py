@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, DateTime, JSON, Index
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from app.core.database import Base
+
+
+class AuditLog(Base):
+    """Append-only record of an admin action; rows are never updated"""
+    __tablename__ = "audit_logs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # Set when the action happens, not when its buffered row is written
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    action = Column(String, nullable=False)  # e.g. import.completed, timetable.published
+    actor = Column(String)
+    target_type = Column(String)
+    target_id = Column(String)
+    details = Column(JSON, default=dict)
+
+    __table_args__ = (
+        # Keyset pagination walks (created_at, id), newest first
+        Index("ix_audit_logs_created_id", "created_at", "id"),
+        Index("ix_audit_logs_action_created", "action", "created_at"),
+    )
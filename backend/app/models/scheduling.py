@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, ForeignKey, Enum, JSON, Float
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, ForeignKey, Enum, JSON, Float, Index, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -71,6 +71,10 @@ class RulesetConstraint(Base):
     ruleset = relationship("Ruleset", back_populates="constraints")
     constraint = relationship("Constraint", back_populates="ruleset_constraints")
 
+    __table_args__ = (
+        UniqueConstraint("ruleset_id", "constraint_id", name="uq_ruleset_constraints_ruleset_constraint"),
+    )
+
 
 class Scenario(Base):
     __tablename__ = "scenarios"
@@ -107,6 +111,10 @@ class Timetable(Base):
     scenario = relationship("Scenario", back_populates="timetables")
     assignments = relationship("Assignment", back_populates="timetable")
 
+    __table_args__ = (
+        Index("ix_timetables_scenario_final", "scenario_id", "is_final"),
+    )
+
 
 class Assignment(Base):
     __tablename__ = "assignments"
@@ -120,12 +128,39 @@ class Assignment(Base):
     cohort_key = Column(String, nullable=False)  # Identifies student group
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    # Relationships
-    timetable = relationship("Timetable", back_populates="assignments")
-    course = relationship("Course", back_populates="assignments")
-    slot = relationship("TimeSlot", back_populates="assignments")
-    room = relationship("Room", back_populates="assignments")
-    faculty = relationship("Faculty", back_populates="assignments")
+    # Relationships (never lazy-load per row: use app.repositories.assignments)
+    timetable = relationship("Timetable", back_populates="assignments", lazy="raise_on_sql")
+    course = relationship("Course", back_populates="assignments", lazy="raise_on_sql")
+    slot = relationship("TimeSlot", back_populates="assignments", lazy="raise_on_sql")
+    room = relationship("Room", back_populates="assignments", lazy="raise_on_sql")
+    faculty = relationship("Faculty", back_populates="assignments", lazy="raise_on_sql")
+
+    __table_args__ = (
+        # A room or a faculty member can only be in one place per slot
+        UniqueConstraint("timetable_id", "room_id", "slot_id", name="uq_assignments_room_slot"),
+        UniqueConstraint("timetable_id", "faculty_id", "slot_id", name="uq_assignments_faculty_slot"),
+        Index("ix_assignments_timetable_cohort", "timetable_id", "cohort_key"),
+        Index("ix_assignments_timetable_course", "timetable_id", "course_id"),
+        Index("ix_assignments_faculty_timetable", "faculty_id", "timetable_id"),
+    )
+
+
+class TimetableDelta(Base):
+    """Compact changes turning one timetable of a scenario into another"""
+    __tablename__ = "timetable_deltas"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    scenario_id = Column(UUID(as_uuid=True), ForeignKey("scenarios.id"), nullable=False)
+    from_timetable_id = Column(UUID(as_uuid=True), ForeignKey("timetables.id"), nullable=False)
+    to_timetable_id = Column(UUID(as_uuid=True), ForeignKey("timetables.id"), nullable=False)
+    changes = Column(JSON, nullable=False)  # See app.services.timetable_diff
+    summary = Column(JSON, default=dict)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("from_timetable_id", "to_timetable_id", name="uq_timetable_deltas_pair"),
+        Index("ix_timetable_deltas_to", "to_timetable_id"),
+    )
 
 
 class Simulation(Base):
@@ -0,0 +1,204 @@
+from typing import AsyncIterator, Iterable, List, NamedTuple, Optional
+import uuid
+
+from sqlalchemy import distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.models.academic import Course, Faculty, Room, TimeSlot, DayOfWeek
+from app.models.scheduling import Assignment, Timetable
+
+
+class AssignmentRow(NamedTuple):
+    """Flat, fully resolved assignment as returned by a single joined query"""
+    id: uuid.UUID
+    course_id: uuid.UUID
+    course_code: str
+    course_title: str
+    course_type: str
+    course_branch: str
+    room_id: uuid.UUID
+    room_code: str
+    faculty_id: uuid.UUID
+    faculty_code: str
+    faculty_short_name: str
+    faculty_name: str
+    slot_id: uuid.UUID
+    day: str
+    start_time: str
+    end_time: str
+    slot_index: int
+    duration_minutes: int
+    cohort_key: str
+
+
+_ROW_COLUMNS = (
+    Assignment.id,
+    Assignment.course_id, Course.code, Course.title, Course.type, Course.branch,
+    Assignment.room_id, Room.code,
+    Assignment.faculty_id, Faculty.code, Faculty.short_name, Faculty.name,
+    Assignment.slot_id, TimeSlot.day, TimeSlot.start_time, TimeSlot.end_time,
+    TimeSlot.slot_index, TimeSlot.duration_minutes,
+    Assignment.cohort_key,
+)
+
+
+def _joined_rows():
+    return (
+        select(*_ROW_COLUMNS)
+        .join(Course, Course.id == Assignment.course_id)
+        .join(Room, Room.id == Assignment.room_id)
+        .join(Faculty, Faculty.id == Assignment.faculty_id)
+        .join(TimeSlot, TimeSlot.id == Assignment.slot_id)
+    )
+
+
+def _to_rows(result) -> List[AssignmentRow]:
+    rows = []
+    for row in result:
+        values = list(row)
+        values[4] = getattr(values[4], "value", values[4])
+        values[13] = DayOfWeek(values[13]).value
+        rows.append(AssignmentRow(*values))
+    return rows
+
+
+async def fetch_assignment_rows(
+    db: AsyncSession,
+    timetable_id: uuid.UUID,
+    course_ids: Optional[Iterable[uuid.UUID]] = None,
+    faculty_id: Optional[uuid.UUID] = None,
+) -> List[AssignmentRow]:
+    """Assignments of a timetable as plain tuples, in exactly one query"""
+    query = _joined_rows().where(Assignment.timetable_id == timetable_id)
+    if course_ids is not None:
+        query = query.where(Assignment.course_id.in_(list(course_ids)))
+    if faculty_id is not None:
+        query = query.where(Assignment.faculty_id == faculty_id)
+    return _to_rows(await db.execute(query))
+
+
+async def stream_assignment_rows(
+    db: AsyncSession,
+    timetable_id: uuid.UUID,
+    course_ids: Optional[Iterable[uuid.UUID]] = None,
+    faculty_id: Optional[uuid.UUID] = None,
+    cohort_key: Optional[str] = None,
+    chunk_size: int = 1000,
+) -> AsyncIterator[List[AssignmentRow]]:
+    """Assignments of a timetable in chunks, read with a server-side cursor.
+
+    Ordered by cohort, day and slot, so memory stays bounded by `chunk_size`
+    however large the timetable is.
+    """
+    query = _joined_rows().where(Assignment.timetable_id == timetable_id)
+    if course_ids is not None:
+        query = query.where(Assignment.course_id.in_(list(course_ids)))
+    if faculty_id is not None:
+        query = query.where(Assignment.faculty_id == faculty_id)
+    if cohort_key is not None:
+        query = query.where(Assignment.cohort_key == cohort_key)
+    query = query.order_by(Assignment.cohort_key, TimeSlot.day, TimeSlot.slot_index, Course.code)
+    result = await db.stream(query.execution_options(yield_per=chunk_size))
+    async for partition in result.partitions():
+        yield _to_rows(partition)
+
+
+async def fetch_final_assignment_rows(db: AsyncSession, faculty_id: uuid.UUID) -> List[AssignmentRow]:
+    """A faculty member's assignments across all published timetables, in one query"""
+    final_timetables = select(Timetable.id).where(Timetable.is_final.is_(True))
+    query = _joined_rows().where(
+        Assignment.faculty_id == faculty_id,
+        Assignment.timetable_id.in_(final_timetables),
+    )
+    return _to_rows(await db.execute(query))
+
+
+class SessionKey(NamedTuple):
+    """The identity-free content of an assignment, as compared between timetables"""
+    course_id: uuid.UUID
+    cohort_key: str
+    slot_id: uuid.UUID
+    room_id: uuid.UUID
+    faculty_id: uuid.UUID
+
+
+async def fetch_session_keys(db: AsyncSession, timetable_id: uuid.UUID) -> List[SessionKey]:
+    """A timetable's sessions without joins, for diffing"""
+    result = await db.execute(
+        select(Assignment.course_id, Assignment.cohort_key, Assignment.slot_id, Assignment.room_id, Assignment.faculty_id)
+        .where(Assignment.timetable_id == timetable_id)
+    )
+    return [SessionKey(*row) for row in result]
+
+
+class FacultyLoadRow(NamedTuple):
+    """A faculty member with totals over the assignments of some timetables"""
+    faculty_id: uuid.UUID
+    code: str
+    name: str
+    department: str
+    max_load: Optional[int]
+    availability_json: Optional[dict]
+    sessions: int
+    minutes: int
+    busy_slots: int
+    courses: int
+
+
+async def fetch_faculty_load(
+    db: AsyncSession, timetable_ids: Optional[Iterable[uuid.UUID]] = None,
+) -> List[FacultyLoadRow]:
+    """Every faculty member's totals over some timetables, in one grouped query.
+
+    Defaults to all published timetables; faculty without assignments are
+    included with zero totals.
+    """
+    if timetable_ids is None:
+        timetables = select(Timetable.id).where(Timetable.is_final.is_(True))
+    else:
+        timetables = list(timetable_ids)
+    load = (
+        select(
+            Assignment.faculty_id,
+            func.count(Assignment.id).label("sessions"),
+            func.sum(TimeSlot.duration_minutes).label("minutes"),
+            func.count(distinct(Assignment.slot_id)).label("busy_slots"),
+            func.count(distinct(Assignment.course_id)).label("courses"),
+        )
+        .join(TimeSlot, TimeSlot.id == Assignment.slot_id)
+        .where(Assignment.timetable_id.in_(timetables))
+        .group_by(Assignment.faculty_id)
+        .subquery()
+    )
+    result = await db.execute(
+        select(
+            Faculty.id, Faculty.code, Faculty.name, Faculty.department, Faculty.max_load, Faculty.availability_json,
+            func.coalesce(load.c.sessions, 0),
+            func.coalesce(load.c.minutes, 0),
+            func.coalesce(load.c.busy_slots, 0),
+            func.coalesce(load.c.courses, 0),
+        )
+        .outerjoin(load, load.c.faculty_id == Faculty.id)
+        .order_by(Faculty.department, Faculty.code)
+    )
+    return [FacultyLoadRow(*row) for row in result]
+
+
+async def fetch_assignments(db: AsyncSession, timetable_id: uuid.UUID) -> List[Assignment]:
+    """Assignment entities with course, room, faculty and slot loaded up front.
+
+    Uses one query for the assignments plus one IN-query per relationship,
+    regardless of how many assignments the timetable has.
+    """
+    result = await db.execute(
+        select(Assignment)
+        .where(Assignment.timetable_id == timetable_id)
+        .options(
+            selectinload(Assignment.course),
+            selectinload(Assignment.room),
+            selectinload(Assignment.faculty),
+            selectinload(Assignment.slot),
+        )
+    )
+    return list(result.scalars().all())
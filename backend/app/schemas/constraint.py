@@ -0,0 +1,99 @@
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Annotated, List, Literal, Optional, Union
+import re
+import uuid
+
+_HHMM = re.compile(r"^([01]\d|2[0-3]):[0-5]\d$")
+
+
+class ConstraintScope(BaseModel):
+    """Which sessions a constraint applies to; empty lists match everything"""
+    courseCodes: List[str] = Field(default_factory=list)
+    facultyCodes: List[str] = Field(default_factory=list)
+    branches: List[str] = Field(default_factory=list)
+    cohortKeys: List[str] = Field(default_factory=list)
+    sessionKinds: List[Literal["theory", "practical"]] = Field(default_factory=list)
+
+
+class TimeWindow(BaseModel):
+    """Slots on the given days that start at/after `afterTime` and end by `beforeTime`"""
+    day: Optional[Union[str, List[str]]] = None
+    afterTime: Optional[str] = None
+    beforeTime: Optional[str] = None
+    slotIndexes: Optional[List[int]] = None
+
+    @field_validator("afterTime", "beforeTime")
+    @classmethod
+    def check_time(cls, value):
+        if value is not None and not _HHMM.match(value):
+            raise ValueError("times must be HH:MM")
+        return value
+
+    @property
+    def days(self) -> Optional[List[str]]:
+        if self.day is None:
+            return None
+        days = [self.day] if isinstance(self.day, str) else self.day
+        return [day.capitalize() for day in days]
+
+
+class TimeRestriction(TimeWindow):
+    type: Literal["time_restriction"]
+    restriction: Literal["no_classes"] = "no_classes"
+    scope: ConstraintScope = Field(default_factory=ConstraintScope)
+
+
+class FacultyUnavailable(TimeWindow):
+    type: Literal["faculty_unavailable"]
+    facultyCode: str
+
+
+class RoomRestriction(BaseModel):
+    type: Literal["room_restriction"]
+    roomCodes: List[str] = Field(min_length=1)
+    # only: sessions in scope must use these rooms; never: must avoid them
+    mode: Literal["only", "never"] = "only"
+    scope: ConstraintScope = Field(default_factory=ConstraintScope)
+
+
+class MaxSessionsPerDay(BaseModel):
+    type: Literal["max_sessions_per_day"]
+    maxSessions: int = Field(ge=0)
+    per: Literal["course", "faculty", "cohort"] = "course"
+    scope: ConstraintScope = Field(default_factory=ConstraintScope)
+
+
+ConstraintExpression = Annotated[
+    Union[TimeRestriction, FacultyUnavailable, RoomRestriction, MaxSessionsPerDay],
+    Field(discriminator="type"),
+]
+
+
+class ProposedConstraint(BaseModel):
+    """A constraint checked together with the ruleset before it is saved"""
+    kind: Literal["hard", "soft"] = "hard"
+    weight: int = Field(default=1, ge=1)
+    expression: dict
+
+
+class ValidateConstraintsRequest(BaseModel):
+    scenarioId: uuid.UUID
+    constraints: List[ProposedConstraint] = Field(default_factory=list)
+    timeLimitSeconds: Optional[float] = Field(default=None, gt=0, le=60)
+
+
+class NaturalLanguageRequest(BaseModel):
+    """Rules to translate: a list of sentences and/or one per line of `text`"""
+    text: Optional[str] = None
+    sentences: List[str] = Field(default_factory=list, max_length=200)
+
+    @model_validator(mode="after")
+    def check_input(self):
+        if not self.all_sentences:
+            raise ValueError("text or sentences is required")
+        return self
+
+    @property
+    def all_sentences(self) -> List[str]:
+        lines = self.text.splitlines() if self.text else []
+        return [sentence.strip() for sentence in self.sentences + lines if sentence.strip()]
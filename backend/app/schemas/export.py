@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from datetime import date
+from uuid import UUID
+
+
+class BulkStudentExportRequest(BaseModel):
+    timetableId: UUID
+    formats: List[Literal["pdf", "ical"]] = Field(default=["pdf", "ical"], min_length=1)
+    # "directory" leaves loose per-student files; "zip" also bundles them
+    package: Literal["zip", "directory"] = "zip"
+    weekStart: Optional[date] = None
+    weeks: Optional[int] = Field(default=None, ge=1, le=52)
@@ -0,0 +1,19 @@
+from datetime import datetime
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional
+
+
+class FacultyLeaveCreate(BaseModel):
+    startDate: datetime
+    endDate: datetime
+    reason: Optional[str] = None
+    approved: bool = True
+    # Repair affected final timetables right away
+    repair: bool = True
+    timeLimitSeconds: Optional[float] = Field(default=None, gt=0, le=300)
+
+    @model_validator(mode="after")
+    def check_dates(self):
+        if self.endDate < self.startDate:
+            raise ValueError("endDate must not be before startDate")
+        return self
@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+from uuid import UUID
+
+
+class SendNotificationRequest(BaseModel):
+    kind: Literal["timetable_published", "class_moved", "substitute_assigned"]
+    # Audience, combined: students of a bulk export (with their files
+    # attached), all students of a timetable, or explicit recipients
+    exportId: Optional[str] = None
+    timetableId: Optional[UUID] = None
+    enrollmentNumbers: List[str] = Field(default_factory=list)
+    facultyCodes: List[str] = Field(default_factory=list)
+    emails: List[str] = Field(default_factory=list)
+    # e.g. {"courseCode": "CS101", "from": "Monday 09:00", "to": "Tuesday 11:00"}
+    details: Dict[str, str] = Field(default_factory=dict)
+    message: Optional[str] = Field(default=None, max_length=5000)
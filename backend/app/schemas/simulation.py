@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List
+from uuid import UUID
+
+
+class SimulationVariant(BaseModel):
+    name: str
+    # e.g. {"type": "room_outage", "roomCode": "LH-101", "days": ["Monday"]}
+    modifications: List[Dict[str, Any]] = Field(default_factory=list)
+
+
+class RunSimulationsRequest(BaseModel):
+    scenarioId: UUID
+    variants: List[SimulationVariant] = Field(min_length=1, max_length=32)
+    timeLimitSeconds: float = Field(default=30, gt=0, le=3600)
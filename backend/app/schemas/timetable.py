@@ -0,0 +1,23 @@
+from datetime import date
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from uuid import UUID
+from app.models.academic import DayOfWeek
+
+
+class GenerateTimetableRequest(BaseModel):
+    scenarioId: UUID
+    timeLimitSeconds: float = Field(default=60, gt=0, le=3600)
+    numWorkers: int = Field(default=8, ge=1, le=64)
+
+
+class RoomOutage(BaseModel):
+    roomCode: str
+    # Days the room is unavailable; all week when omitted
+    days: Optional[List[DayOfWeek]] = None
+
+
+class RepairTimetableRequest(BaseModel):
+    roomOutages: List[RoomOutage] = Field(default_factory=list)
+    weekStart: Optional[date] = None
+    timeLimitSeconds: Optional[float] = Field(default=None, gt=0, le=300)
@@ -0,0 +1,196 @@
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+import asyncio
+import base64
+import json
+import logging
+import uuid
+
+from fastapi import Request
+from sqlalchemy import insert, select, tuple_
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.audit import AuditLog
+
+logger = logging.getLogger(__name__)
+
+
+class AuditBuffer:
+    """Collects audit rows in memory and writes them in batches.
+
+    `record` never touches the database, so auditing adds no latency to the
+    request that triggers it. A background task flushes every
+    `flush_interval` seconds, or sooner once `batch_size` rows are waiting;
+    rows of a failed flush stay buffered, up to `max_buffered`.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_buffered: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self._rows: List[dict] = []
+        self._lock = asyncio.Lock()
+        self._full = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._run())
+
+    def record(self, row: dict):
+        self._rows.append(row)
+        if len(self._rows) > self.max_buffered:
+            dropped = len(self._rows) - self.max_buffered
+            del self._rows[:dropped]
+            logger.error("Audit buffer full, dropped %d oldest rows", dropped)
+        if len(self._rows) >= self.batch_size:
+            self._full.set()
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns the number of rows written"""
+        async with self._lock:
+            written = 0
+            while self._rows:
+                batch = self._rows[:self.batch_size]
+                del self._rows[:len(batch)]
+                try:
+                    async with AsyncSessionLocal() as db:
+                        await db.execute(insert(AuditLog), batch)
+                        await db.commit()
+                except Exception:
+                    # Keep them for the next flush, ahead of newer rows
+                    self._rows[:0] = batch
+                    raise
+                written += len(batch)
+            return written
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Audit flush failed, %d rows buffered", len(self._rows))
+
+    async def close(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Final audit flush failed, %d rows lost", len(self._rows))
+
+
+_buffer: Optional[AuditBuffer] = None
+
+
+def _get_buffer() -> AuditBuffer:
+    global _buffer
+    if _buffer is None or _buffer.loop is not asyncio.get_running_loop():
+        _buffer = AuditBuffer(
+            batch_size=settings.AUDIT_BATCH_SIZE,
+            flush_interval=settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+            max_buffered=settings.AUDIT_MAX_BUFFERED,
+        )
+    return _buffer
+
+
+def actor_of(request: Request) -> Optional[str]:
+    """Who performed a request: the X-Actor header set by the gateway, else the client address"""
+    return request.headers.get("x-actor") or (request.client.host if request.client else None)
+
+
+def audit(
+    action: str,
+    actor: Optional[str] = None,
+    target_type: Optional[str] = None,
+    target_id: Optional[object] = None,
+    **details,
+):
+    """Record an admin action; must be called from the event loop"""
+    _get_buffer().record({
+        "id": uuid.uuid4(),
+        "created_at": datetime.now(timezone.utc),
+        "action": action,
+        "actor": actor,
+        "target_type": target_type,
+        "target_id": None if target_id is None else str(target_id),
+        "details": json.loads(json.dumps(details, default=str)),
+    })
+
+
+async def flush_audit_log():
+    if _buffer is not None:
+        await _buffer.flush()
+
+
+async def shutdown_audit_log():
+    global _buffer
+    if _buffer is not None:
+        await _buffer.close()
+        _buffer = None
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, row_id: uuid.UUID) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id.hex]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except (ValueError, TypeError) as exc:
+        raise CursorError("Invalid cursor") from exc
+
+
+def _as_dict(row: AuditLog) -> dict:
+    return {
+        "id": str(row.id),
+        "createdAt": row.created_at.isoformat(),
+        "action": row.action,
+        "actor": row.actor,
+        "targetType": row.target_type,
+        "targetId": row.target_id,
+        "details": row.details or {},
+    }
+
+
+async def list_audit_logs(
+    db,
+    limit: int,
+    cursor: Optional[str] = None,
+    action: Optional[str] = None,
+    actor: Optional[str] = None,
+) -> dict:
+    """One page of audit rows, newest first.
+
+    Pages continue from the (created_at, id) of the previous page's last
+    row, so every page is an index range scan however deep it is.
+    Raises CursorError for a malformed cursor.
+    """
+    query = select(AuditLog)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(AuditLog.created_at, AuditLog.id) < tuple_(created_at, row_id))
+    if action:
+        query = query.where(AuditLog.action == action)
+    if actor:
+        query = query.where(AuditLog.actor == actor)
+    query = query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(query)).scalars().all()
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1].created_at, page[-1].id) if len(rows) > limit else None
+    return {
+        "logs": [_as_dict(row) for row in page],
+        "limit": limit,
+        "nextCursor": next_cursor,
+    }
@@ -0,0 +1,265 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+import asyncio
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+import uuid
+import zipfile
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.academic import Enrollment, Student
+from app.models.scheduling import Scenario, Timetable
+from app.repositories.assignments import AssignmentRow, fetch_assignment_rows
+from app.services.exports import ICAL_FOOTER, ical_events, ical_header, pdf_pool, render_pdf
+from app.solver.problem import cohort_key_for, current_week_start
+
+logger = logging.getLogger(__name__)
+
+# Rendered into each group's PDF in place of the student's name, then
+# overwritten byte for byte, so one render serves every student of the group
+_NAME_PLACEHOLDER = "KAIRO-STUDENT-NAME-" + "X" * 61
+
+
+def _pdf_literal(text: str, width: int) -> bytes:
+    """`text` as the body of a PDF literal string, exactly `width` bytes long"""
+    encoded = text.encode("latin-1", "replace")
+    while True:
+        escaped = encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+        if len(escaped) <= width:
+            return escaped.ljust(width)
+        encoded = encoded[:-1]
+
+
+def _file_stem(enrollment_number: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", enrollment_number)
+
+
+def render_group(
+    heading: str,
+    rows: Sequence[tuple],
+    students: Sequence[Tuple[str, str]],
+    formats: Sequence[str],
+    out_dir: str,
+    week_start: date,
+    weeks: int,
+) -> List[dict]:
+    """Render one group's timetable once and write a copy per student.
+
+    Runs in a worker process. `students` holds (enrollment number, name);
+    returns the group's manifest entries.
+    """
+    template = None
+    if "pdf" in formats:
+        handle, path = tempfile.mkstemp(suffix=".pdf", dir=out_dir)
+        os.close(handle)
+        try:
+            render_pdf(_NAME_PLACEHOLDER, [(heading, rows)], path, compress=False)
+            with open(path, "rb") as source:
+                template = source.read()
+        finally:
+            os.remove(path)
+        if _NAME_PLACEHOLDER.encode() not in template:
+            raise RuntimeError("PDF template has no name placeholder")
+    events = None
+    if "ical" in formats:
+        stamp = datetime.now(timezone.utc)
+        events = ical_events([AssignmentRow(*row) for row in rows], week_start, weeks, stamp)
+
+    placeholder = _NAME_PLACEHOLDER.encode()
+    entries = []
+    for enrollment_number, name in students:
+        title = f"{name} ({enrollment_number})"
+        stem = os.path.join("students", _file_stem(enrollment_number))
+        files = {}
+        if template is not None:
+            files["pdf"] = (f"{stem}.pdf", template.replace(placeholder, _pdf_literal(title, len(placeholder))))
+        if events is not None:
+            files["ical"] = (f"{stem}.ics", ical_header(title) + events + ICAL_FOOTER)
+        for relative, content in files.values():
+            with open(os.path.join(out_dir, relative), "wb") as target:
+                target.write(content)
+        entries.append({
+            "enrollmentNumber": enrollment_number,
+            "name": name,
+            "cohortKey": heading,
+            "sessions": len(rows),
+            "files": {kind: {"path": relative, "bytes": len(content)} for kind, (relative, content) in files.items()},
+        })
+    return entries
+
+
+@dataclass
+class BulkExportStatus:
+    id: str
+    timetable_id: uuid.UUID
+    formats: List[str]
+    package: str
+    status: str = "queued"
+    groups_total: int = 0
+    groups_done: int = 0
+    students_total: int = 0
+    students_done: int = 0
+    output_dir: Optional[str] = None
+    manifest_path: Optional[str] = None
+    zip_path: Optional[str] = None
+    error: Optional[str] = None
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+
+    def as_dict(self) -> dict:
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return {
+            "exportId": self.id,
+            "timetableId": str(self.timetable_id),
+            "formats": self.formats,
+            "package": self.package,
+            "status": self.status,
+            "groupsTotal": self.groups_total,
+            "groupsDone": self.groups_done,
+            "studentsTotal": self.students_total,
+            "studentsDone": self.students_done,
+            "studentsPerSecond": round(self.students_done / elapsed) if elapsed > 0 else 0,
+            "outputDir": self.output_dir,
+            "manifestPath": self.manifest_path,
+            "zipReady": self.zip_path is not None,
+            "error": self.error,
+        }
+
+
+_exports: Dict[str, BulkExportStatus] = {}
+_MAX_TRACKED_EXPORTS = 100
+
+
+def get_bulk_export(export_id: str) -> Optional[BulkExportStatus]:
+    return _exports.get(export_id)
+
+
+def start_bulk_export(timetable_id: uuid.UUID, formats: List[str], package: str) -> BulkExportStatus:
+    status = BulkExportStatus(
+        id=f"export_{uuid.uuid4().hex[:12]}", timetable_id=timetable_id, formats=formats, package=package,
+    )
+    _exports[status.id] = status
+    if len(_exports) > _MAX_TRACKED_EXPORTS:
+        oldest = min(_exports.values(), key=lambda s: s.started_at)
+        _exports.pop(oldest.id, None)
+    return status
+
+
+def batch_root() -> Path:
+    return Path(settings.EXPORT_BATCH_DIR or os.path.join(tempfile.gettempdir(), "kairo-exports", "batches"))
+
+
+async def _student_groups(
+    db: AsyncSession, timetable_id: uuid.UUID,
+) -> Dict[Tuple[str, FrozenSet[uuid.UUID]], List[Tuple[str, str]]]:
+    """Students of the timetable's program/semester, grouped by cohort and course set"""
+    scenario = (await db.execute(
+        select(Scenario).join(Timetable, Timetable.scenario_id == Scenario.id).where(Timetable.id == timetable_id)
+    )).scalar_one()
+    result = await db.execute(
+        select(Student.enrollment_number, Student.name, Student.branch, Enrollment.course_id)
+        .outerjoin(Enrollment, and_(Enrollment.student_id == Student.id, Enrollment.semester == Student.semester))
+        .where(Student.program == scenario.program, Student.semester == scenario.semester)
+    )
+    students: Dict[str, Tuple[str, str, set]] = {}
+    for enrollment_number, name, branch, course_id in result:
+        entry = students.setdefault(enrollment_number, (name, branch, set()))
+        if course_id is not None:
+            entry[2].add(course_id)
+
+    groups: Dict[Tuple[str, FrozenSet[uuid.UUID]], List[Tuple[str, str]]] = {}
+    for enrollment_number, (name, branch, course_ids) in sorted(students.items()):
+        key = (cohort_key_for(scenario.program, scenario.semester, branch), frozenset(course_ids))
+        groups.setdefault(key, []).append((enrollment_number, name))
+    return groups
+
+
+def _write_package(out_dir: Path, manifest: dict, zip_path: Optional[Path]):
+    manifest_path = out_dir / "manifest.json"
+    partial = manifest_path.with_suffix(".json.part")
+    partial.write_text(json.dumps(manifest, indent=1))
+    os.replace(partial, manifest_path)
+    if zip_path is None:
+        return
+    partial = zip_path.with_suffix(".zip.part")
+    with zipfile.ZipFile(partial, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        bundle.write(manifest_path, "manifest.json")
+        for entry in manifest["students"]:
+            for file in entry["files"].values():
+                bundle.write(out_dir / file["path"], file["path"])
+    os.replace(partial, zip_path)
+
+
+async def run_bulk_export(status: BulkExportStatus, week_start: Optional[date] = None, weeks: Optional[int] = None):
+    """Write every student's timetable files plus a manifest, e.g. as a background task.
+
+    Each distinct (cohort, course set) is rendered once in the export
+    worker pool; the worker then stamps out the per-student copies. The
+    directory, manifest and optional zip are left for delivery jobs.
+    """
+    status.status = "running"
+    week_start = week_start or current_week_start()
+    weeks = weeks or settings.EXPORT_ICAL_WEEKS
+    out_dir = batch_root() / status.id
+    try:
+        async with AsyncSessionLocal() as db:
+            groups = await _student_groups(db, status.timetable_id)
+            rows = await fetch_assignment_rows(db, status.timetable_id)
+        by_course: Dict[uuid.UUID, List[tuple]] = {}
+        for row in rows:
+            by_course.setdefault(row.course_id, []).append(tuple(row))
+
+        status.groups_total = len(groups)
+        status.students_total = sum(len(students) for students in groups.values())
+        (out_dir / "students").mkdir(parents=True, exist_ok=True)
+        status.output_dir = str(out_dir)
+
+        loop = asyncio.get_running_loop()
+        pool = pdf_pool()
+        pending = [
+            loop.run_in_executor(
+                pool, render_group,
+                cohort_key, [row for course_id in course_ids for row in by_course.get(course_id, [])],
+                students, status.formats, str(out_dir), week_start, weeks,
+            )
+            for (cohort_key, course_ids), students in groups.items()
+        ]
+        entries = []
+        for next_done in asyncio.as_completed(pending):
+            group_entries = await next_done
+            entries.extend(group_entries)
+            status.groups_done += 1
+            status.students_done += len(group_entries)
+
+        entries.sort(key=lambda entry: entry["enrollmentNumber"])
+        manifest = {
+            "exportId": status.id,
+            "timetableId": str(status.timetable_id),
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+            "weekStart": week_start.isoformat(),
+            "weeks": weeks,
+            "formats": status.formats,
+            "groups": len(groups),
+            "students": entries,
+        }
+        zip_path = out_dir / "bundle.zip" if status.package == "zip" else None
+        await asyncio.to_thread(_write_package, out_dir, manifest, zip_path)
+        status.manifest_path = str(out_dir / "manifest.json")
+        status.zip_path = str(zip_path) if zip_path else None
+        status.status = "completed"
+    except Exception as exc:
+        logger.exception("Bulk export %s failed", status.id)
+        status.status = "failed"
+        status.error = str(exc)
+    finally:
+        status.finished_at = time.monotonic()
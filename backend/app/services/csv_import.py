@@ -0,0 +1,466 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import csv
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+import uuid
+
+import aiofiles
+from sqlalchemy import Boolean, Enum, Integer, JSON, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.models.academic import DayOfWeek, Student, Faculty, Course, Room, Enrollment
+from app.models.scheduling import Assignment, Scenario, Timetable
+from app.services.audit import audit
+from app.services.dashboard import invalidate_dashboard_stats
+from app.services.exports import invalidate_exports
+from app.services.student_timetables import invalidate_timetable
+from app.services.substitutes import reset_substitute_index
+from app.services.sync import invalidate_sync
+from app.services.workload import invalidate_workload
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+BATCH_ROWS = 2000
+MAX_REPORTED_ERRORS = 1000
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Reference:
+    """Resolve a foreign key column from a natural key given in the CSV"""
+    csv_column: str
+    model: type
+    natural_key: str
+
+
+@dataclass(frozen=True)
+class ImportSpec:
+    model: type
+    # Columns identifying an existing row; conflicting rows are updated
+    conflict_keys: Tuple[str, ...]
+    references: Dict[str, Reference] = field(default_factory=dict)
+    # Per-column parsers overriding the column type's, e.g. for JSON of a known shape
+    parsers: Dict[str, Callable[[str], object]] = field(default_factory=dict)
+
+
+_TRUE = {"1", "true", "yes", "y", "t"}
+_FALSE = {"0", "false", "no", "n", "f"}
+
+
+def _parse_bool(value: str) -> bool:
+    lowered = value.lower()
+    if lowered in _TRUE:
+        return True
+    if lowered in _FALSE:
+        return False
+    raise RowError(f"expected a boolean, got {value!r}")
+
+
+def _parse_int(value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise RowError(f"expected an integer, got {value!r}")
+
+
+def _parse_json(value: str):
+    try:
+        return json.loads(value)
+    except ValueError as exc:
+        raise RowError(f"invalid JSON: {exc}")
+
+
+def _parse_list(value: str) -> list:
+    # Lists are usually given as "a;b;c"
+    if value[:1] != "[":
+        return [item.strip() for item in value.split(";") if item.strip()]
+    parsed = _parse_json(value)
+    if not isinstance(parsed, list):
+        raise RowError("expected a JSON list or a;b;c")
+    return parsed
+
+
+_DAYS = {day.value for day in DayOfWeek}
+_TIME_RANGE = re.compile(r"\d{1,2}:\d{2}-\d{1,2}:\d{2}")
+
+
+def _parse_availability(value: str) -> dict:
+    """Faculty availability: an object of day name -> slot indexes or "HH:MM-HH:MM" ranges"""
+    parsed = _parse_json(value)
+    if not isinstance(parsed, dict):
+        raise RowError('expected a JSON object such as {"Monday": ["09:00-13:00"]}')
+    for day, entries in parsed.items():
+        if day not in _DAYS:
+            raise RowError(f"unknown day {day!r}")
+        if not isinstance(entries, list) or not all(
+            (isinstance(entry, int) and not isinstance(entry, bool))
+            or (isinstance(entry, str) and _TIME_RANGE.fullmatch(entry))
+            for entry in entries
+        ):
+            raise RowError(f"{day}: expected a list of slot indexes or HH:MM-HH:MM ranges")
+    return parsed
+
+
+IMPORT_SPECS = {
+    "students": ImportSpec(Student, ("enrollment_number",)),
+    "faculty": ImportSpec(
+        Faculty, ("code",),
+        parsers={"expertise_tags": _parse_list, "availability_json": _parse_availability},
+    ),
+    "courses": ImportSpec(Course, ("code",), parsers={"prerequisites": _parse_list}),
+    "rooms": ImportSpec(Room, ("code",), parsers={"features": _parse_list}),
+    "enrollments": ImportSpec(
+        Enrollment,
+        ("student_id", "course_id", "academic_year"),
+        references={
+            "student_id": Reference("enrollment_number", Student, "enrollment_number"),
+            "course_id": Reference("course_code", Course, "code"),
+        },
+    ),
+}
+
+
+def _enum_parser(enum_class) -> Callable[[str], object]:
+    lookup = {}
+    for member in enum_class:
+        lookup[member.value.lower()] = member
+        lookup[member.name.lower()] = member
+
+    def parse(value: str):
+        member = lookup.get(value.lower())
+        if member is None:
+            allowed = ", ".join(m.value for m in enum_class)
+            raise RowError(f"expected one of {allowed}, got {value!r}")
+        return member
+
+    return parse
+
+
+def _converter(column) -> Callable[[str], object]:
+    column_type = column.type
+    if isinstance(column_type, Enum) and column_type.enum_class is not None:
+        return _enum_parser(column_type.enum_class)
+    if isinstance(column_type, Boolean):
+        return _parse_bool
+    if isinstance(column_type, Integer):
+        return _parse_int
+    if isinstance(column_type, JSON):
+        return _parse_json
+    return str
+
+
+class RowValidator:
+    """Convert CSV rows into insert dicts according to a model's columns.
+
+    Required columns are the model's non-nullable columns without a
+    default; types, enums and booleans follow the column definitions.
+    """
+
+    def __init__(self, spec: ImportSpec, header: List[str], lookups: Dict[str, Dict[str, uuid.UUID]]):
+        self.spec = spec
+        self.lookups = lookups
+        table = spec.model.__table__
+        header = [name.strip() for name in header]
+        positions = {name: index for index, name in enumerate(header)}
+
+        self.fields: List[Tuple[str, int, Callable, bool]] = []
+        self.references: List[Tuple[str, int, Dict[str, uuid.UUID]]] = []
+        missing = []
+        for column in table.columns:
+            if column.primary_key or column.name in ("created_at", "updated_at"):
+                continue
+            required = not column.nullable and column.default is None and column.server_default is None
+            reference = spec.references.get(column.name)
+            if reference is not None:
+                if reference.csv_column not in positions:
+                    missing.append(reference.csv_column)
+                else:
+                    self.references.append((column.name, positions[reference.csv_column], lookups[column.name]))
+            elif column.name in positions:
+                convert = spec.parsers.get(column.name) or _converter(column)
+                self.fields.append((column.name, positions[column.name], convert, required))
+            elif required:
+                missing.append(column.name)
+
+        if missing:
+            raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+    def convert(self, row: List[str]) -> dict:
+        values = {}
+        for name, position, convert, required in self.fields:
+            raw = row[position].strip() if position < len(row) else ""
+            if not raw:
+                if required:
+                    raise RowError(f"{name} is required")
+                continue
+            try:
+                values[name] = convert(raw)
+            except RowError as exc:
+                raise RowError(f"{name}: {exc}")
+        for name, position, lookup in self.references:
+            raw = row[position].strip() if position < len(row) else ""
+            resolved = lookup.get(raw)
+            if resolved is None:
+                raise RowError(f"unknown {self.spec.references[name].csv_column} {raw!r}")
+            values[name] = resolved
+        return values
+
+
+@dataclass
+class ImportStatus:
+    id: str
+    data_type: str
+    filename: str
+    status: str = "queued"
+    rows_read: int = 0
+    rows_written: int = 0
+    rows_failed: int = 0
+    errors: List[dict] = field(default_factory=list)
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+
+    def add_error(self, line: int, message: str):
+        self.rows_failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> dict:
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return {
+            "importId": self.id,
+            "dataType": self.data_type,
+            "filename": self.filename,
+            "status": self.status,
+            "rowsRead": self.rows_read,
+            "rowsWritten": self.rows_written,
+            "rowsFailed": self.rows_failed,
+            "rowsPerSecond": round(self.rows_read / elapsed) if elapsed > 0 else 0,
+            "errors": self.errors,
+            "errorsTruncated": self.rows_failed > len(self.errors),
+        }
+
+
+_imports: Dict[str, ImportStatus] = {}
+_MAX_TRACKED_IMPORTS = 100
+
+
+def get_import_status(import_id: str) -> Optional[dict]:
+    status = _imports.get(import_id)
+    return status.as_dict() if status else None
+
+
+async def spool_upload(upload) -> str:
+    """Copy an upload to a private temp file in fixed-size chunks"""
+    handle, path = tempfile.mkstemp(prefix="kairo-import-", suffix=".csv")
+    os.close(handle)
+    async with aiofiles.open(path, "wb") as out:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            await out.write(chunk)
+    return path
+
+
+def start_import(data_type: str, filename: str) -> ImportStatus:
+    status = ImportStatus(id=f"import_{uuid.uuid4().hex[:12]}", data_type=data_type, filename=filename)
+    _imports[status.id] = status
+    if len(_imports) > _MAX_TRACKED_IMPORTS:
+        oldest = min(_imports.values(), key=lambda s: s.started_at)
+        _imports.pop(oldest.id, None)
+    return status
+
+
+async def _build_lookups(db: AsyncSession, spec: ImportSpec) -> Dict[str, Dict[str, uuid.UUID]]:
+    """One natural-key -> id dictionary per foreign key, loaded once per import"""
+    lookups = {}
+    for column, reference in spec.references.items():
+        natural_key = getattr(reference.model, reference.natural_key)
+        result = await db.execute(select(natural_key, reference.model.id))
+        lookups[column] = {key: id_ for key, id_ in result}
+    return lookups
+
+
+def _upsert_statement(db: AsyncSession, spec: ImportSpec, columns: List[str]):
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = insert(spec.model)
+    updates = {
+        name: statement.excluded[name]
+        for name in columns
+        if name not in spec.conflict_keys
+    }
+    if not updates:
+        return statement.on_conflict_do_nothing(index_elements=list(spec.conflict_keys))
+    if "updated_at" in spec.model.__table__.c:
+        updates["updated_at"] = func.now()
+    return statement.on_conflict_do_update(index_elements=list(spec.conflict_keys), set_=updates)
+
+
+def _read_batches(path: str, batch_rows: int):
+    """Yield (first line number, rows) batches from a CSV file without loading it whole"""
+    with open(path, "r", encoding="utf-8-sig", newline="") as handle:
+        reader = csv.reader(handle)
+        header = next(reader, None)
+        yield 1, [header] if header is not None else []
+        batch = []
+        first_line = reader.line_num + 1
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            batch.append((reader.line_num, row))
+            if len(batch) >= batch_rows:
+                yield first_line, batch
+                batch = []
+                first_line = reader.line_num + 1
+        if batch:
+            yield first_line, batch
+
+
+async def _write_batch(db: AsyncSession, spec: ImportSpec, rows: List[dict]) -> int:
+    # Rows in one statement must not conflict with each other; the last one wins
+    unique_rows = {tuple(row.get(key) for key in spec.conflict_keys): row for row in rows}
+    # Blank cells are left out of a row, so that inserts get the column default and
+    # updates keep the stored value; one statement per set of columns given
+    groups: Dict[Tuple[str, ...], List[dict]] = {}
+    for row in unique_rows.values():
+        groups.setdefault(tuple(sorted(row)), []).append({"id": uuid.uuid4(), **row})
+    for columns, payload in groups.items():
+        await db.execute(_upsert_statement(db, spec, list(columns)), payload)
+    await db.commit()
+    return len(unique_rows)
+
+
+# Assignment column referring to each model whose names and codes timetables show
+_ASSIGNMENT_COLUMNS = {Course: Assignment.course_id, Room: Assignment.room_id, Faculty: Assignment.faculty_id}
+
+
+async def _affected_timetables(db: AsyncSession, spec: ImportSpec, rows: List[dict]) -> Set[Tuple[uuid.UUID, bool, str, int]]:
+    """(id, is final, program, semester) of timetables whose cached views show records of the rows.
+
+    Students' and enrollments' rows touch the final timetables of the
+    students' semesters; courses, rooms and faculty any timetable using them.
+    """
+    query = select(Timetable.id, Timetable.is_final, Scenario.program, Scenario.semester).join(
+        Scenario, Scenario.id == Timetable.scenario_id,
+    )
+    if spec.model in (Student, Enrollment):
+        if spec.model is Student:
+            condition = Student.enrollment_number.in_({row["enrollment_number"] for row in rows})
+        else:
+            condition = Student.id.in_({row["student_id"] for row in rows})
+        query = query.join(
+            Student, (Student.program == Scenario.program) & (Student.semester == Scenario.semester),
+        ).where(Timetable.is_final.is_(True), condition)
+    elif spec.model in _ASSIGNMENT_COLUMNS:
+        column = _ASSIGNMENT_COLUMNS[spec.model]
+        used = (
+            select(Assignment.timetable_id)
+            .join(spec.model, spec.model.id == column)
+            .where(spec.model.code.in_({row["code"] for row in rows}))
+        )
+        query = query.where(Timetable.id.in_(used))
+    else:
+        return set()
+    return set((await db.execute(query.distinct())).all())
+
+
+async def _invalidate_timetables(timetables: Set[Tuple[uuid.UUID, bool, str, int]]):
+    """Drop cached projections, sync bundles and exports showing records that changed"""
+    for timetable_id, is_final, _, _ in timetables:
+        await invalidate_exports(timetable_id)
+        if is_final:
+            await invalidate_timetable(timetable_id)
+    for program, semester in {(program, semester) for _, is_final, program, semester in timetables if is_final}:
+        await invalidate_sync(program, semester)
+
+
+async def _write_rows(db: AsyncSession, spec: ImportSpec, rows: List[dict], affected: set) -> int:
+    """Upsert rows, collecting the timetables they show up in before and after"""
+    if spec.model is Student:
+        # Students moving to another program leave the old one's cache stale too
+        affected |= await _affected_timetables(db, spec, rows)
+    written = await _write_batch(db, spec, rows)
+    affected |= await _affected_timetables(db, spec, rows)
+    return written
+
+
+def _database_error(exc: Exception) -> str:
+    # The driver's message, without SQLAlchemy's statement and parameters
+    return str(getattr(exc, "orig", None) or exc)
+
+
+async def run_import(status: ImportStatus, path: str, batch_rows: int = BATCH_ROWS):
+    """Parse, validate and upsert a spooled CSV file batch by batch"""
+    spec = IMPORT_SPECS[status.data_type]
+    status.status = "processing"
+    batches = _read_batches(path, batch_rows)
+    try:
+        async with AsyncSessionLocal() as db:
+            _, header_rows = await asyncio.to_thread(next, batches)
+            if not header_rows:
+                raise ValueError("CSV file is empty")
+            validator = RowValidator(spec, header_rows[0], await _build_lookups(db, spec))
+            # Cached timetable views show students' courses and course, room and faculty names
+            affected: Set[Tuple[uuid.UUID, bool, str, int]] = set()
+
+            while True:
+                batch = await asyncio.to_thread(next, batches, None)
+                if batch is None:
+                    break
+                _, rows = batch
+                converted = []
+                for line, row in rows:
+                    status.rows_read += 1
+                    try:
+                        converted.append((line, validator.convert(row)))
+                    except RowError as exc:
+                        status.add_error(line, str(exc))
+                if not converted:
+                    continue
+                try:
+                    status.rows_written += await _write_rows(db, spec, [values for _, values in converted], affected)
+                except Exception as exc:
+                    await db.rollback()
+                    logger.warning(
+                        "CSV import %s: batch from line %d rejected (%s), retrying row by row",
+                        status.id, converted[0][0], _database_error(exc),
+                    )
+                    # Find the offending rows, so each gets its own error and the rest are written
+                    for line, values in converted:
+                        try:
+                            status.rows_written += await _write_rows(db, spec, [values], affected)
+                        except Exception as row_exc:
+                            await db.rollback()
+                            status.add_error(line, f"rejected by the database: {_database_error(row_exc)}")
+            await _invalidate_timetables(affected)
+        status.status = "completed"
+        await invalidate_dashboard_stats()
+        if spec.model is Faculty:
+            await reset_substitute_index()
+            await invalidate_workload()
+    except Exception as exc:
+        logger.exception("CSV import %s failed", status.id)
+        status.status = "failed"
+        status.errors.append({"line": 0, "error": str(exc)})
+    finally:
+        status.finished_at = time.monotonic()
+        batches.close()
+        os.unlink(path)
+        audit(
+            f"import.{status.status}", target_type="import", target_id=status.id,
+            dataType=status.data_type, filename=status.filename,
+            rowsWritten=status.rows_written, rowsFailed=status.rows_failed,
+        )
@@ -0,0 +1,109 @@
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+import asyncio
+import hashlib
+import json
+
+from sqlalchemy import func, select, text
+
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.academic import Course, Enrollment, Faculty, Room, Student
+from app.models.scheduling import Scenario, ScenarioStatus, Timetable
+
+DASHBOARD_STATS_KEY = "dashboard:stats"
+
+_ESTIMATE_SQL = text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)")
+
+# One computation at a time per process; concurrent pollers wait for it
+_refreshing: Optional[asyncio.Task] = None
+# Bumped by invalidation, so a computation that raced a write is not cached
+_generation = 0
+
+
+async def _count(model, *where, estimate: bool = False) -> Tuple[int, bool]:
+    """Row count, and whether it is PostgreSQL's planner estimate.
+
+    Each count runs in its own session so that they can run concurrently,
+    on the primary since the stats are cached. Estimates are only used for
+    unfiltered counts of large tables.
+    """
+    async with AsyncSessionLocal() as db:
+        if estimate and not where and db.get_bind().dialect.name == "postgresql":
+            approximate = (await db.execute(_ESTIMATE_SQL, {"table": model.__tablename__})).scalar()
+            # -1 or 0 until the table is first vacuumed or analyzed
+            if approximate is not None and approximate >= settings.DASHBOARD_EXACT_COUNT_LIMIT:
+                return int(approximate), True
+        query = select(func.count()).select_from(model)
+        if where:
+            query = query.where(*where)
+        return (await db.execute(query)).scalar_one(), False
+
+
+async def _last_generated() -> Optional[datetime]:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(func.max(Timetable.created_at)))).scalar()
+
+
+async def compute_dashboard_stats() -> dict:
+    counts = {
+        "students": _count(Student, estimate=True),
+        "faculty": _count(Faculty),
+        "courses": _count(Course),
+        "rooms": _count(Room),
+        "enrollments": _count(Enrollment, estimate=True),
+        "activeScenarios": _count(
+            Scenario, Scenario.status.in_([ScenarioStatus.SOLVING, ScenarioStatus.READY]),
+        ),
+        "finalTimetables": _count(Timetable, Timetable.is_final.is_(True)),
+    }
+    *results, last_generated = await asyncio.gather(*counts.values(), _last_generated())
+    stats = {name: value for name, (value, _) in zip(counts, results)}
+    stats["lastGenerated"] = last_generated.isoformat() if last_generated else None
+    stats["estimated"] = [name for name, (_, estimated) in zip(counts, results) if estimated]
+    stats["computedAt"] = datetime.now(timezone.utc).isoformat()
+    return stats
+
+
+def _pack(stats: dict) -> bytes:
+    body = json.dumps(stats).encode()
+    # Weak, as the body is sent compressed or not
+    etag = 'W/"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+    return etag.encode() + b"\n" + body
+
+
+async def _refresh() -> bytes:
+    generation = _generation
+    packed = _pack(await compute_dashboard_stats())
+    if generation == _generation:
+        cache = await get_cache()
+        await cache.set(DASHBOARD_STATS_KEY, packed, ttl=settings.DASHBOARD_STATS_TTL_SECONDS)
+    return packed
+
+
+async def get_dashboard_stats() -> Tuple[str, bytes]:
+    """ETag and JSON body of the dashboard statistics.
+
+    Served from the shared cache; a miss recomputes them once, however many
+    requests are waiting.
+    """
+    global _refreshing
+    cache = await get_cache()
+    packed = await cache.get(DASHBOARD_STATS_KEY)
+    if packed is None:
+        if _refreshing is None or _refreshing.done():
+            _refreshing = asyncio.create_task(_refresh())
+        # Shielded, so one impatient client cannot cancel it for the others
+        packed = await asyncio.shield(_refreshing)
+    etag, _, body = packed.partition(b"\n")
+    return etag.decode(), body
+
+
+async def invalidate_dashboard_stats():
+    """Drop cached statistics after writes that change them"""
+    global _generation, _refreshing
+    _generation += 1
+    _refreshing = None
+    cache = await get_cache()
+    await cache.delete(DASHBOARD_STATS_KEY)
@@ -0,0 +1,394 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterator, Dict, FrozenSet, List, Optional, Sequence, Tuple
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import aiofiles
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.repositories.assignments import AssignmentRow, stream_assignment_rows
+from app.solver.problem import DAY_ORDER, current_week_start
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "pdf": ("application/pdf", "pdf"),
+    "excel": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "ical": ("text/calendar", "ics"),
+}
+
+_STREAM_CHUNK_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class ExportSubject:
+    """The part of a timetable an export covers"""
+    kind: str  # all, faculty, cohort, student
+    title: str
+    faculty_id: Optional[uuid.UUID] = None
+    cohort_key: Optional[str] = None
+    course_ids: Optional[FrozenSet[uuid.UUID]] = None
+    # Identifies the subject in the artifact cache
+    value: str = ""
+
+    @property
+    def key(self) -> str:
+        if self.course_ids is None:
+            return f"{self.kind}:{self.value}"
+        # Students are keyed by their course set, so re-enrollment misses the cache
+        digest = hashlib.blake2b("".join(sorted(c.hex for c in self.course_ids)).encode(), digest_size=8)
+        return f"{self.kind}:{self.value}:{digest.hexdigest()}"
+
+    def rows(self, db, timetable_id: uuid.UUID) -> AsyncIterator[List[AssignmentRow]]:
+        return stream_assignment_rows(
+            db, timetable_id,
+            course_ids=self.course_ids, faculty_id=self.faculty_id, cohort_key=self.cohort_key,
+        )
+
+
+def _cache_dir() -> Path:
+    return Path(settings.EXPORT_CACHE_DIR or os.path.join(tempfile.gettempdir(), "kairo-exports"))
+
+
+def artifact_path(timetable_id: uuid.UUID, subject: ExportSubject, export_format: str, variant: str = "") -> Path:
+    name = hashlib.blake2b(f"{subject.key}|{variant}".encode(), digest_size=16).hexdigest()
+    return _cache_dir() / str(timetable_id) / f"{name}.{EXPORT_FORMATS[export_format][1]}"
+
+
+async def invalidate_exports(timetable_id: uuid.UUID):
+    """Delete a timetable's rendered artifacts, e.g. after the records they show changed"""
+    await asyncio.to_thread(shutil.rmtree, _cache_dir() / str(timetable_id), ignore_errors=True)
+
+
+def _partial(path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}.part")
+
+
+async def _stream_file(path: Path) -> AsyncIterator[bytes]:
+    async with aiofiles.open(path, "rb") as source:
+        while chunk := await source.read(_STREAM_CHUNK_BYTES):
+            yield chunk
+
+
+# PDF ----------------------------------------------------------------------
+
+def render_pdf(title: str, groups: Sequence[Tuple[str, Sequence[tuple]]], path: str, compress: bool = True) -> str:
+    """Render one weekly grid page per group; runs in a worker process.
+
+    `groups` holds (heading, rows) with rows as plain AssignmentRow tuples.
+    Uncompressed output keeps the title patchable in place, see bulk_exports.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    cell_style = styles["BodyText"].clone("cell", fontSize=7, leading=8)
+    document = SimpleDocTemplate(path, pagesize=landscape(A4), title=title, pageCompression=int(compress),
+                                 leftMargin=20, rightMargin=20, topMargin=20, bottomMargin=20)
+    story = []
+    for index, (heading, raw_rows) in enumerate(groups):
+        rows = [AssignmentRow(*row) for row in raw_rows]
+        days = sorted({row.day for row in rows}, key=lambda day: DAY_ORDER.get(day, 7))
+        periods = sorted({(row.slot_index, row.start_time, row.end_time) for row in rows})
+        cells: Dict[Tuple[str, int], List[str]] = {}
+        for row in rows:
+            cells.setdefault((row.day, row.slot_index), []).append(
+                f"<b>{row.course_code}</b> {row.room_code}<br/>{row.faculty_short_name or row.faculty_code}"
+            )
+        table = [["Day"] + [f"{start}-{end}" for _, start, end in periods]]
+        for day in days:
+            table.append([day] + [
+                Paragraph("<br/>".join(cells.get((day, slot_index), [])), cell_style)
+                for slot_index, _, _ in periods
+            ])
+        grid = Table(table, repeatRows=1)
+        grid.setStyle(TableStyle([
+            ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+            ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+            ("FONTSIZE", (0, 0), (-1, -1), 7),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ]))
+        if index:
+            story.append(PageBreak())
+        story.extend([Paragraph(f"{title} - {heading}", styles["Heading3"]), grid])
+    if not story:
+        story.append(Paragraph(f"{title} - no sessions", styles["Heading3"]))
+    document.build(story)
+    return path
+
+
+_pdf_pool: Optional[Executor] = None
+
+
+def pdf_pool() -> Executor:
+    """Workers for CPU-bound rendering, kept off the event loop's process"""
+    global _pdf_pool
+    if _pdf_pool is None:
+        if settings.EXPORT_EXECUTOR == "thread":
+            _pdf_pool = ThreadPoolExecutor(settings.EXPORT_WORKERS)
+        else:
+            _pdf_pool = ProcessPoolExecutor(settings.EXPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pdf_pool
+
+
+def shutdown_export_pool():
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(wait=False, cancel_futures=True)
+        _pdf_pool = None
+
+
+async def _write_pdf(timetable_id: uuid.UUID, subject: ExportSubject, path: Path):
+    group_by = (lambda row: row.faculty_name) if subject.kind == "faculty" else (lambda row: row.cohort_key)
+    groups: Dict[str, List[tuple]] = {}
+    async with AsyncSessionLocal() as db:
+        async for chunk in subject.rows(db, timetable_id):
+            for row in chunk:
+                groups.setdefault(group_by(row), []).append(tuple(row))
+    partial = _partial(path)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(pdf_pool(), render_pdf, subject.title, sorted(groups.items()), str(partial))
+    os.replace(partial, path)
+
+
+# Excel --------------------------------------------------------------------
+
+_EXCEL_HEADER = [
+    "Day", "Start", "End", "Slot", "Course", "Title", "Type", "Branch",
+    "Cohort", "Room", "Faculty code", "Faculty",
+]
+
+
+class _ExcelWriter:
+    """Write-only workbook: rows go to a temp file as they arrive"""
+
+    def __init__(self):
+        from openpyxl import Workbook
+
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("Timetable")
+        self.sheet.append(_EXCEL_HEADER)
+
+    def append(self, rows: List[AssignmentRow]):
+        for row in rows:
+            self.sheet.append([
+                row.day, row.start_time, row.end_time, row.slot_index,
+                row.course_code, row.course_title, row.course_type, row.course_branch,
+                row.cohort_key, row.room_code, row.faculty_code, row.faculty_name,
+            ])
+
+    def save(self, path: str):
+        self.workbook.save(path)
+
+
+async def _write_excel(timetable_id: uuid.UUID, subject: ExportSubject, path: Path):
+    writer = await asyncio.to_thread(_ExcelWriter)
+    async with AsyncSessionLocal() as db:
+        async for chunk in subject.rows(db, timetable_id):
+            # Formatting a chunk is CPU work; the loop keeps serving meanwhile
+            await asyncio.to_thread(writer.append, chunk)
+    partial = _partial(path)
+    await asyncio.to_thread(writer.save, str(partial))
+    os.replace(partial, path)
+
+
+# iCal ---------------------------------------------------------------------
+
+def _ical_text(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _ical_line(line: str) -> str:
+    """Fold a content line at 75 octets, as RFC 5545 requires"""
+    if len(line.encode()) <= 75:
+        return line + "\r\n"
+    parts = []
+    current = ""
+    size = 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > 75:
+            parts.append(current)
+            current, size = " ", 1
+        current += char
+        size += width
+    parts.append(current)
+    return "\r\n".join(parts) + "\r\n"
+
+
+def ical_events(rows: List[AssignmentRow], week_start: date, weeks: int, stamp: datetime) -> bytes:
+    # Formatted directly: building icalendar objects costs ~50x more per event
+    dates = {day: (week_start + timedelta(days=offset)).strftime("%Y%m%d") for day, offset in DAY_ORDER.items()}
+    dtstamp = stamp.strftime("%Y%m%dT%H%M%SZ")
+    lines = []
+    for row in rows:
+        day = dates.get(row.day, dates["Monday"])
+        lines.append("BEGIN:VEVENT\r\n")
+        lines.append(f"UID:{row.id}@kairo\r\n")
+        lines.append(f"DTSTAMP:{dtstamp}\r\n")
+        lines.append(f"DTSTART:{day}T{row.start_time.replace(':', '')}00\r\n")
+        lines.append(f"DTEND:{day}T{row.end_time.replace(':', '')}00\r\n")
+        lines.append(f"RRULE:FREQ=WEEKLY;COUNT={weeks}\r\n")
+        lines.append(_ical_line(f"SUMMARY:{_ical_text(row.course_code)} {_ical_text(row.course_title)}"))
+        lines.append(_ical_line(f"LOCATION:{_ical_text(row.room_code)}"))
+        lines.append(_ical_line(
+            f"DESCRIPTION:{_ical_text(row.faculty_name)} ({_ical_text(row.faculty_code)})\\, {_ical_text(row.cohort_key)}"
+        ))
+        lines.append("END:VEVENT\r\n")
+    return "".join(lines).encode()
+
+
+def ical_header(title: str) -> bytes:
+    return (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Kairo//Timetable//EN\r\n"
+        + _ical_line(f"X-WR-CALNAME:{_ical_text(title)}")
+    ).encode()
+
+
+ICAL_FOOTER = b"END:VCALENDAR\r\n"
+
+
+async def _ical_chunks(
+    timetable_id: uuid.UUID, subject: ExportSubject, week_start: date, weeks: int, path: Path,
+) -> AsyncIterator[bytes]:
+    """Yield the calendar as it is generated, keeping a copy for the cache"""
+    stamp = datetime.now(timezone.utc)
+    partial = _partial(path)
+    completed = False
+    try:
+        async with aiofiles.open(partial, "wb") as copy:
+            header = ical_header(subject.title)
+            await copy.write(header)
+            yield header
+            async with AsyncSessionLocal() as db:
+                async for chunk in subject.rows(db, timetable_id):
+                    body = await asyncio.to_thread(ical_events, chunk, week_start, weeks, stamp)
+                    await copy.write(body)
+                    yield body
+            await copy.write(ICAL_FOOTER)
+            yield ICAL_FOOTER
+        completed = True
+    finally:
+        if completed:
+            os.replace(partial, path)
+        else:
+            partial.unlink(missing_ok=True)
+
+
+# Cache eviction -----------------------------------------------------------
+
+_PRUNE_INTERVAL_SECONDS = 300
+# Older partial files were left by a render that died
+_STALE_PARTIAL_SECONDS = 3600
+
+_last_prune = 0.0
+_prune_task: Optional[asyncio.Task] = None
+
+
+def prune_export_cache(max_bytes: int, max_age_seconds: float) -> int:
+    """Delete least recently used artifacts until the cache fits its bounds.
+
+    A bound of 0 disables it. Only per-timetable directories are pruned, as
+    bulk export batches may share the cache directory. Returns the number
+    of files removed.
+    """
+    root = _cache_dir()
+    now = time.time()
+    artifacts = []
+    for directory in root.iterdir() if root.is_dir() else ():
+        try:
+            uuid.UUID(directory.name)
+        except ValueError:
+            continue
+        for path in directory.iterdir():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.suffix == ".part":
+                if now - stat.st_mtime > _STALE_PARTIAL_SECONDS:
+                    path.unlink(missing_ok=True)
+                continue
+            artifacts.append((stat.st_mtime, stat.st_size, path))
+
+    artifacts.sort()
+    total = sum(size for _, size, _ in artifacts)
+    removed = 0
+    for mtime, size, path in artifacts:
+        over_size = max_bytes and total > max_bytes
+        too_old = max_age_seconds and now - mtime > max_age_seconds
+        if not (over_size or too_old):
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def _schedule_prune():
+    """Prune in the background, at most once per interval"""
+    global _last_prune, _prune_task
+    if time.monotonic() - _last_prune < _PRUNE_INTERVAL_SECONDS:
+        return
+    _last_prune = time.monotonic()
+    _prune_task = asyncio.create_task(asyncio.to_thread(
+        prune_export_cache,
+        settings.EXPORT_CACHE_MAX_MB * 1024 * 1024,
+        settings.EXPORT_CACHE_MAX_AGE_DAYS * 86400,
+    ))
+
+
+# --------------------------------------------------------------------------
+
+async def export_timetable(
+    timetable_id: uuid.UUID,
+    subject: ExportSubject,
+    export_format: str,
+    filename: str,
+    week_start: Optional[date] = None,
+    weeks: Optional[int] = None,
+) -> StreamingResponse:
+    """Stream a timetable export, rendering it only on a cache miss.
+
+    Artifacts are cached on disk by (timetable, subject, format), and the
+    least recently used ones are evicted, see prune_export_cache. Excel and
+    PDF are rendered to a file first, since both need the whole document;
+    iCal is streamed while it is generated.
+    """
+    media_type, extension = EXPORT_FORMATS[export_format]
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{extension}"'}
+    variant = ""
+    if export_format == "ical":
+        week_start = week_start or current_week_start()
+        weeks = weeks or settings.EXPORT_ICAL_WEEKS
+        variant = f"{week_start.isoformat()}:{weeks}"
+    path = artifact_path(timetable_id, subject, export_format, variant)
+
+    try:
+        # Eviction goes by modification time, so a hit marks the artifact as recently used
+        os.utime(path)
+    except FileNotFoundError:
+        _schedule_prune()
+        if export_format == "ical":
+            body = _ical_chunks(timetable_id, subject, week_start, weeks, path)
+            return StreamingResponse(body, media_type=media_type, headers=headers)
+        if export_format == "pdf":
+            await _write_pdf(timetable_id, subject, path)
+        else:
+            await _write_excel(timetable_id, subject, path)
+
+    headers["Content-Length"] = str(path.stat().st_size)
+    return StreamingResponse(_stream_file(path), media_type=media_type, headers=headers)
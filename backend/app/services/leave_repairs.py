@@ -0,0 +1,63 @@
+from datetime import date
+from typing import List, Optional, Set
+import asyncio
+import logging
+import time
+import uuid
+
+from app.solver.jobs import JobState, get_job_runner
+from app.solver.repair import RepairOptions, repair_timetable
+
+logger = logging.getLogger(__name__)
+
+# Keep running repairs referenced so they are not garbage collected
+_repairs: Set[asyncio.Task] = set()
+
+
+def start_leave_repairs(
+    faculty_code: str,
+    leave_id: uuid.UUID,
+    timetable_ids: List[uuid.UUID],
+    week_start: Optional[date],
+    options: RepairOptions,
+) -> str:
+    """Queue repairs of the final timetables a leave disrupts; returns the job id.
+
+    The timetables are repaired one after another in the background, each
+    holding CP-SAT workers from the job runner's shared budget.
+    """
+    runner = get_job_runner()
+    job_id = f"repair_{uuid.uuid4().hex[:12]}"
+    runner.store.create(
+        job_id,
+        kind="leave_repair",
+        facultyCode=faculty_code,
+        leaveId=str(leave_id),
+        timeLimit=options.time_limit_seconds * len(timetable_ids),
+        timetables=[str(timetable_id) for timetable_id in timetable_ids],
+        completedRepairs=0,
+        repairs=[],
+    )
+    task = asyncio.create_task(_run_repairs(job_id, timetable_ids, week_start, options))
+    _repairs.add(task)
+    task.add_done_callback(_repairs.discard)
+    return job_id
+
+
+async def _run_repairs(
+    job_id: str,
+    timetable_ids: List[uuid.UUID],
+    week_start: Optional[date],
+    options: RepairOptions,
+):
+    store = get_job_runner().store
+    store.update(job_id, status=JobState.SOLVING.value, stage="repair", startedAt=time.monotonic())
+    repairs = []
+    try:
+        for timetable_id in timetable_ids:
+            repairs.append(await repair_timetable(timetable_id, options, week_start=week_start))
+            store.update(job_id, completedRepairs=len(repairs), repairs=list(repairs))
+        store.update(job_id, status=JobState.COMPLETED.value, stage=None)
+    except Exception as exc:
+        logger.exception("Leave repair %s failed", job_id)
+        store.update(job_id, status=JobState.FAILED.value, stage=None, error=str(exc))
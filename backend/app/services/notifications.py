@@ -0,0 +1,483 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.message import EmailMessage
+from email.utils import formataddr, formatdate, make_msgid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+import random
+import smtplib
+import ssl
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.academic import Faculty, Student
+from app.models.scheduling import Scenario, Timetable
+from app.services.bulk_exports import batch_root, get_bulk_export
+
+logger = logging.getLogger(__name__)
+
+MAX_REPORTED_DEAD_LETTERS = 1000
+MAX_RETRY_DELAY_SECONDS = 15 * 60
+
+# kind: (subject, body, details the templates need)
+NOTIFICATION_KINDS: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {
+    "timetable_published": (
+        "Your timetable has been published",
+        "Your timetable for this semester has been published.",
+        (),
+    ),
+    "class_moved": (
+        "Class moved: {courseCode}",
+        "{courseCode} on {from} has moved to {to}.",
+        ("courseCode", "from", "to"),
+    ),
+    "substitute_assigned": (
+        "Substitute assigned: {courseCode}",
+        "{substitute} will take {courseCode} on {when}.",
+        ("courseCode", "substitute", "when"),
+    ),
+}
+
+
+def render_notification(
+    kind: str, name: str, details: Dict[str, str], message: Optional[str] = None, attached: bool = False,
+) -> Tuple[str, str]:
+    """Subject and plain-text body of a notification; ValueError on missing details"""
+    if kind not in NOTIFICATION_KINDS:
+        raise ValueError(f"Unknown notification kind {kind!r}")
+    subject, body, required = NOTIFICATION_KINDS[kind]
+    missing = [key for key in required if not details.get(key)]
+    if missing:
+        raise ValueError(f"{kind} notifications need details: {', '.join(missing)}")
+    lines = [f"Hello {name}," if name else "Hello,", "", body.format_map(details)]
+    if attached:
+        lines.append("Your personal copy is attached; the calendar file can be imported into most calendar apps.")
+    if message:
+        lines += ["", message]
+    lines += ["", "Kairo Timetable Office"]
+    return subject.format_map(details), "\n".join(lines) + "\n"
+
+
+@dataclass
+class Recipient:
+    address: str
+    name: str = ""
+    attachments: Tuple[str, ...] = ()
+
+
+@dataclass
+class Notification:
+    batch_id: str
+    recipient: Recipient
+    subject: str
+    body: str
+    attempts: int = 0
+
+
+@dataclass
+class NotificationBatch:
+    id: str
+    kind: str
+    status: str = "queued"
+    total: int = 0
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+    error: Optional[str] = None
+    dead_letters: List[dict] = field(default_factory=list)
+    # Set once every recipient is queued, so the batch can settle
+    queued_all: bool = False
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+
+    def settle(self):
+        if self.queued_all and self.sent + self.failed >= self.total and self.finished_at is None:
+            self.status = "completed"
+            self.finished_at = time.monotonic()
+
+    def as_dict(self) -> dict:
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return {
+            "batchId": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "total": self.total,
+            "sent": self.sent,
+            "failed": self.failed,
+            "pending": self.total - self.sent - self.failed,
+            "retries": self.retries,
+            "messagesPerSecond": round(self.sent / elapsed, 1) if elapsed > 0 else 0,
+            "error": self.error,
+            "deadLetters": self.dead_letters,
+        }
+
+
+_batches: Dict[str, NotificationBatch] = {}
+_MAX_TRACKED_BATCHES = 100
+
+
+def get_notification_batch(batch_id: str) -> Optional[NotificationBatch]:
+    return _batches.get(batch_id)
+
+
+def start_batch(kind: str) -> NotificationBatch:
+    batch = NotificationBatch(id=f"notify_{uuid.uuid4().hex[:12]}", kind=kind)
+    _batches[batch.id] = batch
+    if len(_batches) > _MAX_TRACKED_BATCHES:
+        oldest = min(_batches.values(), key=lambda b: b.started_at)
+        _batches.pop(oldest.id, None)
+    return batch
+
+
+def build_message(notification: Notification) -> EmailMessage:
+    recipient = notification.recipient
+    message = EmailMessage()
+    message["From"] = settings.SMTP_FROM
+    message["To"] = formataddr((recipient.name, recipient.address))
+    message["Subject"] = notification.subject
+    message["Date"] = formatdate(localtime=True)
+    message["Message-ID"] = make_msgid(domain=recipient.address.rpartition("@")[2] or None)
+    message.set_content(notification.body)
+    for path in recipient.attachments:
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        maintype, subtype = content_type.split("/", 1)
+        with open(path, "rb") as attachment:
+            message.add_attachment(
+                attachment.read(), maintype=maintype, subtype=subtype, filename=os.path.basename(path),
+            )
+    return message
+
+
+class SmtpConnection:
+    """One persistent SMTP session, reopened after a message quota or a drop.
+
+    Blocking; each pool worker drives its own connection from a thread.
+    """
+
+    def __init__(self):
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._sent = 0
+
+    def _open(self):
+        smtp = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT_SECONDS)
+        try:
+            if settings.SMTP_STARTTLS:
+                smtp.starttls(context=ssl.create_default_context())
+            if settings.SMTP_USER:
+                smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD or "")
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp, self._sent = smtp, 0
+
+    def send(self, notification: Notification):
+        message = build_message(notification)
+        if self._smtp is not None and self._sent >= settings.SMTP_MESSAGES_PER_CONNECTION:
+            self.close()
+        reused = self._smtp is not None
+        if not reused:
+            self._open()
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            if not reused:
+                raise
+            # Servers drop idle sessions; that is no reason to use up an attempt
+            self._open()
+            self._smtp.send_message(message)
+        except OSError:
+            self.close()
+            raise
+        self._sent += 1
+
+    def close(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+
+
+def is_transient(exc: Exception) -> bool:
+    """Whether a failed delivery is worth retrying"""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    if isinstance(exc, FileNotFoundError):
+        return False
+    return isinstance(exc, (smtplib.SMTPServerDisconnected, OSError))
+
+
+class _RateLimiter:
+    """Spaces out acquisitions to at most `rate` per second across all callers"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        at = max(now, self._next)
+        self._next = at + self.interval
+        if at > now:
+            await asyncio.sleep(at - now)
+
+
+def dead_letter_path() -> Path:
+    return Path(settings.NOTIFICATION_DEAD_LETTER_PATH or os.path.join(
+        tempfile.gettempdir(), "kairo-notifications", "dead-letter.jsonl",
+    ))
+
+
+def _append_dead_letter(entry: dict):
+    path = dead_letter_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as log:
+        log.write(json.dumps(entry) + "\n")
+
+
+class NotificationDispatcher:
+    """Delivers queued notifications over a small pool of SMTP connections.
+
+    Every worker owns one persistent connection and all share one rate
+    limit. Transient failures go back on the queue with exponential
+    backoff; permanent ones, and those out of attempts, are dead-lettered.
+    """
+
+    def __init__(self, pool_size: int, rate_per_second: float, max_attempts: int, queue_size: int):
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.max_attempts = max_attempts
+        self._limiter = _RateLimiter(rate_per_second)
+        self._retrying: Set[asyncio.Task] = set()
+        self._queueing: Set[asyncio.Task] = set()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(max(1, pool_size))]
+
+    async def submit(self, notification: Notification):
+        await self.queue.put(notification)
+
+    def enqueue_batch(
+        self,
+        batch: NotificationBatch,
+        details: Dict[str, str],
+        message: Optional[str] = None,
+        **audience,
+    ) -> asyncio.Task:
+        """Resolve a batch's recipients and queue them from a task of its own, returning at once.
+
+        Queueing waits whenever the queue is full, which must not keep the
+        request that started the batch open.
+        """
+        task = asyncio.create_task(self._queue_batch(batch, details, message, audience))
+        self._queueing.add(task)
+        task.add_done_callback(self._queueing.discard)
+        return task
+
+    async def _queue_batch(
+        self, batch: NotificationBatch, details: Dict[str, str], message: Optional[str], audience: dict,
+    ):
+        try:
+            recipients = await resolve_recipients(**audience)
+            batch.total = len(recipients)
+            batch.status = "sending"
+            for recipient in recipients:
+                subject, body = render_notification(
+                    batch.kind, recipient.name, details, message, attached=bool(recipient.attachments),
+                )
+                await self.submit(Notification(batch.id, recipient, subject, body))
+        except Exception as exc:
+            logger.exception("Queueing notification batch %s failed", batch.id)
+            batch.status = "failed"
+            batch.error = str(exc)
+            batch.finished_at = time.monotonic()
+            return
+        batch.queued_all = True
+        batch.settle()
+
+    async def _work(self):
+        connection = SmtpConnection()
+        try:
+            while True:
+                notification = await self.queue.get()
+                try:
+                    await self._limiter.wait()
+                    await asyncio.to_thread(connection.send, notification)
+                except Exception as exc:
+                    await self._failed(notification, exc)
+                else:
+                    self._delivered(notification)
+                finally:
+                    self.queue.task_done()
+        finally:
+            await asyncio.to_thread(connection.close)
+
+    def _delivered(self, notification: Notification):
+        batch = _batches.get(notification.batch_id)
+        if batch is not None:
+            batch.sent += 1
+            batch.settle()
+
+    async def _failed(self, notification: Notification, exc: Exception):
+        notification.attempts += 1
+        batch = _batches.get(notification.batch_id)
+        if is_transient(exc) and notification.attempts < self.max_attempts:
+            delay = min(settings.NOTIFICATION_RETRY_SECONDS * 2 ** (notification.attempts - 1), MAX_RETRY_DELAY_SECONDS)
+            task = asyncio.create_task(self._retry(notification, delay * random.uniform(0.8, 1.2)))
+            self._retrying.add(task)
+            task.add_done_callback(self._retrying.discard)
+            if batch is not None:
+                batch.retries += 1
+            return
+
+        entry = {
+            "batchId": notification.batch_id,
+            "address": notification.recipient.address,
+            "subject": notification.subject,
+            "attempts": notification.attempts,
+            "error": str(exc) or type(exc).__name__,
+            "failedAt": datetime.now(timezone.utc).isoformat(),
+        }
+        logger.warning("Notification to %s dead-lettered: %s", entry["address"], entry["error"])
+        try:
+            await asyncio.to_thread(_append_dead_letter, entry)
+        except OSError:
+            logger.exception("Could not record dead letter")
+        if batch is not None:
+            batch.failed += 1
+            if len(batch.dead_letters) < MAX_REPORTED_DEAD_LETTERS:
+                batch.dead_letters.append(entry)
+            batch.settle()
+
+    async def _retry(self, notification: Notification, delay: float):
+        await asyncio.sleep(delay)
+        await self.queue.put(notification)
+
+    async def _drain(self):
+        if self._queueing:
+            await asyncio.wait(self._queueing)
+        await self.queue.join()
+
+    async def shutdown(self, timeout: float = 10):
+        """Drain what is queued within `timeout`, then stop the workers"""
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Stopping with %d notifications undelivered", self.queue.qsize() + len(self._retrying))
+        tasks = [*self._queueing, *self._workers, *self._retrying]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_dispatcher: Optional[NotificationDispatcher] = None
+
+
+def get_notification_dispatcher() -> NotificationDispatcher:
+    global _dispatcher
+    if _dispatcher is None or _dispatcher.loop is not asyncio.get_running_loop():
+        _dispatcher = NotificationDispatcher(
+            pool_size=settings.SMTP_POOL_SIZE,
+            rate_per_second=settings.SMTP_RATE_PER_SECOND,
+            max_attempts=settings.NOTIFICATION_MAX_ATTEMPTS,
+            queue_size=settings.NOTIFICATION_QUEUE_SIZE,
+        )
+    return _dispatcher
+
+
+async def shutdown_notifications():
+    global _dispatcher
+    if _dispatcher is not None:
+        await _dispatcher.shutdown()
+        _dispatcher = None
+
+
+def _student_recipient(enrollment_number: str, name: str, attachments: Iterable[str] = ()) -> Recipient:
+    address = settings.NOTIFICATION_STUDENT_ADDRESS.format(enrollment_number=enrollment_number)
+    return Recipient(address, name, tuple(attachments))
+
+
+def _export_manifest_path(export_id: str) -> Path:
+    status = get_bulk_export(export_id)
+    if status is not None and status.manifest_path:
+        return Path(status.manifest_path)
+    return batch_root() / export_id / "manifest.json"
+
+
+def export_ready(export_id: str) -> bool:
+    return _export_manifest_path(export_id).is_file()
+
+
+def _export_recipients(export_id: str) -> List[Recipient]:
+    """Students of a completed bulk export, each with their own files attached"""
+    path = _export_manifest_path(export_id)
+    manifest = json.loads(path.read_text())
+    return [
+        _student_recipient(
+            entry["enrollmentNumber"], entry["name"],
+            (str(path.parent / file["path"]) for file in entry["files"].values()),
+        )
+        for entry in manifest["students"]
+    ]
+
+
+async def resolve_recipients(
+    export_id: Optional[str] = None,
+    timetable_id: Optional[uuid.UUID] = None,
+    enrollment_numbers: Iterable[str] = (),
+    faculty_codes: Iterable[str] = (),
+    emails: Iterable[str] = (),
+) -> List[Recipient]:
+    """Everyone a notification goes to, each address once"""
+    recipients: List[Recipient] = []
+    if export_id:
+        recipients.extend(await asyncio.to_thread(_export_recipients, export_id))
+
+    enrollment_numbers, faculty_codes = list(enrollment_numbers), list(faculty_codes)
+    if timetable_id or enrollment_numbers or faculty_codes:
+        async with AsyncSessionLocal() as db:
+            if timetable_id:
+                scenario = (await db.execute(
+                    select(Scenario.program, Scenario.semester)
+                    .join(Timetable, Timetable.scenario_id == Scenario.id)
+                    .where(Timetable.id == timetable_id)
+                )).one()
+                rows = await db.execute(
+                    select(Student.enrollment_number, Student.name)
+                    .where(Student.program == scenario.program, Student.semester == scenario.semester)
+                )
+                recipients.extend(_student_recipient(*row) for row in rows)
+            if enrollment_numbers:
+                rows = await db.execute(
+                    select(Student.enrollment_number, Student.name)
+                    .where(Student.enrollment_number.in_(enrollment_numbers))
+                )
+                recipients.extend(_student_recipient(*row) for row in rows)
+            if faculty_codes:
+                rows = await db.execute(select(Faculty.code, Faculty.name).where(Faculty.code.in_(faculty_codes)))
+                recipients.extend(
+                    Recipient(settings.NOTIFICATION_FACULTY_ADDRESS.format(code=code), name) for code, name in rows
+                )
+    recipients.extend(Recipient(address) for address in emails)
+
+    unique: Dict[str, Recipient] = {}
+    for recipient in recipients:
+        # The first mention wins, so export recipients keep their attachments
+        unique.setdefault(recipient.address.lower(), recipient)
+    return list(unique.values())
+
@@ -0,0 +1,240 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Set, Tuple
+import asyncio
+import logging
+import multiprocessing
+import time
+import uuid
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.scheduling import ScenarioStatus, Simulation, Timetable, Assignment
+from app.repositories.assignments import fetch_assignment_rows
+from app.solver.jobs import JobState, get_job_runner
+from app.solver.problem import Problem, load_problem
+from app.solver.repair import align_with_timetable
+from app.solver.whatif import (
+    BasePlacement, VariantOptions, apply_modifications, base_placements, init_variant_worker, run_variant
+)
+
+logger = logging.getLogger(__name__)
+
+# Keep running batches referenced so they are not garbage collected
+_batches: Set[asyncio.Task] = set()
+
+
+async def _base_timetable(db: AsyncSession, scenario_id: uuid.UUID) -> Optional[uuid.UUID]:
+    """The scenario's final timetable, or its most recent one"""
+    return (await db.execute(
+        select(Timetable.id)
+        .where(Timetable.scenario_id == scenario_id)
+        .order_by(Timetable.is_final.desc(), Timetable.created_at.desc())
+        .limit(1)
+    )).scalar_one_or_none()
+
+
+async def start_simulations(
+    db: AsyncSession,
+    scenario_id: uuid.UUID,
+    variants: List[Tuple[str, List[dict]]],
+    time_limit_seconds: float,
+) -> dict:
+    """Validate and queue a batch of what-if variants of a scenario.
+
+    The scenario is read from the database once; every variant is a delta
+    on that snapshot. Raises ModificationError for an invalid variant and
+    LookupError for an unknown scenario.
+    """
+    problem = await load_problem(db, scenario_id)
+    base_id = await _base_timetable(db, scenario_id)
+    solution: List[BasePlacement] = []
+    base_objective = None
+    if base_id is not None:
+        problem, current, _ = align_with_timetable(problem, await fetch_assignment_rows(db, base_id))
+        solution = base_placements(problem, current)
+        base_objective = float(sum(
+            problem.rooms[r].capacity - problem.units[u].size
+            for u, pairs in current.items() for _, r in pairs
+        ))
+
+    for _, modifications in variants:
+        apply_modifications(problem, modifications)
+
+    simulations = [
+        Simulation(
+            name=name,
+            base_scenario_id=scenario_id,
+            modifications_json=modifications,
+            status=ScenarioStatus.SOLVING,
+        )
+        for name, modifications in variants
+    ]
+    db.add_all(simulations)
+    await db.commit()
+
+    runner = get_job_runner()
+    job_id = f"sim_{uuid.uuid4().hex[:12]}"
+    time_limit = min(time_limit_seconds, settings.SOLVER_MAX_TIME_LIMIT_SECONDS)
+    runner.store.create(
+        job_id,
+        kind="simulation",
+        scenarioId=str(scenario_id),
+        baseTimetableId=str(base_id) if base_id else None,
+        baseObjective=base_objective,
+        timeLimit=time_limit,
+        variants=len(variants),
+        completedVariants=0,
+        comparison=[],
+    )
+    task = asyncio.create_task(_run_batch(
+        job_id, problem, solution, base_objective,
+        [(simulation.id, simulation.name, simulation.modifications_json) for simulation in simulations],
+        time_limit,
+    ))
+    _batches.add(task)
+    task.add_done_callback(_batches.discard)
+    return {"jobId": job_id, "simulationIds": [str(simulation.id) for simulation in simulations]}
+
+
+def _executor(workers: int, problem: Problem, solution: List[BasePlacement]):
+    """(executor, base argument of run_variant)"""
+    if settings.SOLVER_EXECUTOR == "inline":
+        # Threads share the base problem; it is passed with each variant
+        return ThreadPoolExecutor(workers), (problem, solution)
+    # Processes get the base problem once through the initializer; each
+    # variant then only ships its modification list
+    return ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_variant_worker,
+        initargs=(problem, solution),
+    ), None
+
+
+async def _run_batch(
+    job_id: str,
+    problem: Problem,
+    solution: List[BasePlacement],
+    base_objective: Optional[float],
+    variants: List[Tuple[uuid.UUID, str, List[dict]]],
+    time_limit: float,
+):
+    runner = get_job_runner()
+    store = runner.store
+    parallel = max(1, min(len(variants), runner.cpu_budget))
+    options = VariantOptions(
+        time_limit_seconds=time_limit,
+        num_workers=max(1, runner.cpu_budget // parallel),
+    )
+    try:
+        async with runner.reserve_cores(parallel * options.num_workers):
+            store.update(job_id, status=JobState.SOLVING.value, stage="variants", startedAt=time.monotonic())
+            loop = asyncio.get_running_loop()
+            executor, base = _executor(parallel, problem, solution)
+            try:
+                async def solve(variant):
+                    return variant, await loop.run_in_executor(executor, run_variant, variant[2], options, base)
+
+                comparison = []
+                for next_done in asyncio.as_completed([solve(variant) for variant in variants]):
+                    (simulation_id, name, modifications), summary = await next_done
+                    row = await _persist_variant(simulation_id, name, modifications, summary, base_objective)
+                    comparison.append(row)
+                    comparison.sort(key=_rank)
+                    store.update(job_id, completedVariants=len(comparison), comparison=list(comparison))
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+        store.update(job_id, status=JobState.COMPLETED.value, stage=None)
+    except Exception as exc:
+        logger.exception("Simulation batch %s failed", job_id)
+        store.update(job_id, status=JobState.FAILED.value, stage=None, error=str(exc))
+        await _fail_remaining([simulation_id for simulation_id, _, _ in variants])
+
+
+def _rank(row: dict):
+    violations = row["hardViolations"]
+    objective = row["objective"]
+    return (
+        violations is None,
+        violations or 0,
+        objective if objective is not None else float("inf"),
+        row["changedAssignments"] or 0,
+    )
+
+
+async def _persist_variant(
+    simulation_id: uuid.UUID,
+    name: str,
+    modifications: List[dict],
+    summary: dict,
+    base_objective: Optional[float],
+) -> dict:
+    """Store a variant's outcome and return its comparison-table row.
+
+    Violation-free variants get a draft timetable, unless they use rooms
+    that only exist in the what-if.
+    """
+    violations = summary.get("hardViolations")
+    virtual_rooms = any(modification.get("type") == "add_room" for modification in modifications)
+    timetable_id = None
+    async with AsyncSessionLocal() as db:
+        simulation = await db.get(Simulation, simulation_id)
+        if violations == 0 and not virtual_rooms:
+            timetable = Timetable(
+                scenario_id=simulation.base_scenario_id,
+                objective_score=summary["objective"],
+                solve_time_seconds=int(round(summary["wallTime"])),
+            )
+            db.add(timetable)
+            await db.flush()
+            rows = [
+                {
+                    "id": uuid.uuid4(),
+                    "timetable_id": timetable.id,
+                    "course_id": course_id,
+                    "slot_id": slot_id,
+                    "room_id": room_id,
+                    "faculty_id": faculty_id,
+                    "cohort_key": cohort_key,
+                }
+                for course_id, slot_id, room_id, faculty_id, cohort_key in summary["placements"]
+            ]
+            if rows:
+                await db.execute(insert(Assignment), rows)
+            simulation.result_timetable_id = timetable_id = timetable.id
+        simulation.status = ScenarioStatus.READY if violations is not None else ScenarioStatus.FAILED
+        await db.commit()
+
+    objective = summary.get("objective")
+    return {
+        "simulationId": str(simulation_id),
+        "name": name,
+        "status": summary["status"],
+        "objective": objective,
+        "objectiveDelta": objective - base_objective if objective is not None and base_objective is not None else None,
+        "hardViolations": violations,
+        "changedAssignments": summary.get("changedAssignments"),
+        "facultyLoadDeltas": summary.get("facultyLoadDeltas", {}),
+        "wallTime": summary.get("wallTime"),
+        "timetableId": str(timetable_id) if timetable_id else None,
+        "error": summary.get("error"),
+    }
+
+
+async def _fail_remaining(simulation_ids: List[uuid.UUID]):
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Simulation).where(
+                    Simulation.id.in_(simulation_ids),
+                    Simulation.status == ScenarioStatus.SOLVING,
+                )
+            )
+            for simulation in result.scalars():
+                simulation.status = ScenarioStatus.FAILED
+            await db.commit()
+    except Exception:
+        logger.exception("Could not mark simulations as failed")
@@ -0,0 +1,164 @@
+"""A small SMTP server that accepts and keeps every message.
+
+For local runs and tests in place of a real mail server:
+
+    python -m app.services.smtp_sink --port 8025 --maildir /tmp/kairo-mail
+
+with SMTP_HOST=localhost, SMTP_PORT=8025 and SMTP_STARTTLS=false.
+"""
+from dataclasses import dataclass
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesParser
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import argparse
+import asyncio
+import re
+
+_ADDRESS = re.compile(r"<([^>]*)>")
+
+
+@dataclass
+class SinkMessage:
+    mail_from: str
+    recipients: List[str]
+    data: bytes
+
+    def parsed(self) -> EmailMessage:
+        return BytesParser(policy=policy.default).parsebytes(self.data)
+
+
+class SmtpSink:
+    """Accepts any mail; chosen recipients can be refused or deferred.
+
+    `reject` recipients get a permanent 550, `defer` maps a recipient to the
+    number of times it gets a temporary 451 before being accepted.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        maildir: Optional[str] = None,
+        reject: Iterable[str] = (),
+        defer: Optional[Dict[str, int]] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.maildir = Path(maildir) if maildir else None
+        self.reject = set(reject)
+        self.defer = dict(defer or {})
+        self.messages: List[SinkMessage] = []
+        self.connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        if self.maildir:
+            self.maildir.mkdir(parents=True, exist_ok=True)
+        self._server = await asyncio.start_server(self._session, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def _recipient_reply(self, address: str) -> str:
+        if address in self.reject:
+            return "550 5.1.1 Mailbox unavailable"
+        if self.defer.get(address, 0) > 0:
+            self.defer[address] -= 1
+            return "451 4.3.0 Try again later"
+        return "250 2.1.5 OK"
+
+    async def _store(self, message: SinkMessage):
+        self.messages.append(message)
+        if self.maildir:
+            path = self.maildir / f"{len(self.messages):06d}.eml"
+            await asyncio.to_thread(path.write_bytes, message.data)
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+
+        async def reply(*lines: str):
+            writer.write("".join(f"{line}\r\n" for line in lines).encode())
+            await writer.drain()
+
+        mail_from, recipients = None, []
+        try:
+            await reply("220 kairo-sink ESMTP")
+            while line := await reader.readline():
+                command = line.decode("utf-8", "replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb == "EHLO":
+                    await reply("250-kairo-sink", "250-8BITMIME", "250 AUTH PLAIN LOGIN")
+                elif verb == "HELO":
+                    await reply("250 kairo-sink")
+                elif verb == "AUTH":
+                    await reply("235 2.7.0 Authentication successful")
+                elif verb == "MAIL":
+                    match = _ADDRESS.search(command)
+                    mail_from, recipients = match.group(1) if match else "", []
+                    await reply("250 2.1.0 OK")
+                elif verb == "RCPT":
+                    match = _ADDRESS.search(command)
+                    address = match.group(1) if match else ""
+                    response = self._recipient_reply(address)
+                    if response.startswith("250"):
+                        recipients.append(address)
+                    await reply(response)
+                elif verb == "DATA":
+                    if mail_from is None or not recipients:
+                        await reply("503 5.5.1 Need MAIL and RCPT first")
+                        continue
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while (data := await reader.readline()) not in (b".\r\n", b".\n", b""):
+                        lines.append(data[1:] if data.startswith(b".") else data)
+                    await self._store(SinkMessage(mail_from, recipients, b"".join(lines)))
+                    mail_from, recipients = None, []
+                    await reply(f"250 2.0.0 Queued as {len(self.messages)}")
+                elif verb == "RSET":
+                    mail_from, recipients = None, []
+                    await reply("250 2.0.0 OK")
+                elif verb == "NOOP":
+                    await reply("250 2.0.0 OK")
+                elif verb == "QUIT":
+                    await reply("221 2.0.0 Bye")
+                    break
+                elif verb == "STARTTLS":
+                    await reply("454 4.7.0 TLS not available")
+                else:
+                    await reply("502 5.5.2 Command not recognized")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def _serve(host: str, port: int, maildir: Optional[str]):
+    sink = SmtpSink(host, port, maildir)
+    await sink.start()
+    print(f"SMTP sink listening on {sink.host}:{sink.port}" + (f", writing to {maildir}" if maildir else ""))
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--maildir", default=None)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args.host, args.port, args.maildir))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,239 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import gzip
+import hashlib
+import json
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.serialization import dump_model
+from app.models.academic import Student, Enrollment
+from app.models.scheduling import Scenario, Timetable
+from app.repositories.assignments import AssignmentRow, fetch_assignment_rows
+from app.schemas.student import StudentInfo, TimetableCard
+from app.solver.problem import DAY_ORDER
+
+
+def timetable_prefix(timetable_id: uuid.UUID) -> str:
+    return f"timetable:{timetable_id}:"
+
+
+def _student_key(timetable_id: uuid.UUID, version: int, enrollment_number: str) -> str:
+    # "gz": entries from before bodies were stored gzipped must not be read as such
+    return f"{timetable_prefix(timetable_id)}v{version}:student-gz:{enrollment_number}"
+
+
+def _pointer_key(enrollment_number: str) -> str:
+    return f"student:{enrollment_number}:timetable"
+
+
+def final_key(program: str, semester: int) -> str:
+    """Cache key naming the published timetable of a program's semester"""
+    return f"final:{program}:S{semester}"
+
+
+def _pack_pointer(timetable_id: uuid.UUID, version: int, program: str, semester: int) -> bytes:
+    return json.dumps([timetable_id.hex, version, program, semester]).encode()
+
+
+def _pack(timetable_id: uuid.UUID, version: int, body: bytes) -> bytes:
+    """ETag and gzipped body; compressed once here rather than on every request"""
+    digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+    # Weak, as the body is sent compressed or not
+    etag = f'W/"{timetable_id.hex[:12]}-{version}-{digest}"'
+    return etag.encode() + b"\n" + gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def _unpack(packed: bytes) -> Tuple[str, bytes]:
+    etag, _, body = packed.partition(b"\n")
+    return etag.decode(), body
+
+
+class _CardIndex:
+    """Cards serialized once per assignment, grouped by course"""
+
+    def __init__(self, rows: List[AssignmentRow]):
+        self.cards: Dict[uuid.UUID, List[Tuple[tuple, bytes]]] = {}
+        self.legend: Dict[uuid.UUID, Dict[str, str]] = {}
+        for row in rows:
+            card = TimetableCard(
+                courseCode=row.course_code,
+                courseTitle=row.course_title,
+                roomNumber=row.room_code,
+                branch=row.course_branch,
+                facultyShortForm=row.faculty_short_name,
+                courseType=row.course_type,
+                timeSlot={
+                    "day": row.day,
+                    "startTime": row.start_time,
+                    "endTime": row.end_time,
+                    "slotIndex": row.slot_index,
+                },
+            )
+            sort_key = (DAY_ORDER[row.day], row.slot_index, row.course_code)
+            self.cards.setdefault(row.course_id, []).append((sort_key, dump_model(card)))
+            self.legend.setdefault(row.course_id, {})[row.faculty_short_name] = row.faculty_name
+
+    def fragment(self, course_ids: Iterable[uuid.UUID]) -> bytes:
+        """The assignments + facultyLegend part of a response for a set of courses"""
+        cards = []
+        legend = {}
+        for course_id in course_ids:
+            cards.extend(self.cards.get(course_id, ()))
+            legend.update(self.legend.get(course_id, {}))
+        cards.sort(key=lambda item: item[0])
+        return (
+            b'"assignments":[' + b",".join(card for _, card in cards) + b'],'
+            + b'"facultyLegend":' + json.dumps(legend, sort_keys=True).encode()
+        )
+
+
+def _render(student: StudentInfo, fragment: bytes) -> bytes:
+    return b'{"student":' + dump_model(student) + b"," + fragment + b"}"
+
+
+async def build_projection(db: AsyncSession, timetable_id: uuid.UUID) -> int:
+    """Materialize every affected student's response for a final timetable.
+
+    Students with the same set of courses share one rendered
+    assignments/legend fragment; only the student header differs.
+    Returns the number of students written.
+    """
+    timetable = await db.get(Timetable, timetable_id)
+    scenario = await db.get(Scenario, timetable.scenario_id)
+    version = scenario.version or 1
+
+    cards = _CardIndex(await fetch_assignment_rows(db, timetable_id))
+
+    students = (await db.execute(
+        select(Student.id, Student.enrollment_number, Student.name, Student.program, Student.semester)
+        .where(Student.program == scenario.program, Student.semester == scenario.semester)
+    )).all()
+    enrollments = (await db.execute(
+        select(Enrollment.student_id, Enrollment.course_id)
+        .join(Student, Student.id == Enrollment.student_id)
+        .where(Student.program == scenario.program, Enrollment.semester == scenario.semester)
+    )).all()
+
+    courses_by_student: Dict[uuid.UUID, set] = {}
+    for student_id, course_id in enrollments:
+        courses_by_student.setdefault(student_id, set()).add(course_id)
+
+    def pack_all() -> Dict[str, bytes]:
+        fragments: Dict[frozenset, bytes] = {}
+        entries: Dict[str, bytes] = {}
+        pointer = _pack_pointer(timetable_id, version, scenario.program, scenario.semester)
+        for student_id, enrollment_number, name, program, semester in students:
+            course_set = frozenset(courses_by_student.get(student_id, ()))
+            fragment = fragments.get(course_set)
+            if fragment is None:
+                fragment = fragments[course_set] = cards.fragment(course_set)
+            body = _render(StudentInfo(name=name, program=program, semester=semester), fragment)
+            entries[_student_key(timetable_id, version, enrollment_number)] = _pack(timetable_id, version, body)
+            entries[_pointer_key(enrollment_number)] = pointer
+        return entries
+
+    # Rendering and compressing every student is CPU work; the loop keeps serving meanwhile
+    entries = await asyncio.to_thread(pack_all)
+
+    cache = await get_cache()
+    await cache.set_many(entries, ttl=settings.TIMETABLE_CACHE_TTL_SECONDS)
+    await cache.set(
+        final_key(scenario.program, scenario.semester), timetable_id.hex.encode(),
+        ttl=settings.TIMETABLE_CACHE_TTL_SECONDS,
+    )
+    return len(students)
+
+
+async def publish_projection(timetable_id: uuid.UUID) -> int:
+    """Build a timetable's projection in its own session, e.g. as a background task"""
+    async with AsyncSessionLocal() as db:
+        return await build_projection(db, timetable_id)
+
+
+async def invalidate_timetable(timetable_id: uuid.UUID) -> int:
+    """Drop every cached projection of a timetable, across versions"""
+    cache = await get_cache()
+    return await cache.delete_prefix(timetable_prefix(timetable_id))
+
+
+async def current_student_timetable(
+    db: AsyncSession,
+    enrollment_number: str,
+) -> Optional[Tuple[Student, Optional[Tuple[uuid.UUID, int]], List[uuid.UUID]]]:
+    """(student, (final timetable id, version) or None, enrolled course ids), or None if unknown"""
+    student = (await db.execute(
+        select(Student).where(Student.enrollment_number == enrollment_number)
+    )).scalar_one_or_none()
+    if student is None:
+        return None
+
+    final = (await db.execute(
+        select(Timetable.id, Scenario.version)
+        .join(Scenario, Scenario.id == Timetable.scenario_id)
+        .where(
+            Timetable.is_final.is_(True),
+            Scenario.program == student.program,
+            Scenario.semester == student.semester,
+        )
+        .order_by(Timetable.created_at.desc())
+        .limit(1)
+    )).first()
+    if final is None:
+        return student, None, []
+
+    course_ids = (await db.execute(
+        select(Enrollment.course_id).where(
+            Enrollment.student_id == student.id,
+            Enrollment.semester == student.semester,
+        )
+    )).scalars().all()
+    return student, (final[0], final[1] or 1), list(course_ids)
+
+
+async def get_student_timetable_payload(db: AsyncSession, enrollment_number: str) -> Optional[Tuple[str, bytes]]:
+    """(etag, gzipped JSON body) of a student's current timetable, or None if unknown.
+
+    Served from the projection while the student's pointer names the
+    published timetable of their program's semester; on a miss the
+    student's cards are computed with one join and written back to the cache.
+    """
+    cache = await get_cache()
+    pointer = await cache.get(_pointer_key(enrollment_number))
+    if pointer is not None:
+        timetable_hex, version, program, semester = json.loads(pointer)
+        final, packed = await cache.get_many([
+            final_key(program, semester),
+            _student_key(uuid.UUID(hex=timetable_hex), version, enrollment_number),
+        ])
+        # Another scenario of the same semester may have been published since
+        if final is not None and final.decode() == timetable_hex and packed is not None:
+            return _unpack(packed)
+
+    current = await current_student_timetable(db, enrollment_number)
+    if current is None:
+        return None
+    student, final, course_ids = current
+    info = StudentInfo(name=student.name, program=student.program, semester=student.semester)
+    if final is None:
+        body = _render(info, b'"assignments":[],"facultyLegend":{}')
+        return _unpack(_pack(uuid.UUID(int=0), 0, body))
+
+    timetable_id, version = final
+    cards = _CardIndex(await fetch_assignment_rows(db, timetable_id, course_ids=course_ids))
+    packed = _pack(timetable_id, version, _render(info, cards.fragment(set(course_ids))))
+
+    await cache.set_many(
+        {
+            final_key(student.program, student.semester): timetable_id.hex.encode(),
+            _student_key(timetable_id, version, enrollment_number): packed,
+            _pointer_key(enrollment_number): _pack_pointer(timetable_id, version, student.program, student.semester),
+        },
+        ttl=settings.TIMETABLE_CACHE_TTL_SECONDS,
+    )
+    return _unpack(packed)
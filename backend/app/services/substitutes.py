@@ -0,0 +1,315 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import heapq
+import math
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import get_cache
+from app.models.academic import Faculty, FacultyLeave, TimeSlot, DayOfWeek
+from app.models.scheduling import Timetable
+from app.repositories.assignments import AssignmentRow, fetch_assignment_rows
+from app.solver.builder import iter_bits
+from app.solver.problem import DAY_ORDER, SlotInfo, availability_mask, current_week_start, leave_mask
+
+
+@dataclass(frozen=True)
+class _Member:
+    id: uuid.UUID
+    code: str
+    name: str
+    department: str
+    max_minutes: int
+    tags: frozenset
+
+
+@dataclass(frozen=True)
+class _Booking:
+    timetable_id: uuid.UUID
+    faculty: int
+    slot: int
+    minutes: int
+    course_code: str
+    course_title: str
+    course_branch: str
+    room_code: str
+    cohort_key: str
+
+
+def _tag(value: str) -> str:
+    return value.strip().lower()
+
+
+class SubstituteIndex:
+    """Free faculty per slot plus an inverted expertise index.
+
+    Faculty are numbered by position and every per-slot set is an int
+    bitset over those positions, so "who is free at slot s and knows tag t"
+    is a single AND. Bookings (final timetable assignments) and leave are
+    applied incrementally; only a change of planning week or of the faculty
+    list needs a rebuild.
+    """
+
+    def __init__(self, slots: List[SlotInfo], members: List[_Member], availability: List[int], week_start: date):
+        self.week_start = week_start
+        self.slots = slots
+        self.slot_positions = {slot.id: s for s, slot in enumerate(slots)}
+        self.members = members
+        self.positions = {member.id: f for f, member in enumerate(members)}
+        self.available = availability
+        self.leaves: List[List[Tuple[datetime, datetime]]] = [[] for _ in members]
+        self.on_leave = [0] * len(members)
+        self.busy_counts: Dict[Tuple[int, int], int] = {}
+        self.busy = [0] * len(members)
+        self.load_minutes = [0] * len(members)
+        self.free = [0] * len(slots)
+
+        self.tag_faculty: Dict[str, int] = {}
+        self.department_faculty: Dict[str, int] = {}
+        for f, member in enumerate(members):
+            for tag in member.tags:
+                self.tag_faculty[tag] = self.tag_faculty.get(tag, 0) | 1 << f
+            department = _tag(member.department)
+            self.department_faculty[department] = self.department_faculty.get(department, 0) | 1 << f
+
+        self.bookings: Dict[uuid.UUID, _Booking] = {}
+        self.by_timetable: Dict[uuid.UUID, Set[uuid.UUID]] = {}
+        self.by_faculty: List[Set[uuid.UUID]] = [set() for _ in members]
+
+        for f in range(len(members)):
+            self._refresh(f)
+
+    def _refresh(self, f: int):
+        """Recompute one faculty member's bit in every slot's free set"""
+        free_mask = self.available[f] & ~self.on_leave[f] & ~self.busy[f]
+        bit = 1 << f
+        for s in range(len(self.slots)):
+            if free_mask >> s & 1:
+                self.free[s] |= bit
+            else:
+                self.free[s] &= ~bit
+
+    def add_timetable(self, timetable_id: uuid.UUID, rows: Iterable[AssignmentRow]):
+        touched = set()
+        for row in rows:
+            f = self.positions.get(row.faculty_id)
+            s = self.slot_positions.get(row.slot_id)
+            if f is None or s is None or row.id in self.bookings:
+                continue
+            self.bookings[row.id] = _Booking(
+                timetable_id, f, s, row.duration_minutes,
+                row.course_code, row.course_title, row.course_branch, row.room_code, row.cohort_key,
+            )
+            self.by_timetable.setdefault(timetable_id, set()).add(row.id)
+            self.by_faculty[f].add(row.id)
+            self.busy_counts[(f, s)] = self.busy_counts.get((f, s), 0) + 1
+            self.busy[f] |= 1 << s
+            self.load_minutes[f] += row.duration_minutes
+            touched.add(f)
+        for f in touched:
+            self._refresh(f)
+
+    def remove_timetable(self, timetable_id: uuid.UUID):
+        touched = set()
+        for assignment_id in self.by_timetable.pop(timetable_id, ()):
+            booking = self.bookings.pop(assignment_id)
+            f, s = booking.faculty, booking.slot
+            self.by_faculty[f].discard(assignment_id)
+            count = self.busy_counts[(f, s)] - 1
+            if count:
+                self.busy_counts[(f, s)] = count
+            else:
+                del self.busy_counts[(f, s)]
+                self.busy[f] &= ~(1 << s)
+            self.load_minutes[f] -= booking.minutes
+            touched.add(f)
+        for f in touched:
+            self._refresh(f)
+
+    def add_leave(self, faculty_id: uuid.UUID, start: datetime, end: datetime):
+        f = self.positions.get(faculty_id)
+        if f is None:
+            return
+        self.leaves[f].append((start, end))
+        self.on_leave[f] = leave_mask(self.leaves[f], self.slots, self.week_start)
+        self._refresh(f)
+
+    def suggest(self, faculty_id: uuid.UUID, limit: int = 5, days: Optional[Set[str]] = None) -> List[dict]:
+        """Ranked substitutes for each of a faculty member's booked slots.
+
+        Only slots on leave are considered when the member has leave this
+        week, otherwise all booked slots (optionally limited to `days`).
+        Candidates are ranked by shared expertise, then same department,
+        then remaining weekly load.
+        """
+        absent = self.positions.get(faculty_id)
+        if absent is None:
+            return []
+        member = self.members[absent]
+        affected = [self.bookings[assignment_id] for assignment_id in self.by_faculty[absent]]
+        if self.on_leave[absent]:
+            affected = [b for b in affected if self.on_leave[absent] >> b.slot & 1]
+        if days:
+            affected = [b for b in affected if self.slots[b.slot].day in days]
+        affected.sort(key=lambda b: (b.slot, b.course_code))
+
+        suggestions = []
+        for booking in affected:
+            slot = self.slots[booking.slot]
+            candidates = self.free[booking.slot] & ~(1 << absent)
+
+            wanted = set(member.tags) | {_tag(booking.course_code), _tag(booking.course_branch)}
+            overlap: Dict[int, int] = {}
+            for tag in wanted:
+                for f in iter_bits(candidates & self.tag_faculty.get(tag, 0)):
+                    overlap[f] = overlap.get(f, 0) + 1
+            same_department = self.department_faculty.get(_tag(member.department), 0)
+
+            ranked = []
+            for f in iter_bits(candidates):
+                if self.members[f].max_minutes:
+                    remaining = self.members[f].max_minutes - self.load_minutes[f]
+                    if remaining < booking.minutes:
+                        continue
+                else:
+                    # No maximum load set: never out of hours
+                    remaining = math.inf
+                ranked.append((-overlap.get(f, 0), -(same_department >> f & 1), -remaining, self.members[f].code, f))
+
+            suggestions.append({
+                "courseCode": booking.course_code,
+                "courseTitle": booking.course_title,
+                "roomNumber": booking.room_code,
+                "cohortKey": booking.cohort_key,
+                "timeSlot": {
+                    "day": slot.day,
+                    "startTime": slot.start_time,
+                    "endTime": slot.end_time,
+                    "slotIndex": slot.slot_index,
+                },
+                "candidates": [
+                    {
+                        "code": self.members[f].code,
+                        "name": self.members[f].name,
+                        "department": self.members[f].department,
+                        "expertiseOverlap": -score,
+                        "remainingHours": None if remaining == -math.inf else round(-remaining / 60, 2),
+                    }
+                    for score, _, remaining, _, f in heapq.nsmallest(limit, ranked)
+                ],
+            })
+        return suggestions
+
+
+async def build_substitute_index(db: AsyncSession, week_start: Optional[date] = None) -> SubstituteIndex:
+    week_start = week_start or current_week_start()
+
+    slot_rows = (await db.execute(select(TimeSlot))).scalars().all()
+    slots = sorted(
+        (
+            SlotInfo(s.id, DayOfWeek(s.day).value, s.start_time, s.end_time, s.slot_index, s.duration_minutes)
+            for s in slot_rows
+        ),
+        key=lambda s: (DAY_ORDER[s.day], s.slot_index),
+    )
+
+    faculty_rows = (await db.execute(select(Faculty).order_by(Faculty.code))).scalars().all()
+    members = [
+        _Member(
+            id=f.id,
+            code=f.code,
+            name=f.name,
+            department=f.department,
+            max_minutes=(f.max_load or 0) * 60,
+            tags=frozenset(_tag(t) for t in (f.expertise_tags or ())),
+        )
+        for f in faculty_rows
+    ]
+    availability = [availability_mask(f.availability_json, slots) for f in faculty_rows]
+    index = SubstituteIndex(slots, members, availability, week_start)
+
+    week_begin = datetime.combine(week_start, datetime.min.time(), tzinfo=timezone.utc)
+    leave_rows = (await db.execute(
+        select(FacultyLeave.faculty_id, FacultyLeave.start_date, FacultyLeave.end_date).where(
+            FacultyLeave.approved.is_(True),
+            FacultyLeave.start_date < week_begin + timedelta(days=7),
+            FacultyLeave.end_date >= week_begin,
+        )
+    )).all()
+    for faculty_id, start, end in leave_rows:
+        index.add_leave(faculty_id, start, end)
+
+    final_ids = (await db.execute(select(Timetable.id).where(Timetable.is_final.is_(True)))).scalars().all()
+    for timetable_id in final_ids:
+        index.add_timetable(timetable_id, await fetch_assignment_rows(db, timetable_id))
+    return index
+
+
+# Each API worker keeps its own index. A version counter in the shared cache
+# is incremented atomically by every write that affects it; a worker applies
+# its own write in place only when the write's version directly follows the
+# one its index is at, and rebuilds on its next lookup otherwise. Workers
+# only see each other's versions through Redis; the in-memory cache is per
+# process.
+VERSION_KEY = "substitutes:version"
+
+_index: Optional[SubstituteIndex] = None
+_index_version: Optional[int] = None
+_index_lock = asyncio.Lock()
+
+
+async def _shared_version() -> int:
+    cache = await get_cache()
+    return int(await cache.get(VERSION_KEY) or 0)
+
+
+async def get_substitute_index(db: AsyncSession) -> SubstituteIndex:
+    """The worker's index, rebuilt on first use, after another worker's writes and when the week rolls over"""
+    global _index, _index_version
+    version = await _shared_version()
+    if _index is None or version != _index_version or _index.week_start != current_week_start():
+        async with _index_lock:
+            # Read before building, so that writes made meanwhile trigger another rebuild
+            version = await _shared_version()
+            if _index is None or version != _index_version or _index.week_start != current_week_start():
+                _index = await build_substitute_index(db)
+                _index_version = version
+    return _index
+
+
+async def _advance() -> bool:
+    """Count a write; whether this worker's index saw every earlier one, so it can apply the write in place"""
+    global _index, _index_version
+    cache = await get_cache()
+    version = await cache.incr(VERSION_KEY)
+    if _index is not None and _index_version is not None and version == _index_version + 1:
+        _index_version = version
+        return True
+    _index = None
+    return False
+
+
+async def reset_substitute_index():
+    """Drop every worker's index, e.g. after faculty or time slots were re-imported"""
+    global _index
+    _index = None
+    cache = await get_cache()
+    await cache.incr(VERSION_KEY)
+
+
+async def timetables_published(db: AsyncSession, published: uuid.UUID, retired: Iterable[uuid.UUID] = ()):
+    """Swap retired final timetables for a newly published one in the index"""
+    rows = await fetch_assignment_rows(db, published) if _index is not None else []
+    if await _advance():
+        for timetable_id in retired:
+            _index.remove_timetable(timetable_id)
+        _index.add_timetable(published, rows)
+
+
+async def leave_recorded(faculty_id: uuid.UUID, start: datetime, end: datetime):
+    if await _advance():
+        _index.add_leave(faculty_id, start, end)
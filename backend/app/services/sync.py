@@ -0,0 +1,299 @@
+"""Compact timetable bundles for offline clients.
+
+A bundle names every course, room, faculty member and slot once, and lists
+sessions as index tuples into those tables:
+
+    {"format": 1, "version", "full": true,
+     "courses": [[code, title, type, branch]], "rooms": [code],
+     "faculty": [[shortName, name]], "slots": [[day, startTime, endTime, slotIndex]],
+     "sessions": [[course, slot, room, faculty]]}
+
+A delta bundle (`"full": false`, `"since"`) has the same tables, covering only
+what it mentions, plus `"replace"`: indexes of courses whose sessions the
+client drops and replaces with the bundle's.
+
+The version is `<timetable id>.<course set digest>`. Timetables never change
+once solved, so a version names one bundle, which is gzipped once and shared
+by every student with the same courses.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+import gzip
+import hashlib
+import json
+import logging
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.academic import Course, Enrollment, Student
+from app.models.scheduling import Scenario, Timetable
+from app.repositories.assignments import AssignmentRow, fetch_assignment_rows
+from app.services.student_timetables import current_student_timetable, final_key, timetable_prefix
+from app.services.timetable_diff import DiffError, get_delta
+from app.solver.problem import DAY_ORDER
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = 1
+
+
+def _course_digest(course_ids: Iterable[uuid.UUID]) -> str:
+    return hashlib.blake2b(b"".join(sorted(c.bytes for c in course_ids)), digest_size=8).hexdigest()
+
+
+def _token(timetable_id: uuid.UUID, digest: str) -> str:
+    return f"{timetable_id.hex}.{digest}"
+
+
+def _parse_token(token: str) -> Optional[Tuple[uuid.UUID, str]]:
+    timetable_hex, _, digest = token.partition(".")
+    try:
+        return uuid.UUID(hex=timetable_hex), digest
+    except ValueError:
+        return None
+
+
+def _pointer_key(enrollment_number: str) -> str:
+    return f"student:{enrollment_number}:sync"
+
+
+def _bundle_key(timetable_id: uuid.UUID, digest: str, since: Optional[uuid.UUID] = None) -> str:
+    key = f"{timetable_prefix(timetable_id)}sync:{digest}"
+    return f"{key}:since:{since.hex}" if since else key
+
+
+class _Tables:
+    """Interns courses, rooms, faculty and slots into index tables"""
+
+    def __init__(self):
+        self.courses: Dict[str, int] = {}
+        self.rooms: Dict[str, int] = {}
+        self.faculty: Dict[str, int] = {}
+        self.slots: Dict[tuple, int] = {}
+        self.rows = {"courses": [], "rooms": [], "faculty": [], "slots": []}
+
+    def _intern(self, table: str, key, row) -> int:
+        index = getattr(self, table).get(key)
+        if index is None:
+            index = getattr(self, table)[key] = len(self.rows[table])
+            self.rows[table].append(row)
+        return index
+
+    def course(self, code: str, title: str, course_type: str, branch: str) -> int:
+        return self._intern("courses", code, [code, title, course_type, branch])
+
+    def session(self, row: AssignmentRow) -> List[int]:
+        return [
+            self.course(row.course_code, row.course_title, row.course_type, row.course_branch),
+            self._intern("slots", (row.day, row.slot_index), [row.day, row.start_time, row.end_time, row.slot_index]),
+            self._intern("rooms", row.room_code, row.room_code),
+            self._intern("faculty", row.faculty_short_name, [row.faculty_short_name, row.faculty_name]),
+        ]
+
+
+def _sorted_rows(rows: Iterable[AssignmentRow]) -> List[AssignmentRow]:
+    return sorted(rows, key=lambda row: (DAY_ORDER[row.day], row.slot_index, row.course_code, row.room_code))
+
+
+def _compress(bundle: dict) -> bytes:
+    # mtime=0 keeps the bytes identical across builds of the same bundle
+    body = json.dumps(bundle, separators=(",", ":"), ensure_ascii=False).encode()
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+
+def full_bundle(version: Optional[str], rows: Iterable[AssignmentRow]) -> bytes:
+    """Gzipped bundle of every session in `rows`"""
+    tables = _Tables()
+    sessions = [tables.session(row) for row in _sorted_rows(rows)]
+    return _compress({"format": BUNDLE_FORMAT, "version": version, "full": True, **tables.rows, "sessions": sessions})
+
+
+def _pack_pointer(version: str, program: str, semester: int) -> bytes:
+    return json.dumps([version, program, semester]).encode()
+
+
+async def _delta_bundle(
+    db: AsyncSession,
+    changes: List[dict],
+    timetable_id: uuid.UUID,
+    course_ids: Iterable[uuid.UUID],
+    version: str,
+    since_version: str,
+) -> bytes:
+    """Gzipped delta for a set of courses, from a diff ending at `timetable_id`"""
+    changed = {uuid.UUID(change["courseId"]) for change in changes} & set(course_ids)
+
+    tables = _Tables()
+    replace = []
+    sessions = []
+    if changed:
+        for code, title, course_type, branch in await db.execute(
+            select(Course.code, Course.title, Course.type, Course.branch)
+            .where(Course.id.in_(changed))
+            .order_by(Course.code)
+        ):
+            replace.append(tables.course(code, title, getattr(course_type, "value", course_type), branch))
+        rows = await fetch_assignment_rows(db, timetable_id, course_ids=changed)
+        sessions = [tables.session(row) for row in _sorted_rows(rows)]
+    return _compress({
+        "format": BUNDLE_FORMAT, "version": version, "full": False, "since": since_version,
+        **tables.rows, "replace": replace, "sessions": sessions,
+    })
+
+
+def _served_key(timetable_id: uuid.UUID, digest: str, since: Optional[str]) -> Tuple[str, Optional[uuid.UUID]]:
+    """Cache key of the bundle answering `since`, and the timetable a delta starts from"""
+    previous = _parse_token(since) if since else None
+    if previous is not None and previous[1] == digest and previous[0] != timetable_id:
+        return _bundle_key(timetable_id, digest, since=previous[0]), previous[0]
+    return _bundle_key(timetable_id, digest), None
+
+
+async def get_sync_bundle(
+    db: AsyncSession,
+    enrollment_number: str,
+    since: Optional[str] = None,
+) -> Optional[Tuple[Optional[str], Optional[bytes]]]:
+    """(version, gzipped bundle) of a student's timetable, or None if unknown.
+
+    The bundle is None when `since` already is the current version. A
+    `since` of an earlier timetable with the same courses gets a delta
+    bundle, any other the full bundle. While the student's pointer is
+    cached, answering takes two cache reads and no queries.
+    """
+    cache = await get_cache()
+    pointer = await cache.get(_pointer_key(enrollment_number))
+    if pointer is not None:
+        version, program, semester = json.loads(pointer)
+        timetable_id, digest = _parse_token(version)
+        if since == version:
+            final, bundle = await cache.get(final_key(program, semester)), None
+        else:
+            final, bundle = await cache.get_many([
+                final_key(program, semester), _served_key(timetable_id, digest, since)[0],
+            ])
+        # The pointer is only trusted while it names the published timetable
+        if final is not None and final.decode() == timetable_id.hex:
+            if since == version:
+                return version, None
+            if bundle is not None:
+                return version, bundle
+
+    current = await current_student_timetable(db, enrollment_number)
+    if current is None:
+        return None
+    student, final, course_ids = current
+    if final is None:
+        return None, full_bundle(None, [])
+
+    timetable_id, _ = final
+    digest = _course_digest(course_ids)
+    version = _token(timetable_id, digest)
+    await cache.set_many(
+        {
+            final_key(student.program, student.semester): timetable_id.hex.encode(),
+            _pointer_key(enrollment_number): _pack_pointer(version, student.program, student.semester),
+        },
+        ttl=settings.TIMETABLE_CACHE_TTL_SECONDS,
+    )
+    if since == version:
+        return version, None
+
+    key, previous = _served_key(timetable_id, digest, since)
+    bundle = await cache.get(key)
+    if bundle is None and previous is not None:
+        try:
+            delta = await get_delta(db, previous, timetable_id)
+        except (LookupError, DiffError):
+            # Not a timetable of the same scenario; fall back to the full bundle
+            key = _bundle_key(timetable_id, digest)
+            bundle = await cache.get(key)
+        else:
+            bundle = await _delta_bundle(db, delta.changes, timetable_id, course_ids, version, _token(previous, digest))
+            await cache.set(key, bundle, ttl=settings.TIMETABLE_CACHE_TTL_SECONDS)
+    if bundle is None:
+        bundle = full_bundle(version, await fetch_assignment_rows(db, timetable_id, course_ids=course_ids))
+        await cache.set(key, bundle, ttl=settings.TIMETABLE_CACHE_TTL_SECONDS)
+    return version, bundle
+
+
+async def build_sync_bundles(db: AsyncSession, timetable_id: uuid.UUID, retired: Iterable[uuid.UUID] = ()) -> int:
+    """Prebuild bundles and pointers for every student of a final timetable.
+
+    One bundle per distinct course set, plus a delta from each retired
+    timetable, so clients reconnecting after a publication are served from
+    the cache. Returns the number of students written.
+    """
+    timetable = await db.get(Timetable, timetable_id)
+    scenario = await db.get(Scenario, timetable.scenario_id)
+
+    rows_by_course: Dict[uuid.UUID, List[AssignmentRow]] = {}
+    for row in await fetch_assignment_rows(db, timetable_id):
+        rows_by_course.setdefault(row.course_id, []).append(row)
+
+    students = (await db.execute(
+        select(Student.id, Student.enrollment_number)
+        .where(Student.program == scenario.program, Student.semester == scenario.semester)
+    )).all()
+    enrollments = (await db.execute(
+        select(Enrollment.student_id, Enrollment.course_id)
+        .join(Student, Student.id == Enrollment.student_id)
+        .where(Student.program == scenario.program, Enrollment.semester == scenario.semester)
+    )).all()
+    courses_by_student: Dict[uuid.UUID, set] = {}
+    for student_id, course_id in enrollments:
+        courses_by_student.setdefault(student_id, set()).add(course_id)
+
+    deltas = {}
+    for since in retired:
+        try:
+            deltas[since] = (await get_delta(db, since, timetable_id)).changes
+        except (LookupError, DiffError):
+            logger.exception("Could not diff %s -> %s for sync", since, timetable_id)
+
+    entries: Dict[str, bytes] = {}
+    digests: Dict[frozenset, str] = {}
+    for student_id, enrollment_number in students:
+        course_set = frozenset(courses_by_student.get(student_id, ()))
+        digest = digests.get(course_set)
+        if digest is None:
+            digest = digests[course_set] = _course_digest(course_set)
+            version = _token(timetable_id, digest)
+            entries[_bundle_key(timetable_id, digest)] = full_bundle(
+                version, (row for course_id in course_set for row in rows_by_course.get(course_id, ())),
+            )
+            for since, changes in deltas.items():
+                entries[_bundle_key(timetable_id, digest, since=since)] = await _delta_bundle(
+                    db, changes, timetable_id, course_set, version, _token(since, digest),
+                )
+        entries[_pointer_key(enrollment_number)] = _pack_pointer(
+            _token(timetable_id, digest), scenario.program, scenario.semester,
+        )
+
+    cache = await get_cache()
+    await cache.set_many(entries, ttl=settings.TIMETABLE_CACHE_TTL_SECONDS)
+    # Last, so clients only see the new timetable once its bundles are in place
+    await cache.set(
+        final_key(scenario.program, scenario.semester), timetable_id.hex.encode(),
+        ttl=settings.TIMETABLE_CACHE_TTL_SECONDS,
+    )
+    return len(students)
+
+
+async def publish_sync_bundles(timetable_id: uuid.UUID, retired: Iterable[uuid.UUID] = ()):
+    """Build a timetable's sync bundles in its own session, e.g. as a background task"""
+    try:
+        async with AsyncSessionLocal() as db:
+            await build_sync_bundles(db, timetable_id, list(retired))
+    except Exception:
+        logger.exception("Could not build sync bundles for %s", timetable_id)
+
+
+async def invalidate_sync(program: str, semester: int):
+    """Make the next sync of a program's students look up its published timetable again"""
+    cache = await get_cache()
+    await cache.delete(final_key(program, semester))
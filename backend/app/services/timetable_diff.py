@@ -0,0 +1,285 @@
+"""Compact diffs between timetables of the same scenario.
+
+A diff is a list of change records, with ids as strings. Sessions are
+identified by course, cohort and slot, as a cohort attends one session
+of a course per slot:
+
+    {"op": "change", "courseId", "cohortKey", "slotId", "set": {"slotId"?, "roomId"?, "facultyId"?}}
+    {"op": "add", "courseId", "cohortKey", "slotId", "roomId", "facultyId"}
+    {"op": "remove", "courseId", "cohortKey", "slotId"}
+
+`slotId` of a change is the session's slot before the change; `set` holds
+only the fields that differ.
+"""
+from collections import Counter, deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.models.academic import Course, DayOfWeek, Faculty, Room, TimeSlot
+from app.models.scheduling import Timetable, TimetableDelta
+from app.repositories.assignments import SessionKey, fetch_session_keys
+
+logger = logging.getLogger(__name__)
+
+# (slot, room, faculty) of one session of a course/cohort
+_Placement = Tuple[uuid.UUID, uuid.UUID, uuid.UUID]
+
+
+class DiffError(ValueError):
+    pass
+
+
+def _pair(old: List[_Placement], new: List[_Placement], same: Callable) -> List[Tuple[_Placement, _Placement]]:
+    pairs = []
+    for placement in list(new):
+        match = next((candidate for candidate in old if same(candidate, placement)), None)
+        if match is not None:
+            old.remove(match)
+            new.remove(placement)
+            pairs.append((match, placement))
+    return pairs
+
+
+def diff_sessions(before: Iterable[SessionKey], after: Iterable[SessionKey]) -> List[dict]:
+    """Change records turning `before` into `after`.
+
+    Within each course/cohort, sessions left in place are skipped; the rest
+    are paired up preferring the same slot, then the same room, then the
+    same faculty, so a change touches as few fields as possible.
+    """
+    groups: Dict[Tuple[uuid.UUID, str], Tuple[Counter, Counter]] = {}
+    for side, sessions in enumerate((before, after)):
+        for session in sessions:
+            key = (session.course_id, session.cohort_key)
+            groups.setdefault(key, (Counter(), Counter()))[side][
+                (session.slot_id, session.room_id, session.faculty_id)
+            ] += 1
+
+    changes = []
+    for (course_id, cohort_key), (old_counts, new_counts) in sorted(groups.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+        kept = old_counts & new_counts
+        old = sorted((old_counts - kept).elements(), key=str)
+        new = sorted((new_counts - kept).elements(), key=str)
+        base = {"courseId": str(course_id), "cohortKey": cohort_key}
+
+        pairs = []
+        for same in (
+            lambda a, b: a[0] == b[0],
+            lambda a, b: a[1] == b[1],
+            lambda a, b: a[2] == b[2],
+            lambda a, b: True,
+        ):
+            pairs += _pair(old, new, same)
+        for (slot, room, faculty), (new_slot, new_room, new_faculty) in pairs:
+            updates = {}
+            if new_slot != slot:
+                updates["slotId"] = str(new_slot)
+            if new_room != room:
+                updates["roomId"] = str(new_room)
+            if new_faculty != faculty:
+                updates["facultyId"] = str(new_faculty)
+            changes.append({"op": "change", **base, "slotId": str(slot), "set": updates})
+        for slot, _, _ in old:
+            changes.append({"op": "remove", **base, "slotId": str(slot)})
+        for slot, room, faculty in new:
+            changes.append({
+                "op": "add", **base, "slotId": str(slot), "roomId": str(room), "facultyId": str(faculty),
+            })
+    return changes
+
+
+def summarize(changes: List[dict]) -> dict:
+    summary = {"moved": 0, "roomChanged": 0, "facultyChanged": 0, "added": 0, "removed": 0}
+    for change in changes:
+        if change["op"] == "add":
+            summary["added"] += 1
+        elif change["op"] == "remove":
+            summary["removed"] += 1
+        else:
+            summary["moved"] += "slotId" in change["set"]
+            summary["roomChanged"] += "roomId" in change["set"]
+            summary["facultyChanged"] += "facultyId" in change["set"]
+    return summary
+
+
+def apply_changes(sessions: Iterable[SessionKey], changes: List[dict]) -> List[SessionKey]:
+    """Rebuild a timetable's sessions from a base and a diff.
+
+    Every session a diff removes or changes is taken out before any is put
+    back, so the order of records does not matter. Raises DiffError when the
+    diff was not made against these sessions.
+    """
+    index: Dict[Tuple[uuid.UUID, str, uuid.UUID], List[SessionKey]] = {}
+    for session in sessions:
+        index.setdefault((session.course_id, session.cohort_key, session.slot_id), []).append(session)
+
+    placed = []
+    for change in changes:
+        if change["op"] == "add":
+            placed.append(SessionKey(
+                uuid.UUID(change["courseId"]), change["cohortKey"], uuid.UUID(change["slotId"]),
+                uuid.UUID(change["roomId"]), uuid.UUID(change["facultyId"]),
+            ))
+            continue
+        key = (uuid.UUID(change["courseId"]), change["cohortKey"], uuid.UUID(change["slotId"]))
+        if not index.get(key):
+            raise DiffError(f"No session of {change['courseId']} for {change['cohortKey']} in slot {change['slotId']}")
+        session = index[key].pop()
+        if change["op"] == "change":
+            updates = {
+                field: uuid.UUID(change["set"][name])
+                for name, field in (("slotId", "slot_id"), ("roomId", "room_id"), ("facultyId", "faculty_id"))
+                if name in change["set"]
+            }
+            placed.append(session._replace(**updates))
+    return [session for remaining in index.values() for session in remaining] + placed
+
+
+async def _timetables(db: AsyncSession, *timetable_ids: uuid.UUID) -> Dict[uuid.UUID, Timetable]:
+    result = await db.execute(select(Timetable).where(Timetable.id.in_(timetable_ids)))
+    return {timetable.id: timetable for timetable in result.scalars()}
+
+
+async def get_delta(db: AsyncSession, from_id: uuid.UUID, to_id: uuid.UUID) -> TimetableDelta:
+    """The stored diff between two timetables, computed and stored on first use.
+
+    Raises LookupError for an unknown timetable and DiffError when the two
+    belong to different scenarios.
+    """
+    stored = (await db.execute(
+        select(TimetableDelta).where(
+            TimetableDelta.from_timetable_id == from_id, TimetableDelta.to_timetable_id == to_id,
+        )
+    )).scalar_one_or_none()
+    if stored is not None:
+        return stored
+
+    timetables = await _timetables(db, from_id, to_id)
+    for timetable_id in (from_id, to_id):
+        if timetable_id not in timetables:
+            raise LookupError(f"Timetable {timetable_id} not found")
+    if timetables[from_id].scenario_id != timetables[to_id].scenario_id:
+        raise DiffError("Timetables belong to different scenarios")
+
+    changes = diff_sessions(await fetch_session_keys(db, from_id), await fetch_session_keys(db, to_id))
+    delta = TimetableDelta(
+        scenario_id=timetables[to_id].scenario_id,
+        from_timetable_id=from_id,
+        to_timetable_id=to_id,
+        changes=changes,
+        summary=summarize(changes),
+    )
+    db.add(delta)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another request stored the same pair first
+        await db.rollback()
+        return (await db.execute(
+            select(TimetableDelta).where(
+                TimetableDelta.from_timetable_id == from_id, TimetableDelta.to_timetable_id == to_id,
+            )
+        )).scalar_one()
+    return delta
+
+
+async def store_delta(from_id: uuid.UUID, to_id: uuid.UUID):
+    """Precompute a diff in its own session, e.g. as a background task on publication"""
+    try:
+        async with AsyncSessionLocal() as db:
+            await get_delta(db, from_id, to_id)
+    except Exception:
+        logger.exception("Could not store diff %s -> %s", from_id, to_id)
+
+
+async def reconstruct_timetable(db: AsyncSession, base_id: uuid.UUID, target_id: uuid.UUID) -> List[SessionKey]:
+    """A timetable's sessions rebuilt from a base timetable and a chain of stored diffs.
+
+    Raises DiffError when no chain of stored diffs leads from base to target.
+    """
+    result = await db.execute(
+        select(TimetableDelta.from_timetable_id, TimetableDelta.to_timetable_id, TimetableDelta.id)
+        .join(Timetable, Timetable.id == TimetableDelta.to_timetable_id)
+        .where(Timetable.scenario_id == select(Timetable.scenario_id).where(Timetable.id == base_id).scalar_subquery())
+    )
+    edges: Dict[uuid.UUID, List[Tuple[uuid.UUID, uuid.UUID]]] = {}
+    for from_id, to_id, delta_id in result:
+        edges.setdefault(from_id, []).append((to_id, delta_id))
+
+    # Shortest chain of diffs, so as few as possible are loaded and applied
+    previous: Dict[uuid.UUID, Optional[Tuple[uuid.UUID, uuid.UUID]]] = {base_id: None}
+    queue = deque([base_id])
+    while queue and target_id not in previous:
+        current = queue.popleft()
+        for to_id, delta_id in edges.get(current, []):
+            if to_id not in previous:
+                previous[to_id] = (current, delta_id)
+                queue.append(to_id)
+    if target_id not in previous:
+        raise DiffError("No stored diffs lead from the base to the target timetable")
+
+    chain = []
+    node = target_id
+    while previous[node] is not None:
+        node, delta_id = previous[node]
+        chain.append(delta_id)
+    chain.reverse()
+    deltas = {}
+    if chain:
+        rows = await db.execute(select(TimetableDelta.id, TimetableDelta.changes).where(TimetableDelta.id.in_(chain)))
+        deltas = dict(rows.all())
+
+    sessions = await fetch_session_keys(db, base_id)
+    for delta_id in chain:
+        sessions = apply_changes(sessions, deltas[delta_id])
+    return sessions
+
+
+async def _references(db: AsyncSession, changes: List[dict]) -> dict:
+    """Codes and times of everything a diff refers to, each listed once"""
+    ids = {"courseId": set(), "slotId": set(), "roomId": set(), "facultyId": set()}
+    for change in changes:
+        for record in (change, change.get("set", {})):
+            for name, values in ids.items():
+                if name in record:
+                    values.add(uuid.UUID(record[name]))
+
+    references = {"courses": {}, "slots": {}, "rooms": {}, "faculty": {}}
+    if ids["courseId"]:
+        for course_id, code, title in await db.execute(
+            select(Course.id, Course.code, Course.title).where(Course.id.in_(ids["courseId"]))
+        ):
+            references["courses"][str(course_id)] = {"code": code, "title": title}
+    if ids["slotId"]:
+        for slot_id, day, start, end, index in await db.execute(
+            select(TimeSlot.id, TimeSlot.day, TimeSlot.start_time, TimeSlot.end_time, TimeSlot.slot_index)
+            .where(TimeSlot.id.in_(ids["slotId"]))
+        ):
+            references["slots"][str(slot_id)] = {
+                "day": DayOfWeek(day).value, "startTime": start, "endTime": end, "slotIndex": index,
+            }
+    if ids["roomId"]:
+        for room_id, code in await db.execute(select(Room.id, Room.code).where(Room.id.in_(ids["roomId"]))):
+            references["rooms"][str(room_id)] = {"code": code}
+    if ids["facultyId"]:
+        for faculty_id, code, name in await db.execute(
+            select(Faculty.id, Faculty.code, Faculty.name).where(Faculty.id.in_(ids["facultyId"]))
+        ):
+            references["faculty"][str(faculty_id)] = {"code": code, "name": name}
+    return references
+
+
+async def diff_payload(db: AsyncSession, delta: TimetableDelta) -> dict:
+    return {
+        "fromTimetableId": str(delta.from_timetable_id),
+        "toTimetableId": str(delta.to_timetable_id),
+        "summary": delta.summary,
+        "changes": delta.changes,
+        "references": await _references(db, delta.changes),
+    }
@@ -0,0 +1,446 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.schemas.constraint import ConstraintExpression
+
+logger = logging.getLogger(__name__)
+
+_expression_adapter = TypeAdapter(ConstraintExpression)
+
+
+@dataclass
+class Translation:
+    input: str
+    structured_constraint: Optional[dict]
+    confidence: float
+    explanation: str
+    backend: str
+    cached: bool = False
+    error: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "input": self.input,
+            "structuredConstraint": self.structured_constraint,
+            "confidence": self.confidence,
+            "explanation": self.explanation,
+            "backend": self.backend,
+            "cached": self.cached,
+            "error": self.error,
+        }
+
+
+def normalize(text: str) -> str:
+    """Cache key form of a sentence: case, spacing and end punctuation folded"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" .!;")
+
+
+def _checked(expression: Optional[dict]) -> Optional[dict]:
+    """A backend's expression validated against the constraint schema"""
+    if not expression:
+        return None
+    try:
+        parsed = _expression_adapter.validate_python(expression)
+    except ValidationError:
+        return None
+    return parsed.model_dump(exclude_defaults=True)
+
+
+def describe(expression: dict) -> str:
+    """Plain-English summary of a structured constraint"""
+    def window():
+        parts = []
+        day = expression.get("day")
+        if day:
+            parts.append("on " + (day if isinstance(day, str) else ", ".join(day)))
+        if expression.get("afterTime"):
+            parts.append(f"after {expression['afterTime']}")
+        if expression.get("beforeTime"):
+            parts.append(f"before {expression['beforeTime']}")
+        return " ".join(parts) or "at any time"
+
+    def scope():
+        scope = expression.get("scope") or {}
+        parts = []
+        for key, label in (("courseCodes", "courses"), ("facultyCodes", "faculty"),
+                           ("branches", "branches"), ("cohortKeys", "cohorts")):
+            if scope.get(key):
+                parts.append(f"{label} {', '.join(scope[key])}")
+        if scope.get("sessionKinds"):
+            parts.append(f"{' and '.join(scope['sessionKinds'])} sessions")
+        return f" for {'; '.join(parts)}" if parts else ""
+
+    kind = expression["type"]
+    if kind == "time_restriction":
+        return f"Prevents scheduling classes {window()}{scope()}"
+    if kind == "faculty_unavailable":
+        return f"Keeps {expression['facultyCode']} free {window()}"
+    if kind == "room_restriction":
+        verb = "only in" if expression.get("mode", "only") == "only" else "never in"
+        return f"Schedules sessions{scope()} {verb} {', '.join(expression['roomCodes'])}"
+    per = expression.get("per", "course")
+    return f"Allows at most {expression['maxSessions']} sessions per day per {per}{scope()}"
+
+
+class TranslationBackend(ABC):
+    """Turns batches of sentences into structured constraints"""
+    name = "base"
+    # Bump when the output for a given sentence may change, to retire cached results
+    version = 1
+    max_batch_size = 20
+
+    @abstractmethod
+    async def translate_batch(self, sentences: List[str]) -> List[Tuple[Optional[dict], float, str]]:
+        """(expression or None, confidence, explanation) per sentence, in order"""
+
+
+_DAYS = {
+    "monday": "Monday", "mon": "Monday", "tuesday": "Tuesday", "tue": "Tuesday", "tues": "Tuesday",
+    "wednesday": "Wednesday", "wed": "Wednesday", "thursday": "Thursday", "thu": "Thursday",
+    "thur": "Thursday", "thurs": "Thursday", "friday": "Friday", "fri": "Friday", "saturday": "Saturday", "sat": "Saturday",
+    "sunday": "Sunday", "sun": "Sunday",
+}
+_NUMBERS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "zero": 0}
+_TIME = r"(noon|midday|\d{1,2}(?::\d{2})?\s*(?:am|pm|a\.m\.|p\.m\.)?)"
+_CODE = r"[a-z]{1,6}-?\d{2,4}[a-z]?"
+
+
+def _time(text: str) -> Optional[str]:
+    if text in ("noon", "midday"):
+        return "12:00"
+    match = re.fullmatch(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?", text.strip())
+    if not match:
+        return None
+    hours, minutes, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem and meridiem.startswith("p") and hours < 12:
+        hours += 12
+    elif meridiem and meridiem.startswith("a") and hours == 12:
+        hours = 0
+    elif not meridiem and 1 <= hours <= 6:
+        # Bare "after 2" means the afternoon in a timetable
+        hours += 12
+    if hours > 23 or minutes > 59:
+        return None
+    return f"{hours:02d}:{minutes:02d}"
+
+
+class RuleBasedBackend(TranslationBackend):
+    """Deterministic pattern matcher for common phrasings, usable offline"""
+    name = "local"
+    max_batch_size = 1000
+
+    def _window(self, text: str) -> dict:
+        window = {}
+        days = []
+        if re.search(r"\bweekends?\b", text):
+            days += ["Saturday", "Sunday"]
+        if re.search(r"\bweekdays?\b", text):
+            days += ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+        for word in re.findall(r"\b([a-z]+?)s?\b", text):
+            if word in _DAYS and _DAYS[word] not in days:
+                days.append(_DAYS[word])
+        if days:
+            window["day"] = days[0] if len(days) == 1 else days
+        between = re.search(rf"\bbetween {_TIME} and {_TIME}", text)
+        if between:
+            window["afterTime"], window["beforeTime"] = _time(between.group(1)), _time(between.group(2))
+        else:
+            after = re.search(rf"\b(?:after|from) {_TIME}", text)
+            before = re.search(rf"\b(?:before|until|till) {_TIME}", text)
+            if after:
+                window["afterTime"] = _time(after.group(1))
+            if before:
+                window["beforeTime"] = _time(before.group(1))
+        if "afterTime" not in window and "beforeTime" not in window:
+            if re.search(r"\bmornings?\b", text):
+                window["beforeTime"] = "12:00"
+            elif re.search(r"\bafternoons?\b", text):
+                window["afterTime"] = "12:00"
+            elif re.search(r"\bevenings?\b", text):
+                window["afterTime"] = "17:00"
+        return {key: value for key, value in window.items() if value}
+
+    def _scope(self, text: str, exclude: Tuple[str, ...] = ()) -> dict:
+        scope = {}
+        faculty = [
+            code.upper() for code in re.findall(rf"\b(?:faculty|professor|prof|dr|teacher)\.? ({_CODE})\b", text)
+        ]
+        # Any other code-like token names a course
+        courses = [code.upper().replace("-", "") for code in re.findall(rf"\b({_CODE})\b", text)]
+        courses = [code for code in dict.fromkeys(courses) if code not in exclude and code not in faculty]
+        if courses:
+            scope["courseCodes"] = courses
+        if faculty:
+            scope["facultyCodes"] = list(dict.fromkeys(faculty))
+        branches = re.findall(r"\b([a-z]{2,5}) (?:branch|students|department)\b", text)
+        branches = [branch.upper() for branch in branches if branch not in ("all", "the", "any")]
+        if branches:
+            scope["branches"] = branches
+        if re.search(r"\b(?:labs?|practicals?)\b", text):
+            scope["sessionKinds"] = ["practical"]
+        elif re.search(r"\b(?:lectures?|theory)\b", text):
+            scope["sessionKinds"] = ["theory"]
+        return scope
+
+    def _parse(self, text: str) -> Optional[dict]:
+        limit = re.search(
+            r"\b(?:at most|no more than|max(?:imum)?(?: of)?|up to)\s+(\d+|[a-z]+)\s+"
+            r"(?:sessions?|classes|class|lectures?|periods?|labs?)\s+(?:a|per|each|in a)\s+day",
+            text,
+        )
+        if limit:
+            count = limit.group(1)
+            count = int(count) if count.isdigit() else _NUMBERS.get(count)
+            if count is None:
+                return None
+            per = "course"
+            if re.search(r"\b(?:faculty|teacher|professor|instructor)s?\b", text):
+                per = "faculty"
+            elif re.search(r"\b(?:cohort|batch|section|student group|students)s?\b", text):
+                per = "cohort"
+            return {"type": "max_sessions_per_day", "maxSessions": count, "per": per, "scope": self._scope(text)}
+
+        unavailable = re.search(
+            rf"\b(?:faculty |professor |prof\.? |dr\.? |teacher )?({_CODE}) (?:is )?"
+            r"(?:unavailable|not available|away|on leave|can(?:'|no)t teach|cannot teach)\b",
+            text,
+        )
+        if unavailable:
+            return {"type": "faculty_unavailable", "facultyCode": unavailable.group(1).upper(), **self._window(text)}
+
+        rooms = re.search(
+            r"\b(only|never|not)\b(?: be)?(?: scheduled)?(?: in| use)? (?:the )?(?:rooms?|labs?|halls?) "
+            rf"((?:{_CODE}|[a-z]+\d*)(?:(?:,\s*|\s+or\s+|\s+and\s+)(?:{_CODE}|[a-z]+\d*))*)",
+            text,
+        )
+        if rooms:
+            codes = [code.upper() for code in re.split(r",\s*|\s+or\s+|\s+and\s+", rooms.group(2))]
+            return {
+                "type": "room_restriction",
+                "roomCodes": codes,
+                "mode": "only" if rooms.group(1) == "only" else "never",
+                "scope": self._scope(text[:rooms.start()], exclude=tuple(codes)),
+            }
+
+        if re.search(r"\b(?:no|avoid|don'?t schedule|do not schedule)\b.*\b(?:class|classes|lectures?|sessions?|labs?|practicals?|teaching)\b", text):
+            window = self._window(text)
+            if not window:
+                return None
+            return {"type": "time_restriction", "restriction": "no_classes", **window, "scope": self._scope(text)}
+        return None
+
+    async def translate_batch(self, sentences: List[str]) -> List[Tuple[Optional[dict], float, str]]:
+        results = []
+        for sentence in sentences:
+            expression = _checked(self._parse(normalize(sentence)))
+            if expression is None:
+                results.append((None, 0.0, "No known constraint pattern matched this sentence"))
+            else:
+                results.append((expression, 0.9, describe(expression)))
+        return results
+
+
+_GEMINI_PROMPT = """Translate each timetable rule into one JSON constraint.
+Allowed constraint types (camelCase keys):
+- time_restriction: day (name or list), afterTime/beforeTime ("HH:MM"), scope
+- faculty_unavailable: facultyCode, day, afterTime, beforeTime
+- room_restriction: roomCodes (list), mode ("only" or "never"), scope
+- max_sessions_per_day: maxSessions, per ("course", "faculty" or "cohort"), scope
+scope may hold courseCodes, facultyCodes, branches, cohortKeys, sessionKinds ("theory", "practical").
+Answer with only a JSON array holding, for every rule in order, an object
+{"index": n, "constraint": {...} or null, "confidence": 0..1, "explanation": "..."}.
+
+Rules:
+"""
+
+
+class GeminiBackend(TranslationBackend):
+    """Google Gemini, one request per batch of sentences"""
+    name = "gemini"
+    # 2: sentences are sent as written, so codes keep their case
+    version = 2
+
+    def __init__(self, api_key: str, model: str):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self._model = genai.GenerativeModel(model)
+
+    def _generate(self, prompt: str) -> str:
+        return self._model.generate_content(prompt).text
+
+    async def translate_batch(self, sentences: List[str]) -> List[Tuple[Optional[dict], float, str]]:
+        prompt = _GEMINI_PROMPT + "\n".join(f"{index}. {sentence}" for index, sentence in enumerate(sentences))
+        # The client library is synchronous, so keep it off the event loop
+        text = await asyncio.to_thread(self._generate, prompt)
+        text = re.sub(r"^```(?:json)?|```$", "", text.strip()).strip()
+        answers = {item.get("index"): item for item in json.loads(text) if isinstance(item, dict)}
+
+        results = []
+        for index in range(len(sentences)):
+            answer = answers.get(index, {})
+            expression = _checked(answer.get("constraint"))
+            if expression is None:
+                results.append((None, 0.0, answer.get("explanation") or "The model returned no valid constraint"))
+            else:
+                confidence = min(max(float(answer.get("confidence") or 0), 0.0), 1.0)
+                results.append((expression, confidence, answer.get("explanation") or describe(expression)))
+        return results
+
+
+class TranslationService:
+    """Batched translation with an in-process LRU in front of the shared cache.
+
+    Sentences are deduplicated by their normalized form, looked up in the
+    LRU and then the shared cache in one round trip, and only the misses
+    are sent to the backend, in batches, at most `max_concurrency` batches
+    at a time. Identical sentences already being translated by another
+    request wait for that result instead of being sent again.
+    """
+
+    def __init__(self, backend: TranslationBackend, max_concurrency: int, timeout_seconds: float,
+                 memory_entries: int = 2048):
+        self.backend = backend
+        self._timeout = timeout_seconds
+        self._limit = asyncio.Semaphore(max_concurrency)
+        self._memory_entries = memory_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _key(self, normalized: str) -> str:
+        digest = hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
+        return f"nl:{self.backend.name}:v{self.backend.version}:{digest}"
+
+    def _remember(self, key: str, value: tuple):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
+
+    async def _run_batch(self, batch: List[Tuple[str, str]], futures: Dict[str, asyncio.Future]):
+        try:
+            async with self._limit:
+                results = await asyncio.wait_for(
+                    self.backend.translate_batch([sentence for _, sentence in batch]),
+                    timeout=self._timeout,
+                )
+        except Exception as exc:
+            error = "Translation timed out" if isinstance(exc, asyncio.TimeoutError) else str(exc)
+            logger.warning("Translation batch of %d failed: %s", len(batch), error)
+            for key, _ in batch:
+                futures[key].set_exception(RuntimeError(error))
+            return
+
+        cache_entries = {}
+        for (key, _), result in zip(batch, results):
+            self._remember(key, result)
+            cache_entries[key] = json.dumps(result).encode()
+            futures[key].set_result(result)
+        try:
+            cache = await get_cache()
+            await cache.set_many(cache_entries, ttl=settings.NL_CACHE_TTL_SECONDS)
+        except Exception:
+            logger.exception("Could not store translations")
+
+    async def translate(self, sentences: List[str]) -> List[Translation]:
+        keys = [self._key(normalize(sentence)) for sentence in sentences]
+        found: Dict[str, tuple] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+
+        missing = []
+        for key in dict.fromkeys(keys):
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                found[key] = self._memory[key]
+            elif key in self._inflight:
+                waiting[key] = self._inflight[key]
+            else:
+                missing.append(key)
+
+        if missing:
+            cache = await get_cache()
+            for key, packed in zip(missing, await cache.get_many(missing)):
+                if packed is not None:
+                    found[key] = tuple(json.loads(packed))
+                    self._remember(key, found[key])
+
+        # The backend gets the first sentence of each key as written: case-folded
+        # text would come back with lower-case course and faculty codes
+        text_by_key = {}
+        for key, sentence in zip(keys, sentences):
+            text_by_key.setdefault(key, " ".join(sentence.split()))
+        todo = [(key, text_by_key[key]) for key in missing if key not in found]
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for key, _ in todo:
+            futures[key] = self._inflight[key] = waiting[key] = loop.create_future()
+        size = self.backend.max_batch_size
+        batches = [
+            asyncio.create_task(self._run_batch(todo[start:start + size], futures))
+            for start in range(0, len(todo), size)
+        ]
+        try:
+            await asyncio.gather(*batches)
+            outcomes = await asyncio.gather(*waiting.values(), return_exceptions=True)
+        finally:
+            for key, future in futures.items():
+                self._inflight.pop(key, None)
+                if not future.done():
+                    # Cancelled mid-batch; release anyone else waiting on it
+                    future.set_exception(RuntimeError("Translation cancelled"))
+        resolved = dict(zip(waiting, outcomes))
+
+        translations = []
+        for sentence, key in zip(sentences, keys):
+            if key in found:
+                expression, confidence, explanation = found[key]
+                translations.append(Translation(sentence, expression, confidence, explanation,
+                                                self.backend.name, cached=True))
+            elif isinstance(resolved[key], Exception):
+                translations.append(Translation(sentence, None, 0.0, "", self.backend.name,
+                                                error=str(resolved[key])))
+            else:
+                expression, confidence, explanation = resolved[key]
+                translations.append(Translation(sentence, expression, confidence, explanation, self.backend.name))
+        return translations
+
+
+_service: Optional[TranslationService] = None
+
+
+def _make_backend() -> TranslationBackend:
+    choice = settings.NL_TRANSLATION_BACKEND
+    if choice == "gemini" or (choice == "auto" and settings.GEMINI_API_KEY):
+        try:
+            return GeminiBackend(settings.GEMINI_API_KEY, settings.GEMINI_MODEL)
+        except Exception as exc:
+            if choice == "gemini":
+                raise
+            logger.warning("Gemini unavailable (%s), using the local translation backend", exc)
+    return RuleBasedBackend()
+
+
+def get_translation_service() -> TranslationService:
+    global _service
+    if _service is None:
+        _service = TranslationService(
+            _make_backend(),
+            max_concurrency=settings.NL_MAX_CONCURRENT_REQUESTS,
+            timeout_seconds=settings.NL_REQUEST_TIMEOUT_SECONDS,
+            memory_entries=settings.NL_MEMORY_CACHE_ENTRIES,
+        )
+    return _service
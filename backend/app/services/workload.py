@@ -0,0 +1,116 @@
+from typing import Dict, List, Optional
+import hashlib
+import json
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.models.academic import DayOfWeek, TimeSlot
+from app.models.scheduling import Timetable
+from app.repositories.assignments import fetch_faculty_load
+from app.solver.problem import DAY_ORDER, SlotInfo, availability_mask
+
+WORKLOAD_PREFIX = "workload:"
+
+
+def _workload_key(timetable_ids: List[uuid.UUID]) -> str:
+    # Assignments of a timetable never change, so its id set names the result
+    digest = hashlib.blake2b(b"".join(sorted(t.bytes for t in timetable_ids)), digest_size=12).hexdigest()
+    return f"{WORKLOAD_PREFIX}{digest}"
+
+
+async def _load_slots(db: AsyncSession) -> List[SlotInfo]:
+    slot_rows = (await db.execute(select(TimeSlot))).scalars().all()
+    return sorted(
+        (
+            SlotInfo(s.id, DayOfWeek(s.day).value, s.start_time, s.end_time, s.slot_index, s.duration_minutes)
+            for s in slot_rows
+        ),
+        key=lambda slot: (DAY_ORDER[slot.day], slot.slot_index),
+    )
+
+
+async def _compute_summary(db: AsyncSession, timetable_ids: List[uuid.UUID]) -> List[dict]:
+    slots = await _load_slots(db)
+    summary = []
+    for row in await fetch_faculty_load(db, timetable_ids):
+        hours = row.minutes / 60
+        available = bin(availability_mask(row.availability_json, slots)).count("1")
+        summary.append({
+            "code": row.code,
+            "name": row.name,
+            "department": row.department,
+            "sessions": row.sessions,
+            "courses": row.courses,
+            "totalHours": round(hours, 2),
+            "maxHours": row.max_load,
+            "headroomHours": round(row.max_load - hours, 2) if row.max_load else None,
+            "overloaded": bool(row.max_load) and hours > row.max_load,
+            "busySlots": row.busy_slots,
+            "freeSlots": max(available - row.busy_slots, 0),
+            "availableSlots": available,
+        })
+    return summary
+
+
+async def workload_summary(db: AsyncSession, timetable_id: Optional[uuid.UUID] = None) -> List[dict]:
+    """Workload of every faculty member in one timetable, or across the published ones.
+
+    Computed with one grouped query over all faculty and cached by the set
+    of timetables it covers.
+    """
+    if timetable_id is None:
+        timetable_ids = list((await db.execute(
+            select(Timetable.id).where(Timetable.is_final.is_(True))
+        )).scalars().all())
+    else:
+        timetable_ids = [timetable_id]
+
+    cache = await get_cache()
+    key = _workload_key(timetable_ids)
+    cached = await cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
+    summary = await _compute_summary(db, timetable_ids)
+    await cache.set(key, json.dumps(summary).encode(), ttl=settings.TIMETABLE_CACHE_TTL_SECONDS)
+    return summary
+
+
+def department_report(summary: List[dict], department: Optional[str] = None) -> dict:
+    """Per-department totals of a workload summary"""
+    departments: Dict[str, dict] = {}
+    for entry in summary:
+        if department is not None and entry["department"] != department:
+            continue
+        totals = departments.setdefault(entry["department"], {
+            "department": entry["department"],
+            "facultyCount": 0,
+            "totalHours": 0.0,
+            "capacityHours": 0,
+            "overloaded": [],
+            "unassigned": [],
+            "faculty": [],
+        })
+        totals["facultyCount"] += 1
+        totals["totalHours"] += entry["totalHours"]
+        totals["capacityHours"] += entry["maxHours"] or 0
+        if entry["overloaded"]:
+            totals["overloaded"].append(entry["code"])
+        if not entry["sessions"]:
+            totals["unassigned"].append(entry["code"])
+        totals["faculty"].append(entry)
+
+    for totals in departments.values():
+        totals["totalHours"] = round(totals["totalHours"], 2)
+        capacity = totals["capacityHours"]
+        totals["utilization"] = round(totals["totalHours"] / capacity, 3) if capacity else None
+    return {"departments": list(departments.values())}
+
+
+async def invalidate_workload() -> int:
+    """Drop cached summaries, e.g. after faculty loads or availability change"""
+    cache = await get_cache()
+    return await cache.delete_prefix(WORKLOAD_PREFIX)
@@ -0,0 +1,91 @@
+from collections import deque
+from typing import Dict, Optional, Set
+import asyncio
+import json
+
+
+class Subscription:
+    """Per-client buffer of serialized progress messages.
+
+    The buffer is bounded: when a slow client falls behind, the oldest
+    messages are dropped so the newest status always gets through and the
+    publisher never waits on a client.
+    """
+
+    def __init__(self, broadcaster: "ProgressBroadcaster", job_id: str, max_pending: int):
+        self._broadcaster = broadcaster
+        self.job_id = job_id
+        self._pending = deque(maxlen=max_pending)
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.dropped = 0
+
+    def push(self, message: str):
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append(message)
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Next message, or None once the job has finished and the buffer is drained.
+
+        Raises asyncio.TimeoutError when nothing arrives within `timeout`.
+        """
+        while not self._pending:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        return self._pending.popleft()
+
+    def unsubscribe(self):
+        self._broadcaster.unsubscribe(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.unsubscribe()
+
+
+class ProgressBroadcaster:
+    """Fan solver job status out to WebSocket/SSE subscribers.
+
+    Each status change is serialized to JSON once and the same string is
+    handed to every subscriber of the job.
+    """
+
+    def __init__(self, max_pending: int = 32):
+        self._max_pending = max_pending
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, job_id: str) -> Subscription:
+        subscription = Subscription(self, job_id, self._max_pending)
+        self._subscribers.setdefault(job_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.job_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.job_id]
+
+    def subscriber_count(self, job_id: str) -> int:
+        return len(self._subscribers.get(job_id, ()))
+
+    def publish(self, job_id: str, status: dict, final: bool = False):
+        subscribers = self._subscribers.get(job_id)
+        if not subscribers:
+            return
+        message = json.dumps(status, default=str)
+        for subscription in subscribers:
+            subscription.push(message)
+            if final:
+                subscription.close()
+        if final:
+            del self._subscribers[job_id]
@@ -0,0 +1,326 @@
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+import uuid
+
+from ortools.sat.python import cp_model
+
+from app.solver.problem import Problem, THEORY_ROOM_TYPES, PRACTICAL_ROOM_TYPES
+from app.solver.rules import SOFT_PENALTY_SCALE, compile_rules
+
+
+def iter_bits(mask: int):
+    """Yield the indices of set bits in ascending order"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def lowest_bits(mask: int, count: int) -> int:
+    """Keep only the `count` lowest set bits of a mask"""
+    kept = 0
+    for _ in range(count):
+        if not mask:
+            break
+        low = mask & -mask
+        kept |= low
+        mask ^= low
+    return kept
+
+
+@dataclass
+class BuiltModel:
+    """CP-SAT model plus the indexes needed to read a solution back"""
+    model: cp_model.CpModel
+    # (unit index, slot index, room index, literal) for every created variable
+    variables: List[Tuple[int, int, int, cp_model.IntVar]]
+    course_slot: Dict[Tuple[uuid.UUID, int], cp_model.IntVar]
+    unit_slot_masks: List[int]
+    unit_room_masks: List[int]
+    stats: Dict[str, int] = field(default_factory=dict)
+    warnings: List[str] = field(default_factory=list)
+    # Sessions left unplaced per unit, only when the builder allows it
+    unplaced: Dict[int, cp_model.IntVar] = field(default_factory=dict)
+    unit_courses: List[uuid.UUID] = field(default_factory=list)
+    unit_sessions: List[int] = field(default_factory=list)
+    # Enforcement literals by (kind, key), only when the builder guards
+    # constraints: ("rule", constraint id), ("sessions", unit), ("maxLoad", faculty)
+    guards: Dict[Tuple[str, object], cp_model.IntVar] = field(default_factory=dict)
+
+    def add_hint(self, placements: Iterable[Tuple[int, int, int]]):
+        """Warm-start the search from known (unit, slot, room) placements"""
+        chosen = set(placements)
+        placed: Dict[int, int] = {}
+        busy = set()
+        for u, s, r, var in self.variables:
+            hinted = (u, s, r) in chosen
+            self.model.AddHint(var, hinted)
+            if hinted:
+                placed[u] = placed.get(u, 0) + 1
+                busy.add((self.unit_courses[u], s))
+        # A complete hint lets the search start from a full solution
+        for key, literal in self.course_slot.items():
+            self.model.AddHint(literal, key in busy)
+        for u, missing in self.unplaced.items():
+            self.model.AddHint(missing, max(0, self.unit_sessions[u] - placed.get(u, 0)))
+
+
+class ModelBuilder:
+    """Build a CP-SAT model over pruned (unit, slot, room) triples.
+
+    Slots and rooms are indexed by position in the problem lists, and every
+    domain is an int bitset over those positions. A unit only gets variables
+    for slots its faculty member can teach in and for the best-fitting rooms
+    of the right type and capacity, instead of the full cross-product.
+    """
+
+    def __init__(self, problem: Problem, max_rooms_per_unit: int = 8, guarded: bool = False):
+        self.problem = problem
+        self.max_rooms_per_unit = max_rooms_per_unit
+        # Guarded models enforce hard rules, session counts and faculty loads
+        # only under assumption literals, so infeasibility can be explained
+        self.guarded = guarded
+        self._capacities = [room.capacity for room in problem.rooms]
+        self._type_masks = {
+            "theory": self._rooms_mask(THEORY_ROOM_TYPES),
+            "practical": self._rooms_mask(PRACTICAL_ROOM_TYPES),
+        }
+        # Extra per-unit slot restrictions, e.g. from compiled ruleset constraints
+        self.slot_filters: List[int] = [problem.all_slots_mask] * len(problem.units)
+        # Slots in which a room cannot be used at all, by room index
+        self.room_blocks: Dict[int, int] = {}
+        # Units pinned to exact (slot, room) pairs, e.g. the untouched part of a repair
+        self.fixed: Dict[int, FrozenSet[Tuple[int, int]]] = {}
+        # Placements to keep where possible; any other placement of the unit
+        # costs `move_penalty` on top of the wasted seats
+        self.preferred: Dict[int, FrozenSet[Tuple[int, int]]] = {}
+        self.move_penalty = 0
+        # When set, sessions may stay unplaced at this cost each instead of
+        # making the model infeasible
+        self.unplaced_penalty = None
+
+        # Ruleset constraints: hard slot/room bans shrink the domains up front,
+        # soft ones become per-placement costs
+        self.rules = compile_rules(problem)
+        self._rule_slot_blocks: Dict[int, int] = {}
+        self._rule_room_blocks: Dict[int, int] = {}
+        self._slot_costs: Dict[int, Dict[int, int]] = {}
+        self._room_costs: Dict[int, Dict[int, int]] = {}
+        for rule in self.rules.rules:
+            hard = rule.kind == "hard"
+            if hard and guarded:
+                # Posted as guarded constraints in build() instead
+                continue
+            cost = rule.weight * SOFT_PENALTY_SCALE
+            for u, mask in rule.forbidden_slots.items():
+                if hard:
+                    self._rule_slot_blocks[u] = self._rule_slot_blocks.get(u, 0) | mask
+                else:
+                    costs = self._slot_costs.setdefault(u, {})
+                    for s in iter_bits(mask):
+                        costs[s] = costs.get(s, 0) + cost
+            for u, mask in rule.forbidden_rooms.items():
+                if hard:
+                    self._rule_room_blocks[u] = self._rule_room_blocks.get(u, 0) | mask
+                else:
+                    costs = self._room_costs.setdefault(u, {})
+                    for r in iter_bits(mask):
+                        costs[r] = costs.get(r, 0) + cost
+
+    def _rooms_mask(self, room_types) -> int:
+        mask = 0
+        for index, room in enumerate(self.problem.rooms):
+            if room.type in room_types:
+                mask |= 1 << index
+        return mask
+
+    def eligible_rooms(self, unit_index: int) -> int:
+        """Every allowed room of a suitable type that seats the unit"""
+        unit = self.problem.units[unit_index]
+        # Rooms are sorted by capacity, so "large enough" is a suffix of the list
+        first_fit = bisect_left(self._capacities, unit.size)
+        capacity_mask = ((1 << len(self._capacities)) - 1) >> first_fit << first_fit
+        return self._type_masks[unit.kind] & capacity_mask & ~self._rule_room_blocks.get(unit_index, 0)
+
+    def room_mask(self, unit_index: int) -> int:
+        """Eligible rooms, tightest fit first"""
+        return lowest_bits(self.eligible_rooms(unit_index), self.max_rooms_per_unit)
+
+    def slot_mask(self, unit_index: int) -> int:
+        unit = self.problem.units[unit_index]
+        return (
+            self.problem.faculty[unit.faculty_index].slot_mask
+            & self.slot_filters[unit_index]
+            & ~self._rule_slot_blocks.get(unit_index, 0)
+        )
+
+    def build(self) -> BuiltModel:
+        problem = self.problem
+        model = cp_model.CpModel()
+        variables = []
+        warnings = []
+
+        unit_slot_masks = []
+        unit_room_masks = []
+        by_unit: Dict[int, List[cp_model.IntVar]] = {}
+        by_room_slot: Dict[Tuple[int, int], List[cp_model.IntVar]] = {}
+        by_course_slot: Dict[Tuple[uuid.UUID, int], List[cp_model.IntVar]] = {}
+        waste_vars = []
+        waste_coeffs = []
+        guards = {}
+
+        def guard(key, name):
+            if key not in guards:
+                guards[key] = model.NewBoolVar(f"assume_{name}")
+            return guards[key]
+
+        for u, unit in enumerate(problem.units):
+            slots = self.slot_mask(u)
+            rooms = self.room_mask(u)
+            unit_slot_masks.append(slots)
+            unit_room_masks.append(rooms)
+
+            if u in self.fixed:
+                pairs = sorted(self.fixed[u])
+            else:
+                if bin(slots).count("1") < unit.sessions or not rooms:
+                    warnings.append(f"{unit.code} ({unit.kind}) has no feasible slot/room domain")
+                room_indices = list(iter_bits(rooms))
+                pairs = [(s, r) for s in iter_bits(slots) for r in room_indices]
+
+            preferred = self.preferred.get(u)
+            slot_costs = self._slot_costs.get(u, {})
+            room_costs = self._room_costs.get(u, {})
+            if preferred and u not in self.fixed:
+                # Keeping a current placement is allowed even outside the pruned room domain
+                known = set(pairs)
+                eligible = self.eligible_rooms(u)
+                pairs.extend(
+                    (s, r) for s, r in sorted(preferred)
+                    if slots >> s & 1 and eligible >> r & 1 and (s, r) not in known
+                )
+            for s, r in pairs:
+                if self.room_blocks.get(r, 0) >> s & 1:
+                    continue
+                var = model.NewBoolVar(f"x_{u}_{s}_{r}")
+                variables.append((u, s, r, var))
+                by_unit.setdefault(u, []).append(var)
+                by_room_slot.setdefault((r, s), []).append(var)
+                by_course_slot.setdefault((unit.course_id, s), []).append(var)
+                cost = problem.rooms[r].capacity - unit.size + slot_costs.get(s, 0) + room_costs.get(r, 0)
+                if preferred is not None and (s, r) not in preferred:
+                    cost += self.move_penalty
+                if cost:
+                    waste_vars.append(var)
+                    waste_coeffs.append(cost)
+
+        # Every unit gets exactly its weekly number of sessions
+        unplaced = {}
+        for u, unit in enumerate(problem.units):
+            placed = cp_model.LinearExpr.Sum(by_unit.get(u, []))
+            if self.guarded:
+                model.Add(placed == unit.sessions).OnlyEnforceIf(guard(("sessions", u), f"sessions_{u}"))
+            elif self.unplaced_penalty is None:
+                model.Add(placed == unit.sessions)
+            else:
+                missing = model.NewIntVar(0, unit.sessions, f"unplaced_{u}")
+                model.Add(placed + missing == unit.sessions)
+                unplaced[u] = missing
+                waste_vars.append(missing)
+                waste_coeffs.append(self.unplaced_penalty)
+
+        # A room hosts at most one session per slot
+        for literals in by_room_slot.values():
+            if len(literals) > 1:
+                model.AddAtMostOne(literals)
+
+        # A course meets at most once per slot; busy literals feed the
+        # faculty and student-group constraints below
+        course_slot = {}
+        for key, literals in by_course_slot.items():
+            busy = model.NewBoolVar(f"busy_{key[0].hex[:8]}_{key[1]}")
+            model.Add(cp_model.LinearExpr.Sum(literals) == busy)
+            course_slot[key] = busy
+
+        slot_count = len(problem.slots)
+        faculty_courses: Dict[int, set] = {}
+        for unit in problem.units:
+            faculty_courses.setdefault(unit.faculty_index, set()).add(unit.course_id)
+
+        for f, courses in faculty_courses.items():
+            load_vars = []
+            load_minutes = []
+            for s in range(slot_count):
+                literals = [course_slot[(c, s)] for c in courses if (c, s) in course_slot]
+                if len(literals) > 1:
+                    model.AddAtMostOne(literals)
+                load_vars.extend(literals)
+                load_minutes.extend([problem.slots[s].duration_minutes] * len(literals))
+            max_load = problem.faculty[f].max_load
+            if max_load and load_vars:
+                load = model.Add(cp_model.LinearExpr.WeightedSum(load_vars, load_minutes) <= max_load * 60)
+                if self.guarded:
+                    load.OnlyEnforceIf(guard(("maxLoad", f), f"max_load_{f}"))
+
+        # Hard slot/room bans that were not folded into the domains
+        for rule in self.rules.rules:
+            if not self.guarded or rule.kind != "hard":
+                continue
+            if not rule.forbidden_slots and not rule.forbidden_rooms:
+                continue
+            literal = guard(("rule", rule.constraint_id), f"rule_{rule.constraint_id}")
+            for u, s, r, var in variables:
+                if rule.forbidden_slots.get(u, 0) >> s & 1 or rule.forbidden_rooms.get(u, 0) >> r & 1:
+                    model.AddImplication(literal, var.Not())
+
+        # Per-day session limits from the ruleset
+        for rule in self.rules.rules:
+            for units, day_mask, limit in rule.day_limits:
+                courses = {problem.units[u].course_id for u in units}
+                literals = [
+                    course_slot[(c, s)] for c in courses for s in iter_bits(day_mask) if (c, s) in course_slot
+                ]
+                if len(literals) <= limit:
+                    continue
+                if rule.kind == "hard":
+                    limited = model.Add(cp_model.LinearExpr.Sum(literals) <= limit)
+                    if self.guarded:
+                        limited.OnlyEnforceIf(guard(("rule", rule.constraint_id), f"rule_{rule.constraint_id}"))
+                else:
+                    excess = model.NewIntVar(0, len(literals) - limit, f"excess_{rule.constraint_id}")
+                    model.Add(cp_model.LinearExpr.Sum(literals) - excess <= limit)
+                    waste_vars.append(excess)
+                    waste_coeffs.append(rule.weight * SOFT_PENALTY_SCALE)
+
+        # Students taking several courses cannot be in two places at once
+        for group in problem.student_groups:
+            for s in range(slot_count):
+                literals = [course_slot[(c, s)] for c in group if (c, s) in course_slot]
+                if len(literals) > 1:
+                    model.AddAtMostOne(literals)
+
+        if waste_vars:
+            model.Minimize(cp_model.LinearExpr.WeightedSum(waste_vars, waste_coeffs))
+
+        warnings.extend(f"Constraint {e['constraintId']}: {e['error']}" for e in self.rules.errors)
+        stats = {
+            "rules": len(self.rules.rules),
+            "units": len(problem.units),
+            "variables": len(variables),
+            "fullCrossProduct": len(problem.units) * len(problem.slots) * len(problem.rooms),
+            "courseSlotLiterals": len(course_slot),
+        }
+        return BuiltModel(
+            model=model,
+            variables=variables,
+            course_slot=course_slot,
+            unit_slot_masks=unit_slot_masks,
+            unit_room_masks=unit_room_masks,
+            stats=stats,
+            warnings=warnings,
+            unplaced=unplaced,
+            unit_courses=[unit.course_id for unit in problem.units],
+            unit_sessions=[unit.sessions for unit in problem.units],
+            guards=guards,
+        )
@@ -0,0 +1,220 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+import re
+import time
+import uuid
+
+from ortools.sat.python import cp_model
+from sqlalchemy import insert
+
+from app.models.scheduling import Scenario, ScenarioStatus, Timetable, Assignment
+from app.solver.builder import ModelBuilder
+from app.solver.problem import Problem
+
+
+ProgressCallback = Callable[[dict], None]
+StopCheck = Callable[[], bool]
+
+_BOUND_LINE = re.compile(r"^#Bound\s+\S+\s+best:\S+\s+next:\[(-?[\d.e+]+),")
+_SOLUTION_LINE = re.compile(r"^#\d+\s+\S+\s+best:\S+\s+next:\S+\s+(\S+)")
+
+
+@dataclass
+class SolveOptions:
+    time_limit_seconds: float = 60.0
+    num_workers: int = 8
+    max_rooms_per_unit: int = 8
+    random_seed: int = 0
+
+
+@dataclass
+class SolveResult:
+    status: str
+    objective: Optional[float]
+    bound: Optional[float]
+    wall_time: float
+    # (unit index, slot index, room index) of every placed session
+    placements: List[Tuple[int, int, int]] = field(default_factory=list)
+    stats: Dict[str, object] = field(default_factory=dict)
+
+    @property
+    def feasible(self) -> bool:
+        return self.status in ("OPTIMAL", "FEASIBLE")
+
+
+class _SolutionReporter(cp_model.CpSolverSolutionCallback):
+    """Forward each improving solution to a progress callback"""
+
+    def __init__(self, on_progress: ProgressCallback, should_stop: Optional[StopCheck] = None):
+        super().__init__()
+        self._on_progress = on_progress
+        self._should_stop = should_stop
+        self.solutions = 0
+        self.first_solution_seconds: Optional[float] = None
+
+    def on_solution_callback(self):
+        self.solutions += 1
+        if self.first_solution_seconds is None:
+            self.first_solution_seconds = self.WallTime()
+        if self._should_stop is not None and self._should_stop():
+            self.StopSearch()
+        self._on_progress({
+            "event": "solution",
+            "solutions": self.solutions,
+            "objective": self.ObjectiveValue(),
+            "bound": self.BestObjectiveBound(),
+            "wallTime": self.WallTime(),
+        })
+
+
+class _SearchLogMonitor:
+    """Derive the current solver stage and bound from CP-SAT search log lines.
+
+    The log callback is the only hook that fires during presolve and between
+    solutions, so it also doubles as the cancellation check.
+    """
+
+    def __init__(self, solver: cp_model.CpSolver, on_progress: ProgressCallback, should_stop: Optional[StopCheck]):
+        self._solver = solver
+        self._on_progress = on_progress
+        self._should_stop = should_stop
+        self._stopped = False
+        self.stage = None
+
+    def _set_stage(self, stage: str):
+        if stage != self.stage:
+            self.stage = stage
+            self._on_progress({"event": "stage", "stage": stage})
+
+    def __call__(self, line: str):
+        if self._should_stop is not None and not self._stopped and self._should_stop():
+            self._stopped = True
+            self._solver.StopSearch()
+
+        if line.startswith("Starting presolve"):
+            self._set_stage("presolve")
+        elif line.startswith("Starting search"):
+            self._set_stage("search")
+        elif line.startswith("#Bound"):
+            match = _BOUND_LINE.match(line)
+            if match:
+                self._on_progress({"event": "bound", "bound": float(match.group(1))})
+        elif line.startswith("#Done") or line.startswith("CpSolverResponse"):
+            self._set_stage("finalizing")
+        else:
+            match = _SOLUTION_LINE.match(line)
+            if match:
+                self._set_stage("LNS" if "lns" in match.group(1) else "search")
+
+
+def solve_problem(
+    problem: Problem,
+    options: SolveOptions,
+    on_progress: Optional[ProgressCallback] = None,
+    should_stop: Optional[StopCheck] = None,
+) -> SolveResult:
+    """Build and solve the CP-SAT model for a problem snapshot.
+
+    This is a pure function of its arguments so it can run in a worker
+    thread or process. `on_progress` receives stage, bound and incumbent
+    events; `should_stop` is polled to cancel the search early.
+    """
+    started = time.perf_counter()
+    builder = ModelBuilder(problem, max_rooms_per_unit=options.max_rooms_per_unit)
+    built = builder.build()
+    build_seconds = time.perf_counter() - started
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = options.time_limit_seconds
+    solver.parameters.num_workers = options.num_workers
+    solver.parameters.random_seed = options.random_seed
+
+    if on_progress is not None:
+        on_progress({"event": "model_built", **built.stats, "buildSeconds": build_seconds})
+        solver.parameters.log_search_progress = True
+        solver.parameters.log_to_stdout = False
+        solver.log_callback = _SearchLogMonitor(solver, on_progress, should_stop)
+        reporter = _SolutionReporter(on_progress, should_stop)
+        status = solver.Solve(built.model, reporter)
+        first_solution_seconds = reporter.first_solution_seconds
+    else:
+        status = solver.Solve(built.model)
+        first_solution_seconds = None
+
+    status_name = solver.StatusName(status)
+    placements = []
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        placements = [(u, s, r) for u, s, r, var in built.variables if solver.BooleanValue(var)]
+
+    has_objective = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    stats = {
+        **built.stats,
+        "status": status_name,
+        "buildSeconds": round(build_seconds, 3),
+        "solveSeconds": round(solver.WallTime(), 3),
+        "firstSolutionSeconds": round(first_solution_seconds, 3) if first_solution_seconds is not None else None,
+        "conflicts": solver.NumConflicts(),
+        "branches": solver.NumBranches(),
+        "numWorkers": options.num_workers,
+        "warnings": problem.warnings + built.warnings,
+    }
+    return SolveResult(
+        status=status_name,
+        objective=solver.ObjectiveValue() if has_objective else None,
+        bound=solver.BestObjectiveBound() if has_objective else None,
+        wall_time=time.perf_counter() - started,
+        placements=placements,
+        stats=stats,
+    )
+
+
+def placement_rows(problem: Problem, placements: List[Tuple[int, int, int]], timetable_id: uuid.UUID) -> List[dict]:
+    """Turn solver placements into Assignment insert rows"""
+    rows = []
+    for u, s, r in placements:
+        unit = problem.units[u]
+        rows.append({
+            "id": uuid.uuid4(),
+            "timetable_id": timetable_id,
+            "course_id": unit.course_id,
+            "slot_id": problem.slots[s].id,
+            "room_id": problem.rooms[r].id,
+            "faculty_id": problem.faculty[unit.faculty_index].id,
+            "cohort_key": unit.cohort_key,
+        })
+    return rows
+
+
+async def persist_result(db, problem: Problem, result: SolveResult) -> Optional[Timetable]:
+    """Store a solve as Timetable + Assignment rows and update the scenario"""
+    scenario = await db.get(Scenario, problem.scenario_id)
+    timetable = None
+
+    if result.feasible:
+        timetable = Timetable(
+            scenario_id=scenario.id,
+            objective_score=result.objective or 0.0,
+            solve_time_seconds=int(round(result.wall_time)),
+        )
+        db.add(timetable)
+        await db.flush()
+
+        rows = placement_rows(problem, result.placements, timetable.id)
+        if rows:
+            await db.execute(insert(Assignment), rows)
+
+        scenario.status = ScenarioStatus.READY
+        scenario.objective_score = result.objective
+    else:
+        scenario.status = ScenarioStatus.FAILED
+
+    scenario.solve_metadata = {
+        **result.stats,
+        "objective": result.objective,
+        "bound": result.bound,
+        "wallTime": round(result.wall_time, 3),
+        "timetableId": str(timetable.id) if timetable else None,
+    }
+    await db.commit()
+    return timetable
+
@@ -0,0 +1,447 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, Optional
+import asyncio
+import enum
+import json
+import logging
+import multiprocessing
+import threading
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import SOLVER_JOBS, SOLVER_PHASE_SECONDS
+from app.models.scheduling import Scenario, ScenarioStatus
+from app.services.audit import audit
+from app.services.dashboard import invalidate_dashboard_stats
+from app.solver.broadcast import ProgressBroadcaster, Subscription
+from app.solver.engine import SolveOptions, SolveResult, solve_problem, persist_result
+from app.solver.problem import Problem, load_problem
+
+logger = logging.getLogger(__name__)
+
+
+class JobState(str, enum.Enum):
+    QUEUED = "queued"
+    LOADING = "loading"
+    SOLVING = "solving"
+    PERSISTING = "persisting"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATES = {JobState.COMPLETED, JobState.FAILED, JobState.CANCELLED}
+
+
+class JobStatusStore:
+    """Latest known status of each solver job, keyed by job id.
+
+    Finished jobs are kept around for status lookups, up to `max_finished`.
+    Every change is pushed to the broadcaster's subscribers, if any.
+    """
+
+    def __init__(self, max_finished: int = 500, broadcaster: Optional[ProgressBroadcaster] = None):
+        self._jobs: Dict[str, dict] = {}
+        self._max_finished = max_finished
+        self.broadcaster = broadcaster
+
+    def create(self, job_id: str, **fields) -> dict:
+        self._jobs[job_id] = {
+            "jobId": job_id,
+            "status": JobState.QUEUED.value,
+            "stage": None,
+            "objective": None,
+            "bound": None,
+            "gap": None,
+            "solutions": 0,
+            "timetableId": None,
+            "error": None,
+            "startedAt": None,
+            "timeLimit": None,
+            **fields,
+        }
+        return self._jobs[job_id]
+
+    def update(self, job_id: str, **fields) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job.update(fields)
+        if job["objective"] is not None and job["bound"] is not None:
+            job["gap"] = abs(job["objective"] - job["bound"]) / max(1.0, abs(job["objective"]))
+        finished = fields.get("status") in {state.value for state in FINISHED_STATES}
+        if finished:
+            job["finishedAt"] = time.monotonic()
+        if self.broadcaster is not None:
+            self.broadcaster.publish(job_id, self.get(job_id), final=finished)
+        if finished:
+            self._evict()
+        return job
+
+    def apply_event(self, job_id: str, event: dict) -> Optional[dict]:
+        """Merge a progress event emitted by solve_problem"""
+        kind = event.get("event")
+        fields = {}
+        if kind == "stage":
+            fields["stage"] = event["stage"]
+        elif kind == "bound":
+            fields["bound"] = event["bound"]
+        elif kind == "solution":
+            fields.update(objective=event["objective"], bound=event["bound"], solutions=event["solutions"])
+        elif kind == "model_built":
+            fields["variables"] = event.get("variables")
+
+        return self.update(job_id, **fields)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Status snapshot with progress and time estimate filled in"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        snapshot = {key: value for key, value in job.items() if key not in ("startedAt", "finishedAt")}
+        state = JobState(job["status"])
+        if state in FINISHED_STATES:
+            snapshot.update(progress=100, estimatedTimeRemaining=0)
+        elif job["startedAt"] is None:
+            snapshot.update(progress=0, estimatedTimeRemaining=job["timeLimit"])
+        else:
+            elapsed = time.monotonic() - job["startedAt"]
+            limit = job["timeLimit"] or 1
+            snapshot.update(
+                progress=min(99, int(elapsed / limit * 100)),
+                estimatedTimeRemaining=max(0, int(limit - elapsed)),
+            )
+        return snapshot
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self._jobs.items() if "finishedAt" in job]
+        if len(finished) > self._max_finished:
+            finished.sort(key=lambda job_id: self._jobs[job_id]["finishedAt"])
+            for job_id in finished[:len(finished) - self._max_finished]:
+                del self._jobs[job_id]
+
+
+class _CoreBudget:
+    """Share a fixed number of CP-SAT workers between concurrent jobs"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.available = total
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, count: int):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.available >= count)
+            self.available -= count
+
+    async def release(self, count: int):
+        async with self._condition:
+            self.available += count
+            self._condition.notify_all()
+
+
+@dataclass
+class SolverJob:
+    id: str
+    scenario_id: uuid.UUID
+    options: SolveOptions
+    cancel_event: object = None
+    task: Optional[asyncio.Task] = None
+
+
+def _throttled(check, interval: float = 0.25):
+    """Wrap a stop check so it is evaluated at most once per interval"""
+    state = {"at": 0.0, "value": False}
+
+    def wrapper():
+        now = time.monotonic()
+        if not state["value"] and now - state["at"] >= interval:
+            state["at"] = now
+            state["value"] = bool(check())
+        return state["value"]
+
+    return wrapper
+
+
+class BaseJobRunner(ABC):
+    """Schedule solver jobs: load in the API process, solve elsewhere, persist.
+
+    Subclasses decide where `solve_problem` actually runs.
+    """
+
+    def __init__(self, store: JobStatusStore, cpu_budget: int, max_concurrent_jobs: int):
+        self.store = store
+        self._budget = None
+        self._cpu_budget = cpu_budget
+        self._slots = None
+        self._max_concurrent_jobs = max_concurrent_jobs
+        self._jobs: Dict[str, SolverJob] = {}
+
+    def _ensure_started(self):
+        # asyncio primitives must be created inside the running loop
+        if self._budget is None:
+            self._budget = _CoreBudget(self._cpu_budget)
+            self._slots = asyncio.Semaphore(self._max_concurrent_jobs)
+
+    def _new_cancel_event(self):
+        return threading.Event()
+
+    @property
+    def cpu_budget(self) -> int:
+        return self._cpu_budget
+
+    @asynccontextmanager
+    async def reserve_cores(self, count: int):
+        """Hold CP-SAT workers from the shared budget for work outside a job"""
+        self._ensure_started()
+        count = max(1, min(count, self._cpu_budget))
+        await self._budget.acquire(count)
+        try:
+            yield count
+        finally:
+            await self._budget.release(count)
+
+    async def submit(self, scenario_id: uuid.UUID, options: SolveOptions) -> str:
+        self._ensure_started()
+        options.num_workers = max(1, min(options.num_workers, self._cpu_budget))
+        options.time_limit_seconds = min(options.time_limit_seconds, settings.SOLVER_MAX_TIME_LIMIT_SECONDS)
+
+        job = SolverJob(
+            id=f"job_{uuid.uuid4().hex[:12]}",
+            scenario_id=scenario_id,
+            options=options,
+            cancel_event=self._new_cancel_event(),
+        )
+        self._jobs[job.id] = job
+        self.store.create(
+            job.id,
+            scenarioId=str(scenario_id),
+            timeLimit=options.time_limit_seconds,
+            numWorkers=options.num_workers,
+        )
+        job.task = asyncio.create_task(self._run(job))
+        return job.id
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        job.cancel_event.set()
+        status = self.store.get(job_id)
+        if status and status["status"] == JobState.QUEUED.value and job.task is not None:
+            job.task.cancel()
+        return True
+
+    def status(self, job_id: str) -> Optional[dict]:
+        return self.store.get(job_id)
+
+    def subscribe(self, job_id: str) -> Optional[Subscription]:
+        """Subscribe to a job's status stream, starting with its current status"""
+        status = self.store.get(job_id)
+        if status is None or self.store.broadcaster is None:
+            return None
+        subscription = self.store.broadcaster.subscribe(job_id)
+        subscription.push(json.dumps(status, default=str))
+        if JobState(status["status"]) in FINISHED_STATES:
+            subscription.close()
+            subscription.unsubscribe()
+        return subscription
+
+    async def _run(self, job: SolverJob):
+        workers = job.options.num_workers
+        acquired = False
+        try:
+            async with self._slots:
+                await self._budget.acquire(workers)
+                acquired = True
+                await self._run_job(job)
+        except asyncio.CancelledError:
+            self.store.update(job.id, status=JobState.CANCELLED.value, stage=None)
+            await self._set_scenario_status(job.scenario_id, ScenarioStatus.DRAFT)
+        except Exception as exc:
+            logger.exception("Solver job %s failed", job.id)
+            self.store.update(job.id, status=JobState.FAILED.value, stage=None, error=str(exc))
+            await self._set_scenario_status(job.scenario_id, ScenarioStatus.FAILED)
+        finally:
+            if acquired:
+                await self._budget.release(workers)
+            self._jobs.pop(job.id, None)
+
+    async def _run_job(self, job: SolverJob):
+        self.store.update(job.id, status=JobState.LOADING.value, stage="loading")
+        with SOLVER_PHASE_SECONDS.time(phase="load"):
+            async with AsyncSessionLocal() as db:
+                scenario = await db.get(Scenario, job.scenario_id)
+                if scenario is None:
+                    raise LookupError(f"Scenario {job.scenario_id} not found")
+                scenario.status = ScenarioStatus.SOLVING
+                await db.commit()
+                problem = await load_problem(db, job.scenario_id)
+
+        if job.cancel_event.is_set():
+            raise asyncio.CancelledError()
+
+        self.store.update(job.id, status=JobState.SOLVING.value, stage="model", startedAt=time.monotonic())
+        result = await self._execute(job, problem)
+
+        if job.cancel_event.is_set():
+            raise asyncio.CancelledError()
+
+        # Build and search run in the worker; their timings come back with the result
+        for phase, stat in (("build", "buildSeconds"), ("search", "solveSeconds"), ("first_solution", "firstSolutionSeconds")):
+            if result.stats.get(stat) is not None:
+                SOLVER_PHASE_SECONDS.observe(result.stats[stat], phase=phase)
+        SOLVER_JOBS.inc(status=result.status)
+
+        self.store.update(job.id, status=JobState.PERSISTING.value, stage="persisting")
+        with SOLVER_PHASE_SECONDS.time(phase="persist"):
+            async with AsyncSessionLocal() as db:
+                timetable = await persist_result(db, problem, result)
+        await invalidate_dashboard_stats()
+        audit(
+            "solve.completed" if timetable else "solve.failed", None, "scenario", job.scenario_id,
+            jobId=job.id, status=result.status, objective=result.objective,
+            timetableId=timetable.id if timetable else None,
+        )
+
+        self.store.update(
+            job.id,
+            status=JobState.COMPLETED.value if timetable else JobState.FAILED.value,
+            stage=None,
+            objective=result.objective,
+            bound=result.bound,
+            timetableId=str(timetable.id) if timetable else None,
+            error=None if timetable else f"Solver finished with status {result.status}",
+        )
+
+    @abstractmethod
+    async def _execute(self, job: SolverJob, problem: Problem) -> SolveResult:
+        """Run solve_problem for the job, applying its progress events to the store"""
+
+    async def _set_scenario_status(self, scenario_id: uuid.UUID, status: ScenarioStatus):
+        try:
+            async with AsyncSessionLocal() as db:
+                scenario = await db.get(Scenario, scenario_id)
+                if scenario is not None:
+                    scenario.status = status
+                    await db.commit()
+        except Exception:
+            logger.exception("Could not update scenario %s status", scenario_id)
+
+    async def shutdown(self):
+        for job in list(self._jobs.values()):
+            job.cancel_event.set()
+        tasks = [job.task for job in self._jobs.values() if job.task is not None]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class InlineJobRunner(BaseJobRunner):
+    """Run solves on a thread of the API process; the stand-in for tests and local dev"""
+
+    async def _execute(self, job: SolverJob, problem: Problem) -> SolveResult:
+        loop = asyncio.get_running_loop()
+
+        def report(event):
+            loop.call_soon_threadsafe(self.store.apply_event, job.id, event)
+
+        return await asyncio.to_thread(
+            solve_problem, problem, job.options, report, job.cancel_event.is_set
+        )
+
+
+def _solve_in_subprocess(problem: Problem, options: SolveOptions, job_id: str, events, cancel_event) -> SolveResult:
+    def report(event):
+        events.put((job_id, event))
+
+    return solve_problem(problem, options, report, _throttled(cancel_event.is_set))
+
+
+class ProcessJobRunner(BaseJobRunner):
+    """Run solves in a separate process pool so the API event loop never blocks.
+
+    Progress events travel back over a manager queue and are applied to the
+    status store from a single pump thread.
+    """
+
+    def __init__(self, store: JobStatusStore, cpu_budget: int, max_concurrent_jobs: int):
+        super().__init__(store, cpu_budget, max_concurrent_jobs)
+        self._context = multiprocessing.get_context("spawn")
+        self._manager = None
+        self._events = None
+        self._pool = None
+        self._pump = None
+        self._loop = None
+
+    def _ensure_started(self):
+        super()._ensure_started()
+        if self._manager is None:
+            self._loop = asyncio.get_running_loop()
+            self._manager = self._context.Manager()
+            self._events = self._manager.Queue()
+            self._pool = ProcessPoolExecutor(max_workers=self._max_concurrent_jobs, mp_context=self._context)
+            self._pump = threading.Thread(target=self._pump_events, name="solver-progress", daemon=True)
+            self._pump.start()
+
+    def _new_cancel_event(self):
+        return self._manager.Event()
+
+    def _pump_events(self):
+        while True:
+            try:
+                item = self._events.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            job_id, event = item
+            self._loop.call_soon_threadsafe(self.store.apply_event, job_id, event)
+
+    async def _execute(self, job: SolverJob, problem: Problem) -> SolveResult:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._pool, _solve_in_subprocess, problem, job.options, job.id, self._events, job.cancel_event
+            )
+        except BrokenProcessPool:
+            # A crashed worker poisons the pool; replace it for later jobs
+            self._pool = ProcessPoolExecutor(max_workers=self._max_concurrent_jobs, mp_context=self._context)
+            raise
+
+    async def shutdown(self):
+        await super().shutdown()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        if self._events is not None:
+            self._events.put(None)
+        if self._manager is not None:
+            self._manager.shutdown()
+
+
+_runner: Optional[BaseJobRunner] = None
+
+
+def get_job_runner() -> BaseJobRunner:
+    global _runner
+    if _runner is None:
+        runner_class = InlineJobRunner if settings.SOLVER_EXECUTOR == "inline" else ProcessJobRunner
+        _runner = runner_class(
+            JobStatusStore(broadcaster=ProgressBroadcaster()),
+            cpu_budget=settings.SOLVER_CPU_BUDGET,
+            max_concurrent_jobs=settings.SOLVER_MAX_CONCURRENT_JOBS,
+        )
+    return _runner
+
+
+async def shutdown_job_runner():
+    global _runner
+    if _runner is not None:
+        await _runner.shutdown()
+        _runner = None
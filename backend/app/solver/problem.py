@@ -0,0 +1,289 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.academic import (
+    Course, Room, TimeSlot, Faculty, Enrollment, Student, FacultyLeave, RoomType, DayOfWeek
+)
+from app.models.scheduling import Scenario, Ruleset, RulesetConstraint, Constraint
+
+
+DAY_ORDER = {day.value: index for index, day in enumerate(DayOfWeek)}
+
+# Room types a session may be placed in, by session kind
+THEORY_ROOM_TYPES = frozenset({RoomType.CLASS.value, RoomType.SEMINAR.value, RoomType.AUDITORIUM.value})
+PRACTICAL_ROOM_TYPES = frozenset({RoomType.LAB.value})
+
+
+def cohort_key_for(program: str, semester: int, branch: str) -> str:
+    """Key identifying the student group a course unit is taught to"""
+    return f"{program}-S{semester}-{branch}"
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+@dataclass(frozen=True)
+class SlotInfo:
+    id: uuid.UUID
+    day: str
+    start_time: str
+    end_time: str
+    slot_index: int
+    duration_minutes: int
+
+
+@dataclass(frozen=True)
+class RoomInfo:
+    id: uuid.UUID
+    code: str
+    type: str
+    capacity: int
+
+
+@dataclass(frozen=True)
+class FacultyInfo:
+    id: uuid.UUID
+    code: str
+    department: str
+    max_load: int
+    expertise_tags: Tuple[str, ...]
+    # Bitset over problem slot indices the faculty member can teach in
+    slot_mask: int
+
+
+@dataclass(frozen=True)
+class CourseUnit:
+    """One schedulable demand: a course taught as theory or practical sessions"""
+    course_id: uuid.UUID
+    code: str
+    kind: str  # theory, practical
+    sessions: int
+    size: int
+    cohort_key: str
+    faculty_index: int
+
+
+@dataclass
+class Problem:
+    """Plain, picklable snapshot of everything the solver needs for a scenario"""
+    scenario_id: uuid.UUID
+    slots: List[SlotInfo]
+    rooms: List[RoomInfo]
+    faculty: List[FacultyInfo]
+    units: List[CourseUnit]
+    # Distinct sets of course ids taken together by at least one student
+    student_groups: List[Tuple[uuid.UUID, ...]]
+    constraints: List[dict] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def all_slots_mask(self) -> int:
+        return (1 << len(self.slots)) - 1
+
+
+def availability_mask(availability: Optional[dict], slots: List[SlotInfo]) -> int:
+    """Translate Faculty.availability_json into a slot bitset.
+
+    An empty value means always available. Otherwise keys are day names and
+    values list either slot indexes or "HH:MM-HH:MM" ranges; days that are
+    not listed are unavailable.
+    """
+    if not availability:
+        return (1 << len(slots)) - 1
+
+    mask = 0
+    for bit, slot in enumerate(slots):
+        for entry in availability.get(slot.day, []):
+            if isinstance(entry, int):
+                allowed = entry == slot.slot_index
+            else:
+                start, _, end = str(entry).partition("-")
+                allowed = (
+                    _minutes(start) <= _minutes(slot.start_time)
+                    and _minutes(slot.end_time) <= _minutes(end)
+                )
+            if allowed:
+                mask |= 1 << bit
+                break
+    return mask
+
+
+def current_week_start() -> date:
+    """Monday of the current week, the default planning week"""
+    today = datetime.now(timezone.utc).date()
+    return today - timedelta(days=today.weekday())
+
+
+def leave_mask(leaves: List[Tuple[datetime, datetime]], slots: List[SlotInfo], week_start: date) -> int:
+    """Bitset of slots blocked by approved leave overlapping the planning week"""
+    week_days = [week_start + timedelta(days=offset) for offset in range(7)]
+    blocked_days = set()
+    for start, end in leaves:
+        for day in week_days:
+            if start.date() <= day <= end.date():
+                blocked_days.add(DayOfWeek(day.strftime("%A")).value)
+
+    mask = 0
+    for bit, slot in enumerate(slots):
+        if slot.day in blocked_days:
+            mask |= 1 << bit
+    return mask
+
+
+def _pick_faculty(course: Course, faculty: List[FacultyInfo], hours: int, load: List[int]) -> Optional[int]:
+    """Choose the least loaded qualified faculty member for a course.
+
+    Qualification is matched on expertise tags (course code, then branch),
+    falling back to department == branch.
+    """
+    candidates = [i for i, f in enumerate(faculty) if course.code in f.expertise_tags]
+    if not candidates:
+        candidates = [i for i, f in enumerate(faculty) if course.branch in f.expertise_tags]
+    if not candidates:
+        candidates = [i for i, f in enumerate(faculty) if f.department == course.branch]
+    if not candidates:
+        return None
+
+    fitting = [i for i in candidates if load[i] + hours <= faculty[i].max_load] or candidates
+    return min(fitting, key=lambda i: (load[i], faculty[i].code))
+
+
+async def load_problem(
+    db: AsyncSession,
+    scenario_id: uuid.UUID,
+    week_start: Optional[date] = None,
+) -> Problem:
+    """Load a scenario and its academic data into a solver Problem"""
+    scenario = await db.get(Scenario, scenario_id)
+    if scenario is None:
+        raise LookupError(f"Scenario {scenario_id} not found")
+
+    week_start = week_start or current_week_start()
+
+    slot_rows = (await db.execute(select(TimeSlot))).scalars().all()
+    slots = sorted(
+        (
+            SlotInfo(s.id, DayOfWeek(s.day).value, s.start_time, s.end_time, s.slot_index, s.duration_minutes)
+            for s in slot_rows
+        ),
+        key=lambda s: (DAY_ORDER[s.day], s.slot_index),
+    )
+
+    room_rows = (await db.execute(select(Room))).scalars().all()
+    rooms = sorted(
+        (RoomInfo(r.id, r.code, RoomType(r.type).value, r.capacity) for r in room_rows),
+        key=lambda r: (r.capacity, r.code),
+    )
+
+    week_end = datetime.combine(week_start + timedelta(days=7), datetime.min.time(), tzinfo=timezone.utc)
+    week_begin = datetime.combine(week_start, datetime.min.time(), tzinfo=timezone.utc)
+    leave_rows = (await db.execute(
+        select(FacultyLeave.faculty_id, FacultyLeave.start_date, FacultyLeave.end_date).where(
+            FacultyLeave.approved.is_(True),
+            FacultyLeave.start_date < week_end,
+            FacultyLeave.end_date >= week_begin,
+        )
+    )).all()
+    leaves: Dict[uuid.UUID, List[Tuple[datetime, datetime]]] = {}
+    for faculty_id, start, end in leave_rows:
+        leaves.setdefault(faculty_id, []).append((start, end))
+
+    faculty_rows = (await db.execute(select(Faculty).order_by(Faculty.code))).scalars().all()
+    faculty = [
+        FacultyInfo(
+            id=f.id,
+            code=f.code,
+            department=f.department,
+            max_load=f.max_load or 0,
+            expertise_tags=tuple(f.expertise_tags or ()),
+            slot_mask=availability_mask(f.availability_json, slots)
+            & ~leave_mask(leaves.get(f.id, []), slots, week_start),
+        )
+        for f in faculty_rows
+    ]
+
+    enrollment_rows = (await db.execute(
+        select(Enrollment.student_id, Enrollment.course_id, Student.branch)
+        .join(Student, Student.id == Enrollment.student_id)
+        .where(Student.program == scenario.program, Enrollment.semester == scenario.semester)
+    )).all()
+
+    course_sizes: Dict[uuid.UUID, int] = {}
+    course_branches: Dict[uuid.UUID, Dict[str, int]] = {}
+    student_courses: Dict[uuid.UUID, set] = {}
+    for student_id, course_id, branch in enrollment_rows:
+        course_sizes[course_id] = course_sizes.get(course_id, 0) + 1
+        branches = course_branches.setdefault(course_id, {})
+        branches[branch] = branches.get(branch, 0) + 1
+        student_courses.setdefault(student_id, set()).add(course_id)
+
+    course_rows = []
+    if course_sizes:
+        course_rows = (await db.execute(
+            select(Course).where(Course.id.in_(list(course_sizes))).order_by(Course.code)
+        )).scalars().all()
+
+    units: List[CourseUnit] = []
+    warnings: List[str] = []
+    load = [0] * len(faculty)
+    for course in course_rows:
+        theory = course.hours_theory or 0
+        practical = course.hours_practical or 0
+        if course.has_lab and practical == 0:
+            practical = 1
+        faculty_index = _pick_faculty(course, faculty, theory + practical, load)
+        if faculty_index is None:
+            warnings.append(f"No qualified faculty for course {course.code}")
+            continue
+        load[faculty_index] += theory + practical
+
+        branches = course_branches[course.id]
+        branch = max(branches, key=lambda b: (branches[b], b))
+        cohort_key = cohort_key_for(scenario.program, scenario.semester, branch)
+        for kind, sessions in (("theory", theory), ("practical", practical)):
+            if sessions:
+                units.append(CourseUnit(
+                    course_id=course.id,
+                    code=course.code,
+                    kind=kind,
+                    sessions=sessions,
+                    size=course_sizes[course.id],
+                    cohort_key=cohort_key,
+                    faculty_index=faculty_index,
+                ))
+
+    student_groups = sorted({tuple(sorted(courses, key=str)) for courses in student_courses.values() if len(courses) > 1})
+
+    constraint_rows = (await db.execute(
+        select(Constraint)
+        .join(RulesetConstraint, RulesetConstraint.constraint_id == Constraint.id)
+        .join(Ruleset, Ruleset.id == RulesetConstraint.ruleset_id)
+        .where(Ruleset.id == scenario.ruleset_id, Constraint.active.is_(True))
+    )).scalars().all()
+    constraints = [
+        {
+            "id": str(c.id),
+            "kind": c.kind.value if hasattr(c.kind, "value") else c.kind,
+            "weight": 1 if c.weight is None else c.weight,
+            "expression": c.expression_json,
+        }
+        for c in constraint_rows
+    ]
+
+    return Problem(
+        scenario_id=scenario.id,
+        slots=slots,
+        rooms=rooms,
+        faculty=faculty,
+        units=units,
+        student_groups=student_groups,
+        constraints=constraints,
+        warnings=warnings,
+    )
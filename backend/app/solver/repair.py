@@ -0,0 +1,350 @@
+from dataclasses import dataclass, field, replace
+from datetime import date
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+import asyncio
+import time
+import uuid
+
+from ortools.sat.python import cp_model
+from sqlalchemy import insert
+
+from app.core.database import AsyncSessionLocal
+from app.models.scheduling import Timetable, Assignment
+from app.repositories.assignments import AssignmentRow, fetch_assignment_rows
+from app.solver.builder import ModelBuilder
+from app.solver.engine import ProgressCallback, placement_rows
+from app.solver.jobs import get_job_runner
+from app.solver.problem import Problem, PRACTICAL_ROOM_TYPES, load_problem
+
+Placements = Dict[int, FrozenSet[Tuple[int, int]]]
+
+
+@dataclass
+class RepairOptions:
+    time_limit_seconds: float = 10.0
+    num_workers: int = 8
+    max_rooms_per_unit: int = 8
+    # Cost of moving one session, large enough to dominate wasted seats
+    move_penalty: int = 1000
+    # Neighbourhood expansions tried before re-solving every unit
+    max_radius: int = 2
+
+
+@dataclass
+class RepairResult:
+    status: str
+    objective: Optional[float]
+    wall_time: float
+    # None when the whole problem had to be freed
+    radius: Optional[int]
+    freed_units: int
+    placements: List[Tuple[int, int, int]] = field(default_factory=list)
+    stats: Dict[str, object] = field(default_factory=dict)
+
+    @property
+    def feasible(self) -> bool:
+        return self.status in ("OPTIMAL", "FEASIBLE")
+
+
+def align_with_timetable(problem: Problem, rows: List[AssignmentRow]) -> Tuple[Problem, Placements, List[AssignmentRow]]:
+    """Map a timetable's assignments onto the problem's units.
+
+    Units keep the faculty member they are currently taught by. Returns the
+    adjusted problem, the current (slot, room) pairs per unit, and the rows
+    that no longer correspond to any unit.
+    """
+    slot_index = {slot.id: s for s, slot in enumerate(problem.slots)}
+    room_index = {room.id: r for r, room in enumerate(problem.rooms)}
+    faculty_index = {member.id: f for f, member in enumerate(problem.faculty)}
+    units_by_course: Dict[uuid.UUID, Dict[str, int]] = {}
+    for u, unit in enumerate(problem.units):
+        units_by_course.setdefault(unit.course_id, {})[unit.kind] = u
+
+    current: Dict[int, Set[Tuple[int, int]]] = {}
+    teachers: Dict[int, int] = {}
+    orphans = []
+    for row in rows:
+        s = slot_index.get(row.slot_id)
+        r = room_index.get(row.room_id)
+        kinds = units_by_course.get(row.course_id, {})
+        if len(kinds) == 1:
+            u = next(iter(kinds.values()))
+        elif r is not None:
+            u = kinds.get("practical" if problem.rooms[r].type in PRACTICAL_ROOM_TYPES else "theory")
+        else:
+            u = None
+        if s is None or r is None or u is None:
+            orphans.append(row)
+            continue
+        current.setdefault(u, set()).add((s, r))
+        if row.faculty_id in faculty_index:
+            teachers[u] = faculty_index[row.faculty_id]
+
+    units = [
+        replace(unit, faculty_index=teachers[u]) if u in teachers else unit
+        for u, unit in enumerate(problem.units)
+    ]
+    placements = {u: frozenset(pairs) for u, pairs in current.items()}
+    return replace(problem, units=units), placements, orphans
+
+
+def touched_units(problem: Problem, current: Placements, room_blocks: Dict[int, int]) -> Set[int]:
+    """Units whose current placement is missing or no longer allowed"""
+    touched = set()
+    for u, unit in enumerate(problem.units):
+        pairs = current.get(u, frozenset())
+        allowed = problem.faculty[unit.faculty_index].slot_mask
+        if len(pairs) != unit.sessions or any(
+            not allowed >> s & 1 or room_blocks.get(r, 0) >> s & 1 for s, r in pairs
+        ):
+            touched.add(u)
+    return touched
+
+
+def _adjacency(problem: Problem) -> List[Set[int]]:
+    """Units sharing a faculty member or a student with each unit"""
+    by_faculty: Dict[int, Set[int]] = {}
+    by_course: Dict[uuid.UUID, Set[int]] = {}
+    for u, unit in enumerate(problem.units):
+        by_faculty.setdefault(unit.faculty_index, set()).add(u)
+        by_course.setdefault(unit.course_id, set()).add(u)
+
+    co_taken: Dict[uuid.UUID, Set[uuid.UUID]] = {}
+    for group in problem.student_groups:
+        for course_id in group:
+            co_taken.setdefault(course_id, set()).update(group)
+
+    adjacent = []
+    for unit in problem.units:
+        neighbours = set(by_faculty[unit.faculty_index])
+        for course_id in co_taken.get(unit.course_id, (unit.course_id,)):
+            neighbours |= by_course.get(course_id, set())
+        adjacent.append(neighbours)
+    return adjacent
+
+
+def neighbourhood(adjacent: List[Set[int]], seeds: Set[int], radius: int) -> Set[int]:
+    region = set(seeds)
+    frontier = set(seeds)
+    for _ in range(radius):
+        frontier = {v for u in frontier for v in adjacent[u]} - region
+        if not frontier:
+            break
+        region |= frontier
+    return region
+
+
+def repair_problem(
+    problem: Problem,
+    current: Placements,
+    options: RepairOptions,
+    room_blocks: Optional[Dict[int, int]] = None,
+    on_progress: Optional[ProgressCallback] = None,
+) -> RepairResult:
+    """Re-place only the disrupted part of a timetable.
+
+    Units whose placement became invalid are freed together with their
+    neighbourhood (same faculty member or shared students); every other
+    unit is pinned to its current slots and rooms. Freed units prefer their
+    old placements, so the solution moves as few sessions as possible. The
+    neighbourhood grows when the subproblem is infeasible, ending with a
+    hinted re-solve of everything.
+    """
+    started = time.perf_counter()
+    deadline = started + options.time_limit_seconds
+    room_blocks = room_blocks or {}
+    touched = touched_units(problem, current, room_blocks)
+    hint = [(u, s, r) for u, pairs in current.items() for s, r in pairs]
+
+    if not touched:
+        return RepairResult(
+            status="OPTIMAL", objective=0.0, wall_time=time.perf_counter() - started,
+            radius=0, freed_units=0, placements=sorted(hint),
+            stats={"touchedUnits": 0, "attempts": []},
+        )
+
+    adjacent = _adjacency(problem)
+    regions = []
+    for radius in range(1, options.max_radius + 1):
+        region = neighbourhood(adjacent, touched, radius)
+        if not regions or region != regions[-1][1]:
+            regions.append((radius, region))
+    if regions[-1][1] != set(range(len(problem.units))):
+        regions.append((None, set(range(len(problem.units)))))
+
+    attempts = []
+    result = None
+    for radius, region in regions:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        builder = ModelBuilder(problem, max_rooms_per_unit=options.max_rooms_per_unit)
+        builder.room_blocks = room_blocks
+        builder.fixed = {u: pairs for u, pairs in current.items() if u not in region}
+        builder.preferred = {u: pairs for u, pairs in current.items() if u in region}
+        builder.move_penalty = options.move_penalty
+        built = builder.build()
+        built.add_hint(hint)
+
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = remaining
+        solver.parameters.num_workers = options.num_workers
+        status = solver.Solve(built.model)
+        status_name = solver.StatusName(status)
+        attempts.append({
+            "radius": radius,
+            "freedUnits": len(region),
+            "variables": len(built.variables),
+            "status": status_name,
+            "seconds": round(solver.WallTime(), 3),
+        })
+        if on_progress is not None:
+            on_progress({"event": "repair_attempt", **attempts[-1]})
+
+        feasible = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        result = RepairResult(
+            status=status_name,
+            objective=solver.ObjectiveValue() if feasible else None,
+            wall_time=time.perf_counter() - started,
+            radius=radius,
+            freed_units=len(region),
+            placements=[(u, s, r) for u, s, r, var in built.variables if solver.BooleanValue(var)] if feasible else [],
+        )
+        # Only a proof of infeasibility justifies freeing more of the timetable
+        if status != cp_model.INFEASIBLE:
+            break
+
+    if result is None:
+        result = RepairResult(status="UNKNOWN", objective=None, wall_time=time.perf_counter() - started,
+                              radius=None, freed_units=0)
+    result.wall_time = time.perf_counter() - started
+    result.stats = {"touchedUnits": len(touched), "attempts": attempts}
+    return result
+
+
+def _describe(problem: Problem, s: int, r: int) -> dict:
+    slot = problem.slots[s]
+    return {
+        "day": slot.day,
+        "startTime": slot.start_time,
+        "endTime": slot.end_time,
+        "slotIndex": slot.slot_index,
+        "roomNumber": problem.rooms[r].code,
+    }
+
+
+def diff_placements(
+    problem: Problem,
+    before: Placements,
+    after: List[Tuple[int, int, int]],
+    orphans: List[AssignmentRow] = (),
+) -> List[dict]:
+    """Minimal list of moved, added and removed sessions between two placements"""
+    after_by_unit: Dict[int, Set[Tuple[int, int]]] = {}
+    for u, s, r in after:
+        after_by_unit.setdefault(u, set()).add((s, r))
+
+    changes = []
+    for u in sorted(set(before) | set(after_by_unit)):
+        old = before.get(u, frozenset())
+        new = after_by_unit.get(u, set())
+        removed = sorted(old - new)
+        added = sorted(new - old)
+        unit = problem.units[u]
+        for index in range(max(len(removed), len(added))):
+            changes.append({
+                "courseCode": unit.code,
+                "kind": unit.kind,
+                "facultyCode": problem.faculty[unit.faculty_index].code,
+                "from": _describe(problem, *removed[index]) if index < len(removed) else None,
+                "to": _describe(problem, *added[index]) if index < len(added) else None,
+            })
+    for row in orphans:
+        changes.append({
+            "courseCode": row.course_code,
+            "kind": None,
+            "facultyCode": row.faculty_code,
+            "from": {
+                "day": row.day,
+                "startTime": row.start_time,
+                "endTime": row.end_time,
+                "slotIndex": row.slot_index,
+                "roomNumber": row.room_code,
+            },
+            "to": None,
+        })
+    return changes
+
+
+async def repair_timetable(
+    timetable_id: uuid.UUID,
+    options: RepairOptions,
+    week_start: Optional[date] = None,
+    room_outages: Optional[Dict[uuid.UUID, Optional[Set[str]]]] = None,
+) -> dict:
+    """Repair a timetable against current availability and store the result.
+
+    `room_outages` maps room ids to the days they are unavailable (None for
+    the whole week). The repaired timetable is saved as a new, non-final
+    timetable of the same scenario; the response carries only the diff.
+    Loading and persisting use sessions of their own, so no connection is
+    held while the repair waits for cores and solves.
+    """
+    async with AsyncSessionLocal() as db:
+        timetable = await db.get(Timetable, timetable_id)
+        if timetable is None:
+            raise LookupError(f"Timetable {timetable_id} not found")
+        problem = await load_problem(db, timetable.scenario_id, week_start=week_start)
+        rows = await fetch_assignment_rows(db, timetable_id)
+    problem, current, orphans = align_with_timetable(problem, rows)
+
+    room_blocks: Dict[int, int] = {}
+    for r, room in enumerate(problem.rooms):
+        if room_outages and room.id in room_outages:
+            days = room_outages[room.id]
+            mask = 0
+            for s, slot in enumerate(problem.slots):
+                if days is None or slot.day in days:
+                    mask |= 1 << s
+            room_blocks[r] = mask
+
+    # Repairs share the CP-SAT workers of running solves and simulations
+    async with get_job_runner().reserve_cores(options.num_workers) as workers:
+        result = await asyncio.to_thread(
+            repair_problem, problem, current, replace(options, num_workers=workers), room_blocks,
+        )
+
+    response = {
+        "baseTimetableId": str(timetable_id),
+        "timetableId": None,
+        "status": result.status,
+        "wallTime": round(result.wall_time, 3),
+        "radius": result.radius,
+        "freedUnits": result.freed_units,
+        "totalUnits": len(problem.units),
+        "attempts": result.stats.get("attempts", []),
+        "changes": [],
+    }
+    if not result.feasible:
+        return response
+
+    changes = diff_placements(problem, current, result.placements, orphans)
+    response["changes"] = changes
+    if not changes:
+        return response
+
+    async with AsyncSessionLocal() as db:
+        repaired = Timetable(
+            scenario_id=timetable.scenario_id,
+            objective_score=result.objective or 0.0,
+            solve_time_seconds=int(round(result.wall_time)),
+        )
+        db.add(repaired)
+        await db.flush()
+        new_rows = placement_rows(problem, result.placements, repaired.id)
+        if new_rows:
+            await db.execute(insert(Assignment), new_rows)
+        await db.commit()
+
+    response["timetableId"] = str(repaired.id)
+    return response
@@ -0,0 +1,267 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+import hashlib
+import json
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.schemas.constraint import (
+    ConstraintExpression, ConstraintScope, TimeWindow,
+    TimeRestriction, FacultyUnavailable, RoomRestriction, MaxSessionsPerDay,
+)
+from app.solver.problem import Problem, _minutes
+
+# Cost of one session placed against a soft constraint of weight 1
+SOFT_PENALTY_SCALE = 10
+
+_expression_adapter = TypeAdapter(ConstraintExpression)
+
+
+@dataclass(frozen=True)
+class ParsedRule:
+    constraint_id: str
+    kind: str  # hard, soft
+    weight: int
+    expression: object
+
+
+@dataclass
+class LoweredRule:
+    """One constraint expressed over a problem's unit/slot/room indices"""
+    constraint_id: str
+    kind: str
+    weight: int
+    # unit index -> slot / room bitset the unit must not use
+    forbidden_slots: Dict[int, int] = field(default_factory=dict)
+    forbidden_rooms: Dict[int, int] = field(default_factory=dict)
+    # (unit indices, slots of one day, maximum sessions of those units that day)
+    day_limits: List[Tuple[Tuple[int, ...], int, int]] = field(default_factory=list)
+
+
+@dataclass
+class CompiledRules:
+    rules: List[LoweredRule]
+    errors: List[dict]
+    ruleset_hash: str
+
+    @property
+    def hard(self) -> List[LoweredRule]:
+        return [rule for rule in self.rules if rule.kind == "hard"]
+
+    @property
+    def soft(self) -> List[LoweredRule]:
+        return [rule for rule in self.rules if rule.kind != "hard"]
+
+
+class _LRU:
+    def __init__(self, max_entries: int):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, object]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+# Per process: parsing depends only on the constraints, lowering also on the problem
+_parsed = _LRU(256)
+_lowered = _LRU(64)
+
+
+def _weight(constraint: dict) -> int:
+    weight = constraint.get("weight")
+    return 1 if weight is None else weight
+
+
+def ruleset_hash(constraints: List[dict]) -> str:
+    canonical = json.dumps(
+        sorted(
+            [c.get("id"), c.get("kind"), _weight(c), c.get("expression")]
+            for c in constraints
+        ),
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+def problem_fingerprint(problem: Problem) -> str:
+    """Hash of everything lowering depends on: slots, rooms, faculty and units"""
+    digest = hashlib.blake2b(digest_size=16)
+    for slot in problem.slots:
+        digest.update(f"s{slot.day}{slot.start_time}{slot.end_time}{slot.slot_index}".encode())
+    for room in problem.rooms:
+        digest.update(f"r{room.code}".encode())
+    for member in problem.faculty:
+        digest.update(f"f{member.code}".encode())
+    for unit in problem.units:
+        digest.update(f"u{unit.code}{unit.kind}{unit.cohort_key}{unit.faculty_index}".encode())
+    return digest.hexdigest()
+
+
+def parse_constraints(constraints: List[dict]) -> Tuple[List[ParsedRule], List[dict]]:
+    """Validate expression_json against the typed schema, cached by content hash"""
+    key = ruleset_hash(constraints)
+    cached = _parsed.get(key)
+    if cached is not None:
+        return cached
+
+    rules = []
+    errors = []
+    for constraint in constraints:
+        try:
+            expression = _expression_adapter.validate_python(constraint.get("expression") or {})
+        except ValidationError as exc:
+            errors.append({
+                "constraintId": constraint.get("id"),
+                "error": "; ".join(
+                    f"{'.'.join(map(str, e['loc']))}: {e['msg']}" if e["loc"] else e["msg"]
+                    for e in exc.errors()
+                ),
+            })
+            continue
+        rules.append(ParsedRule(
+            constraint_id=constraint.get("id"),
+            kind=constraint.get("kind") or "hard",
+            weight=_weight(constraint),
+            expression=expression,
+        ))
+    _parsed.put(key, (rules, errors))
+    return rules, errors
+
+
+class _Lowering:
+    """Resolve codes and time windows of parsed rules against one problem"""
+
+    def __init__(self, problem: Problem):
+        self.problem = problem
+        self.faculty_by_code = {member.code: f for f, member in enumerate(problem.faculty)}
+        self.room_by_code = {room.code: r for r, room in enumerate(problem.rooms)}
+        self.day_masks: Dict[str, int] = {}
+        for s, slot in enumerate(problem.slots):
+            self.day_masks[slot.day] = self.day_masks.get(slot.day, 0) | 1 << s
+        self.warnings: List[dict] = []
+
+    def window_mask(self, window: TimeWindow) -> int:
+        days = window.days
+        after = _minutes(window.afterTime) if window.afterTime else None
+        before = _minutes(window.beforeTime) if window.beforeTime else None
+        mask = 0
+        for s, slot in enumerate(self.problem.slots):
+            if days is not None and slot.day not in days:
+                continue
+            if after is not None and _minutes(slot.start_time) < after:
+                continue
+            if before is not None and _minutes(slot.end_time) > before:
+                continue
+            if window.slotIndexes is not None and slot.slot_index not in window.slotIndexes:
+                continue
+            mask |= 1 << s
+        return mask
+
+    def units_in(self, scope: ConstraintScope, rule: ParsedRule) -> List[int]:
+        unknown = [code for code in scope.facultyCodes if code not in self.faculty_by_code]
+        if unknown:
+            self.warnings.append({"constraintId": rule.constraint_id, "error": f"Unknown faculty {', '.join(unknown)}"})
+        faculty = {self.faculty_by_code[code] for code in scope.facultyCodes if code in self.faculty_by_code}
+        selected = []
+        for u, unit in enumerate(self.problem.units):
+            if scope.courseCodes and unit.code not in scope.courseCodes:
+                continue
+            if scope.facultyCodes and unit.faculty_index not in faculty:
+                continue
+            if scope.branches and unit.cohort_key.rsplit("-", 1)[-1] not in scope.branches:
+                continue
+            if scope.cohortKeys and unit.cohort_key not in scope.cohortKeys:
+                continue
+            if scope.sessionKinds and unit.kind not in scope.sessionKinds:
+                continue
+            selected.append(u)
+        return selected
+
+    def lower(self, rule: ParsedRule) -> LoweredRule:
+        lowered = LoweredRule(rule.constraint_id, rule.kind, rule.weight)
+        expression = rule.expression
+
+        if isinstance(expression, TimeRestriction):
+            mask = self.window_mask(expression)
+            if mask:
+                lowered.forbidden_slots = {u: mask for u in self.units_in(expression.scope, rule)}
+
+        elif isinstance(expression, FacultyUnavailable):
+            mask = self.window_mask(expression)
+            scope = ConstraintScope(facultyCodes=[expression.facultyCode])
+            if mask:
+                lowered.forbidden_slots = {u: mask for u in self.units_in(scope, rule)}
+
+        elif isinstance(expression, RoomRestriction):
+            listed = 0
+            for code in expression.roomCodes:
+                if code in self.room_by_code:
+                    listed |= 1 << self.room_by_code[code]
+                else:
+                    self.warnings.append({"constraintId": rule.constraint_id, "error": f"Unknown room {code}"})
+            every_room = (1 << len(self.problem.rooms)) - 1
+            forbidden = listed if expression.mode == "never" else every_room & ~listed
+            if forbidden:
+                lowered.forbidden_rooms = {u: forbidden for u in self.units_in(expression.scope, rule)}
+
+        elif isinstance(expression, MaxSessionsPerDay):
+            groups: Dict[object, List[int]] = {}
+            for u in self.units_in(expression.scope, rule):
+                unit = self.problem.units[u]
+                key = {
+                    "course": unit.course_id,
+                    "faculty": unit.faculty_index,
+                    "cohort": unit.cohort_key,
+                }[expression.per]
+                groups.setdefault(key, []).append(u)
+            for units in groups.values():
+                for day_mask in self.day_masks.values():
+                    lowered.day_limits.append((tuple(units), day_mask, expression.maxSessions))
+
+        return lowered
+
+
+def compile_rules(problem: Problem) -> CompiledRules:
+    """Lower a problem's active ruleset constraints to index-level rules.
+
+    Both parsing and lowering are cached by content hash, so repeated
+    solves, repairs and simulations over an unchanged ruleset skip them.
+    """
+    rules_key = ruleset_hash(problem.constraints)
+    key = f"{rules_key}:{problem_fingerprint(problem)}"
+    cached = _lowered.get(key)
+    if cached is not None:
+        return cached
+
+    parsed, errors = parse_constraints(problem.constraints)
+    lowering = _Lowering(problem)
+    lowered = [lowering.lower(rule) for rule in parsed]
+    compiled = CompiledRules(rules=lowered, errors=errors + lowering.warnings, ruleset_hash=rules_key)
+    _lowered.put(key, compiled)
+    return compiled
+
+
+def cache_stats() -> Dict[str, int]:
+    return {
+        "parseHits": _parsed.hits,
+        "parseMisses": _parsed.misses,
+        "lowerHits": _lowered.hits,
+        "lowerMisses": _lowered.misses,
+    }
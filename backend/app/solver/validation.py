@@ -0,0 +1,295 @@
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import time
+import uuid
+
+from ortools.sat.python import cp_model
+
+from app.core.database import AsyncSessionLocal
+from app.solver.builder import ModelBuilder, iter_bits
+from app.solver.jobs import get_job_runner
+from app.solver.problem import Problem, THEORY_ROOM_TYPES, PRACTICAL_ROOM_TYPES, load_problem
+
+
+@dataclass
+class ValidationOptions:
+    # Budget of the feasibility run, and separately of shrinking a conflict
+    time_limit_seconds: float = 5.0
+    conflict_time_limit_seconds: float = 5.0
+    num_workers: int = 8
+
+
+def _issue(kind: str, message: str, **details) -> dict:
+    return {"type": kind, "message": message, **details}
+
+
+def capacity_checks(problem: Problem, builder: ModelBuilder) -> List[dict]:
+    """Necessary conditions that can be checked without a solver.
+
+    `builder` supplies the per-unit domains with hard rules applied. Every
+    failed check proves the ruleset infeasible; passing them proves nothing.
+    """
+    errors = []
+    slot_count = len(problem.slots)
+    slot_masks = [builder.slot_mask(u) for u in range(len(problem.units))]
+
+    # Each unit needs enough allowed slots and at least one usable room
+    for u, unit in enumerate(problem.units):
+        allowed = bin(slot_masks[u]).count("1")
+        if allowed < unit.sessions:
+            errors.append(_issue(
+                "slots",
+                f"{unit.code} ({unit.kind}) needs {unit.sessions} sessions but only {allowed} slots are allowed",
+                courseCode=unit.code,
+            ))
+        if not builder.eligible_rooms(u):
+            errors.append(_issue(
+                "rooms",
+                f"{unit.code} ({unit.kind}) has no allowed room of the right type for {unit.size} students",
+                courseCode=unit.code,
+            ))
+
+    # Sessions needing at least N seats cannot outnumber the room-slots that seat N
+    for kind, room_types in (("theory", THEORY_ROOM_TYPES), ("practical", PRACTICAL_ROOM_TYPES)):
+        capacities = sorted((room.capacity for room in problem.rooms if room.type in room_types), reverse=True)
+        units = sorted((unit for unit in problem.units if unit.kind == kind), key=lambda unit: -unit.size)
+        demand = 0
+        for index, unit in enumerate(units):
+            demand += unit.sessions
+            if index + 1 < len(units) and units[index + 1].size == unit.size:
+                continue
+            rooms = sum(1 for capacity in capacities if capacity >= unit.size)
+            if demand > rooms * slot_count:
+                errors.append(_issue(
+                    "roomSupply",
+                    f"{demand} {kind} sessions need at least {unit.size} seats "
+                    f"but only {rooms * slot_count} room-slots are that large",
+                ))
+                break
+
+    # Faculty teach one session at a time and within their weekly load
+    by_faculty: Dict[int, List[int]] = {}
+    for u, unit in enumerate(problem.units):
+        by_faculty.setdefault(unit.faculty_index, []).append(u)
+    for f, units in by_faculty.items():
+        member = problem.faculty[f]
+        sessions = sum(problem.units[u].sessions for u in units)
+        allowed = bin(member.slot_mask).count("1")
+        if sessions > allowed:
+            errors.append(_issue(
+                "facultySlots",
+                f"{member.code} teaches {sessions} sessions but is available in only {allowed} slots",
+                facultyCode=member.code,
+            ))
+        if member.max_load:
+            minutes = sum(
+                problem.units[u].sessions
+                * min((problem.slots[s].duration_minutes for s in iter_bits(slot_masks[u])), default=0)
+                for u in units
+            )
+            if minutes > member.max_load * 60:
+                errors.append(_issue(
+                    "maxLoad",
+                    f"{member.code} is assigned at least {minutes / 60:g} hours but max load is {member.max_load}",
+                    facultyCode=member.code,
+                ))
+
+    # Courses taken together by a student never share a slot
+    sessions_by_course: Dict[uuid.UUID, int] = {}
+    for unit in problem.units:
+        sessions_by_course[unit.course_id] = sessions_by_course.get(unit.course_id, 0) + unit.sessions
+    for group in problem.student_groups:
+        sessions = sum(sessions_by_course.get(course_id, 0) for course_id in group)
+        if sessions > slot_count:
+            codes = sorted({unit.code for unit in problem.units if unit.course_id in group})
+            errors.append(_issue(
+                "studentGroup",
+                f"Courses {', '.join(codes)} share students and need {sessions} slots; the week has {slot_count}",
+                courseCodes=codes,
+            ))
+
+    # Hard per-day limits bound a group's weekly sessions
+    for rule in builder.rules.hard:
+        days: Dict[Tuple[int, ...], int] = {}
+        limits: Dict[Tuple[int, ...], int] = {}
+        for units, _, limit in rule.day_limits:
+            days[units] = days.get(units, 0) + 1
+            limits[units] = limit
+        for units, day_count in days.items():
+            sessions = sum(problem.units[u].sessions for u in units)
+            if sessions > limits[units] * day_count:
+                codes = sorted({problem.units[u].code for u in units})
+                errors.append(_issue(
+                    "dayLimit",
+                    f"{', '.join(codes)} need {sessions} sessions but constraint allows "
+                    f"{limits[units]} per day over {day_count} days",
+                    constraintId=rule.constraint_id,
+                    courseCodes=codes,
+                ))
+    return errors
+
+
+def _describe_guard(problem: Problem, key: Tuple[str, object]) -> dict:
+    kind, value = key
+    if kind == "rule":
+        constraint = next((c for c in problem.constraints if c.get("id") == value), {})
+        return _issue(
+            "constraint", f"Constraint {value}",
+            constraintId=value, expression=constraint.get("expression"),
+        )
+    if kind == "sessions":
+        unit = problem.units[value]
+        return _issue(
+            "sessions", f"{unit.code} ({unit.kind}) must meet {unit.sessions} times a week",
+            courseCode=unit.code, sessions=unit.sessions,
+        )
+    member = problem.faculty[value]
+    return _issue(
+        "maxLoad", f"{member.code} may teach at most {member.max_load} hours a week",
+        facultyCode=member.code, maxLoad=member.max_load,
+    )
+
+
+class _GuardedModel:
+    """A guarded CP-SAT model of a problem, solvable under any assumption subset"""
+
+    def __init__(self, problem: Problem):
+        builder = ModelBuilder(problem, max_rooms_per_unit=len(problem.rooms), guarded=True)
+        self.built = builder.build()
+        self.built.model.ClearObjective()
+        self.keys = list(self.built.guards)
+        self._by_index = {literal.Index(): key for key, literal in self.built.guards.items()}
+
+    def solve(self, assumed: List[Tuple[str, object]], time_limit: float, workers: int):
+        """Solver status, plus an infeasible subset of `assumed` when INFEASIBLE"""
+        model = self.built.model
+        model.ClearAssumptions()
+        model.AddAssumptions([self.built.guards[key] for key in assumed])
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = max(time_limit, 0.01)
+        solver.parameters.num_workers = workers
+        status = solver.Solve(model)
+        core = None
+        if status == cp_model.INFEASIBLE:
+            core = {self._by_index[index] for index in solver.SufficientAssumptionsForInfeasibility()}
+        return status, core
+
+
+def _shrink(problem: Problem, conflict: List[Tuple[str, object]], deadline: float) -> Tuple[list, bool]:
+    """Drop conflict members one at a time while the rest stays infeasible.
+
+    Units whose sessions are not in the conflict may stay unplaced in every
+    trial, so the trials run on a sub-problem of just the conflicting units.
+    """
+    units = sorted(value for kind, value in conflict if kind == "sessions")
+    sub_problem = replace(problem, units=[problem.units[u] for u in units])
+    to_sub = {("sessions", u): ("sessions", index) for index, u in enumerate(units)}
+    to_full = {sub: full for full, sub in to_sub.items()}
+    guarded = _GuardedModel(sub_problem)
+
+    # Members that constrain none of those units cannot be part of the conflict
+    conflict = [to_sub.get(key, key) for key in conflict]
+    conflict = [key for key in conflict if key in guarded.built.guards]
+    minimal = True
+    index = 0
+    while index < len(conflict):
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            minimal = False
+            break
+        trial = conflict[:index] + conflict[index + 1:]
+        # Cores are only reported by sequential search
+        status, smaller = guarded.solve(trial, remaining, 1)
+        if status == cp_model.INFEASIBLE:
+            # Members before `index` were needed for a superset, so they survive
+            conflict = [key for key in trial if smaller is None or key in smaller]
+        else:
+            minimal = minimal and status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+            index += 1
+    return [to_full.get(key, key) for key in conflict], minimal
+
+
+def find_conflicts(problem: Problem, options: ValidationOptions) -> dict:
+    """Decide feasibility with CP-SAT and explain infeasibility.
+
+    Hard rules, weekly session counts and faculty loads are each enforced
+    under an assumption literal. On infeasibility CP-SAT reports a subset of
+    assumptions that is already infeasible; it is then shrunk until every
+    remaining member is needed, or the conflict budget runs out.
+    """
+    guarded = _GuardedModel(problem)
+    status, core = guarded.solve(guarded.keys, options.time_limit_seconds, options.num_workers)
+    result = {"status": "unknown", "conflicts": [], "minimalConflicts": None}
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        result["status"] = "feasible"
+        return result
+    if status != cp_model.INFEASIBLE:
+        return result
+
+    deadline = time.perf_counter() + options.conflict_time_limit_seconds
+    if options.num_workers > 1 and (not core or len(core) == len(guarded.keys)):
+        # Parallel search proves infeasibility but rarely narrows the core
+        _, core = guarded.solve(guarded.keys, options.conflict_time_limit_seconds, 1)
+    conflict = [key for key in guarded.keys if not core or key in core]
+    conflict, minimal = _shrink(problem, conflict, deadline)
+
+    result.update(
+        status="infeasible",
+        conflicts=[_describe_guard(problem, key) for key in conflict],
+        minimalConflicts=minimal,
+    )
+    return result
+
+
+def validate_problem(problem: Problem, options: ValidationOptions) -> dict:
+    started = time.perf_counter()
+    builder = ModelBuilder(problem)
+    rules = builder.rules
+    errors = [_issue("syntax", error["error"], constraintId=error["constraintId"]) for error in rules.errors]
+    errors.extend(capacity_checks(problem, builder))
+    static_seconds = time.perf_counter() - started
+
+    response = {
+        "valid": False,
+        "status": "invalid",
+        "errors": errors,
+        "warnings": list(problem.warnings),
+        "conflicts": [],
+        "minimalConflicts": None,
+        "rulesetHash": rules.ruleset_hash,
+        "timings": {"static": round(static_seconds, 3), "solver": None},
+    }
+    if errors:
+        return response
+
+    outcome = find_conflicts(problem, options)
+    response.update(outcome)
+    response["valid"] = outcome["status"] != "infeasible"
+    if outcome["status"] == "unknown":
+        response["warnings"].append(
+            f"Feasibility could not be decided within {options.time_limit_seconds:g}s"
+        )
+    response["timings"]["solver"] = round(time.perf_counter() - started - static_seconds, 3)
+    return response
+
+
+async def validate_ruleset(
+    scenario_id: uuid.UUID,
+    options: ValidationOptions,
+    proposed: Optional[List[dict]] = None,
+) -> dict:
+    """Validate a scenario's active ruleset, plus any proposed constraints.
+
+    Cheap capacity checks run first; only when they pass is the guarded
+    model handed to CP-SAT. Raises LookupError for an unknown scenario.
+    The problem is loaded in a short session of its own, so no connection
+    is held while validation waits for cores and solves.
+    """
+    async with AsyncSessionLocal() as db:
+        problem = await load_problem(db, scenario_id)
+    if proposed:
+        problem = replace(problem, constraints=problem.constraints + proposed)
+    # Validation shares the CP-SAT workers of running solves and simulations
+    async with get_job_runner().reserve_cores(options.num_workers) as workers:
+        return await asyncio.to_thread(validate_problem, problem, replace(options, num_workers=workers))
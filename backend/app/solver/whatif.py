@@ -0,0 +1,280 @@
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
+import time
+import uuid
+
+from ortools.sat.python import cp_model
+
+from app.models.academic import RoomType
+from app.solver.builder import ModelBuilder
+from app.solver.problem import Problem, RoomInfo
+
+# A placement by ids, so it survives rooms being added or removed:
+# (course id, unit kind, slot id, room id)
+BasePlacement = Tuple[uuid.UUID, str, uuid.UUID, uuid.UUID]
+
+
+class ModificationError(ValueError):
+    pass
+
+
+@dataclass
+class VariantOptions:
+    time_limit_seconds: float = 30.0
+    num_workers: int = 1
+    max_rooms_per_unit: int = 8
+    # Small preference for the base placement, so unaffected sessions stay put
+    move_penalty: int = 10
+    # Cost of an unplaceable session; such sessions are reported as violations
+    unplaced_penalty: int = 100000
+
+
+@dataclass
+class VariantModel:
+    """A base problem with one set of modifications applied"""
+    problem: Problem
+    slot_filter: int
+    room_blocks: Dict[int, int] = field(default_factory=dict)
+
+
+def _days(modification: dict) -> Optional[set]:
+    days = modification.get("days")
+    if days is None:
+        return None
+    if not isinstance(days, list):
+        raise ModificationError(f"{modification.get('type')}: days must be a list of day names")
+    return {str(day).capitalize() for day in days}
+
+
+def _slot_indexes(modification: dict) -> Optional[List[int]]:
+    indexes = modification.get("slotIndexes")
+    if indexes is None:
+        return None
+    if not isinstance(indexes, list) or not all(isinstance(index, int) for index in indexes):
+        raise ModificationError(f"{modification.get('type')}: slotIndexes must be a list of integers")
+    return indexes
+
+
+def _number(modification: dict, key: str, default, convert):
+    value = modification.get(key, default)
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        raise ModificationError(f"{modification.get('type')}: {key} must be a number, got {value!r}")
+
+
+def _slots_mask(problem: Problem, days: Optional[set], slot_indexes: Optional[List[int]] = None) -> int:
+    mask = 0
+    for s, slot in enumerate(problem.slots):
+        if (days is None or slot.day in days) and (slot_indexes is None or slot.slot_index in slot_indexes):
+            mask |= 1 << s
+    return mask
+
+
+def apply_modifications(base: Problem, modifications: List[dict]) -> VariantModel:
+    """Apply a what-if delta to an in-memory problem without touching the DB.
+
+    Supported modification types:
+      remove_room {roomCode}            room_outage {roomCode, days?}
+      add_room {roomCode, roomType, capacity}
+      faculty_unavailable {facultyCode, days?, slotIndexes?}
+      set_max_load {facultyCode, maxLoad}
+      reassign_course {courseCode, facultyCode}
+      set_course_size {courseCode, size}
+      scale_enrollment {factor}
+      block_slots {days?, slotIndexes?}
+    """
+    rooms = list(base.rooms)
+    faculty = list(base.faculty)
+    units = list(base.units)
+    slot_filter = base.all_slots_mask
+    outages: Dict[str, int] = {}
+
+    faculty_by_code = {member.code: f for f, member in enumerate(faculty)}
+    room_codes = {room.code for room in rooms}
+    course_codes = {unit.code for unit in units}
+
+    def faculty_index(modification):
+        code = modification.get("facultyCode")
+        if not isinstance(code, str) or code not in faculty_by_code:
+            raise ModificationError(f"Unknown faculty {code!r}")
+        return faculty_by_code[code]
+
+    def course_code(modification):
+        code = modification.get("courseCode")
+        if not isinstance(code, str) or code not in course_codes:
+            raise ModificationError(f"Course {code!r} is not part of this scenario")
+        return code
+
+    def room_code(modification):
+        code = modification.get("roomCode")
+        if not isinstance(code, str) or code not in room_codes:
+            raise ModificationError(f"Unknown room {code!r}")
+        return code
+
+    for modification in modifications:
+        kind = modification.get("type")
+        if kind == "remove_room":
+            code = room_code(modification)
+            rooms = [room for room in rooms if room.code != code]
+            room_codes.discard(code)
+        elif kind == "room_outage":
+            code = room_code(modification)
+            outages[code] = outages.get(code, 0) | _slots_mask(base, _days(modification))
+        elif kind == "add_room":
+            code = modification.get("roomCode")
+            if not code or not isinstance(code, str) or code in room_codes:
+                raise ModificationError(f"Room code {code!r} is missing or already exists")
+            try:
+                room_type = RoomType(modification.get("roomType", RoomType.CLASS.value)).value
+                capacity = int(modification["capacity"])
+            except (KeyError, TypeError, ValueError):
+                raise ModificationError(f"add_room {code!r} needs a valid roomType and capacity")
+            rooms.append(RoomInfo(uuid.uuid5(base.scenario_id, f"room:{code}"), code, room_type, capacity))
+            room_codes.add(code)
+        elif kind == "faculty_unavailable":
+            f = faculty_index(modification)
+            blocked = _slots_mask(base, _days(modification), _slot_indexes(modification))
+            faculty[f] = replace(faculty[f], slot_mask=faculty[f].slot_mask & ~blocked)
+        elif kind == "set_max_load":
+            f = faculty_index(modification)
+            faculty[f] = replace(faculty[f], max_load=_number(modification, "maxLoad", 0, int))
+        elif kind == "reassign_course":
+            code = course_code(modification)
+            f = faculty_index(modification)
+            units = [replace(unit, faculty_index=f) if unit.code == code else unit for unit in units]
+        elif kind == "set_course_size":
+            code = course_code(modification)
+            size = _number(modification, "size", 0, int)
+            units = [replace(unit, size=size) if unit.code == code else unit for unit in units]
+        elif kind == "scale_enrollment":
+            factor = _number(modification, "factor", 1, float)
+            units = [replace(unit, size=max(1, round(unit.size * factor))) for unit in units]
+        elif kind == "block_slots":
+            slot_filter &= ~_slots_mask(base, _days(modification), _slot_indexes(modification))
+        else:
+            raise ModificationError(f"Unknown modification type {kind!r}")
+
+    rooms.sort(key=lambda room: (room.capacity, room.code))
+    room_blocks = {r: outages[room.code] for r, room in enumerate(rooms) if room.code in outages}
+    problem = replace(base, rooms=rooms, faculty=faculty, units=units)
+    return VariantModel(problem=problem, slot_filter=slot_filter, room_blocks=room_blocks)
+
+
+def base_placements(problem: Problem, placements: Dict[int, frozenset]) -> List[BasePlacement]:
+    """Index-based placements of a problem as id-based tuples"""
+    return [
+        (problem.units[u].course_id, problem.units[u].kind, problem.slots[s].id, problem.rooms[r].id)
+        for u, pairs in placements.items()
+        for s, r in pairs
+    ]
+
+
+def _faculty_minutes(problem: Problem, placements: List[Tuple[int, int, int]]) -> Dict[str, int]:
+    minutes: Dict[str, int] = {}
+    for u, s, _ in placements:
+        code = problem.faculty[problem.units[u].faculty_index].code
+        minutes[code] = minutes.get(code, 0) + problem.slots[s].duration_minutes
+    return minutes
+
+
+def solve_variant(
+    base: Problem,
+    base_solution: List[BasePlacement],
+    modifications: List[dict],
+    options: VariantOptions,
+) -> dict:
+    """Solve one what-if variant, warm-started from the base timetable.
+
+    Sessions that cannot be placed without breaking a hard constraint are
+    left out and counted as violations rather than failing the variant.
+    """
+    started = time.perf_counter()
+    variant = apply_modifications(base, modifications)
+    problem = variant.problem
+
+    unit_index = {(unit.course_id, unit.kind): u for u, unit in enumerate(problem.units)}
+    slot_index = {slot.id: s for s, slot in enumerate(problem.slots)}
+    room_index = {room.id: r for r, room in enumerate(problem.rooms)}
+    previous: Dict[int, set] = {}
+    for course_id, kind, slot_id, room_id in base_solution:
+        u = unit_index.get((course_id, kind))
+        s = slot_index.get(slot_id)
+        r = room_index.get(room_id)
+        if u is not None and s is not None and r is not None:
+            previous.setdefault(u, set()).add((s, r))
+
+    builder = ModelBuilder(problem, max_rooms_per_unit=options.max_rooms_per_unit)
+    builder.slot_filters = [mask & variant.slot_filter for mask in builder.slot_filters]
+    builder.room_blocks = variant.room_blocks
+    builder.preferred = {u: frozenset(pairs) for u, pairs in previous.items()}
+    builder.move_penalty = options.move_penalty
+    builder.unplaced_penalty = options.unplaced_penalty
+    built = builder.build()
+    built.add_hint((u, s, r) for u, pairs in previous.items() for s, r in pairs)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = options.time_limit_seconds
+    solver.parameters.num_workers = options.num_workers
+    status = solver.Solve(built.model)
+    feasible = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+
+    summary = {
+        "status": solver.StatusName(status),
+        "objective": None,
+        "hardViolations": None,
+        "changedAssignments": None,
+        "facultyLoadDeltas": {},
+        "wallTime": None,
+        "placements": [],
+    }
+    if feasible:
+        placements = [(u, s, r) for u, s, r, var in built.variables if solver.BooleanValue(var)]
+        before = [(u, s, r) for u, pairs in previous.items() for s, r in pairs]
+        kept = len(set(before) & set(placements))
+        old_minutes = _faculty_minutes(problem, before)
+        new_minutes = _faculty_minutes(problem, placements)
+        summary.update(
+            objective=float(sum(problem.rooms[r].capacity - problem.units[u].size for u, _, r in placements)),
+            hardViolations=sum(solver.Value(var) for var in built.unplaced.values()),
+            changedAssignments=(len(before) - kept) + (len(placements) - kept),
+            facultyLoadDeltas={
+                code: round((new_minutes.get(code, 0) - old_minutes.get(code, 0)) / 60, 2)
+                for code in sorted(set(old_minutes) | set(new_minutes))
+                if new_minutes.get(code, 0) != old_minutes.get(code, 0)
+            },
+            placements=[
+                (problem.units[u].course_id, problem.slots[s].id, problem.rooms[r].id,
+                 problem.faculty[problem.units[u].faculty_index].id, problem.units[u].cohort_key)
+                for u, s, r in placements
+            ],
+        )
+    summary["wallTime"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+# Process-pool workers receive the base problem once, through the pool
+# initializer, and afterwards only the small per-variant deltas
+_worker_base: Optional[Tuple[Problem, List[BasePlacement]]] = None
+
+
+def init_variant_worker(base: Problem, base_solution: List[BasePlacement]):
+    global _worker_base
+    _worker_base = (base, base_solution)
+
+
+def run_variant(
+    modifications: List[dict],
+    options: VariantOptions,
+    base: Optional[Tuple[Problem, List[BasePlacement]]] = None,
+) -> dict:
+    """Solve a variant of `base`, or of the worker's base problem when not given.
+
+    Threads in one process share memory, so they take the base explicitly;
+    a process-wide base would be overwritten by a concurrent batch.
+    """
+    base, base_solution = base or _worker_base
+    try:
+        return solve_variant(base, base_solution, modifications, options)
+    except ModificationError as exc:
+        return {"status": "INVALID", "error": str(exc), "placements": []}
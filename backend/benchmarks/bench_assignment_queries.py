@@ -0,0 +1,121 @@
+"""Query-count benchmark for Assignment-heavy reads.
+
+Builds a 5,000-assignment timetable and asserts that every read path in
+app.repositories.assignments uses a constant number of queries.
+
+    cd backend && python -m benchmarks.bench_assignment_queries [--database-url URL]
+"""
+import argparse
+import asyncio
+import json
+import random
+import uuid
+
+# Imported first: it points the application's engine away from the real database
+from benchmarks.support import DEFAULT_DATABASE_URL, QueryCounter, create_database, timed
+
+from sqlalchemy import insert
+
+from app.models.academic import Course, CourseType, DayOfWeek, Faculty, Room, RoomType, TimeSlot
+from app.models.scheduling import Assignment, Ruleset, Scenario, Timetable
+from app.repositories.assignments import fetch_assignment_rows, fetch_assignments, fetch_final_assignment_rows
+
+ASSIGNMENTS = 5000
+
+# Maximum statements allowed per read path, independent of timetable size
+QUERY_BUDGET = {
+    "fetch_assignment_rows": 1,
+    "fetch_final_assignment_rows": 1,
+    "fetch_assignments": 5,
+}
+
+
+async def seed(sessionmaker, assignments: int) -> tuple:
+    rnd = random.Random(7)
+    days = [DayOfWeek.MONDAY, DayOfWeek.TUESDAY, DayOfWeek.WEDNESDAY, DayOfWeek.THURSDAY, DayOfWeek.FRIDAY]
+    async with sessionmaker() as db:
+        slots = [
+            {"id": uuid.uuid4(), "day": day, "start_time": f"{9 + i:02d}:00", "end_time": f"{10 + i:02d}:00",
+             "slot_index": i, "duration_minutes": 60}
+            for day in days for i in range(10)
+        ]
+        rooms = [
+            {"id": uuid.uuid4(), "code": f"R{i}", "name": f"Room {i}", "type": RoomType.CLASS,
+             "capacity": 60, "building": "A", "floor": 1}
+            for i in range(125)
+        ]
+        courses = [
+            {"id": uuid.uuid4(), "code": f"C{i:04d}", "title": f"Course {i}", "type": CourseType.MAJOR,
+             "credits": 4, "branch": "CSE"}
+            for i in range(500)
+        ]
+        faculty = [
+            {"id": uuid.uuid4(), "code": f"F{i:03d}", "name": f"Faculty {i}", "short_name": f"F{i}",
+             "department": "CSE"}
+            for i in range(100)
+        ]
+        for model, rows in ((TimeSlot, slots), (Room, rooms), (Course, courses), (Faculty, faculty)):
+            await db.execute(insert(model), rows)
+
+        ruleset = Ruleset(name="Bench", program="FYUP", semester=1)
+        db.add(ruleset)
+        await db.flush()
+        scenario = Scenario(name="Bench", program="FYUP", semester=1, ruleset_id=ruleset.id)
+        db.add(scenario)
+        await db.flush()
+        timetable = Timetable(scenario_id=scenario.id, objective_score=0, solve_time_seconds=0, is_final=True)
+        db.add(timetable)
+        await db.flush()
+
+        # Walk slots first, so no room or faculty member is booked twice in a slot
+        await db.execute(insert(Assignment), [
+            {"id": uuid.uuid4(), "timetable_id": timetable.id, "course_id": rnd.choice(courses)["id"],
+             "slot_id": slots[i % len(slots)]["id"], "room_id": rooms[i // len(slots) % len(rooms)]["id"],
+             "faculty_id": faculty[i // len(slots) % len(faculty)]["id"], "cohort_key": f"FYUP-S1-{i % 10}"}
+            for i in range(assignments)
+        ])
+        await db.commit()
+        return timetable.id, faculty[0]["id"]
+
+
+async def run(database_url: str, assignments: int) -> dict:
+    engine, sessionmaker = await create_database(database_url)
+    timetable_id, faculty_id = await seed(sessionmaker, assignments)
+    counter = QueryCounter(engine)
+    report = {"assignments": assignments, "queries": {}, "seconds": {}}
+
+    paths = {
+        "fetch_assignment_rows": lambda db: fetch_assignment_rows(db, timetable_id),
+        "fetch_final_assignment_rows": lambda db: fetch_final_assignment_rows(db, faculty_id),
+        "fetch_assignments": lambda db: fetch_assignments(db, timetable_id),
+    }
+    for name, call in paths.items():
+        async with sessionmaker() as db:
+            with counter.measure(), timed(report["seconds"], name):
+                rows = await call(db)
+            report["queries"][name] = counter.count
+            if name == "fetch_assignments":
+                # Touching relationships must not trigger lazy loads
+                with counter.measure():
+                    for assignment in rows:
+                        assignment.course.code, assignment.room.code, assignment.faculty.code, assignment.slot.day
+                assert counter.count == 0, f"{counter.count} lazy loads while reading relationships"
+
+    await engine.dispose()
+    for name, budget in QUERY_BUDGET.items():
+        assert report["queries"][name] <= budget, (
+            f"{name} issued {report['queries'][name]} queries, budget is {budget}"
+        )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--assignments", type=int, default=ASSIGNMENTS)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.database_url, args.assignments)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Requests/sec of the timetable read endpoints by response encoding.
+
+Serves a 5,000-assignment timetable through the application in-process
+and compares FastAPI's default encoding (jsonable_encoder + json, no
+compression) with orjson, and with orjson plus each negotiated
+compression.
+
+    cd backend && python -m benchmarks.bench_json_responses [--requests N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+
+os.environ.setdefault("CACHE_BACKEND", "memory")
+
+# Imported first: it points the application's engine away from the real database
+from benchmarks.support import create_database
+
+import httpx
+from sqlalchemy import insert, select
+
+from app.core.compression import brotli
+from app.core.database import get_db
+from app.core.serialization import JSON_BACKENDS, use_json_backend
+from app.main import app
+from app.models.academic import Course, Enrollment, Faculty, Student
+from benchmarks.bench_assignment_queries import ASSIGNMENTS, seed
+
+REQUESTS = 200
+
+
+async def add_student(sessionmaker) -> str:
+    async with sessionmaker() as db:
+        course_ids = (await db.execute(select(Course.id).order_by(Course.code).limit(8))).scalars().all()
+        student_id = uuid.uuid4()
+        await db.execute(insert(Student), [{
+            "id": student_id, "enrollment_number": "B00001", "name": "Bench Student",
+            "program": "FYUP", "semester": 1, "branch": "CSE",
+        }])
+        await db.execute(insert(Enrollment), [
+            {"id": uuid.uuid4(), "student_id": student_id, "course_id": course_id,
+             "semester": 1, "academic_year": "2024-25"}
+            for course_id in course_ids
+        ])
+        await db.commit()
+    return "B00001"
+
+
+async def measure(client: httpx.AsyncClient, path: str, encoding: str, requests: int) -> dict:
+    headers = {"accept-encoding": encoding}
+    response = await client.get(path, headers=headers)
+    assert response.status_code == 200, (path, response.status_code)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await client.get(path, headers=headers)
+    elapsed = time.perf_counter() - started
+    return {
+        "requestsPerSecond": round(requests / elapsed, 1),
+        "bytes": int(response.headers["content-length"]),
+        "contentEncoding": response.headers.get("content-encoding", "identity"),
+    }
+
+
+async def run(requests: int, assignments: int) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        # A file, so that every pooled connection sees the same database
+        engine, sessionmaker = await create_database(f"sqlite+aiosqlite:///{workdir}/bench.db")
+        timetable_id, faculty_id = await seed(sessionmaker, assignments)
+        enrollment_number = await add_student(sessionmaker)
+        async with sessionmaker() as db:
+            faculty_code = (await db.execute(select(Faculty.code).where(Faculty.id == faculty_id))).scalar_one()
+
+        async def override_get_db():
+            async with sessionmaker() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        paths = {
+            "timetable": f"/api/v1/timetables/{timetable_id}",
+            "facultySchedule": f"/api/v1/faculty/{faculty_code}/schedule",
+            "facultyWorkload": "/api/v1/faculty/workload",
+            "studentTimetable": f"/api/v1/students/{enrollment_number}/timetable",
+        }
+        modes = [("before", "stdlib", "identity")]
+        if "orjson" in JSON_BACKENDS:
+            modes += [("orjson", "orjson", "identity"), ("orjson+gzip", "orjson", "gzip")]
+            if brotli is not None:
+                modes.append(("orjson+br", "orjson", "br"))
+
+        report = {"assignments": assignments, "requests": requests, "endpoints": {}}
+        try:
+            async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+                for endpoint, path in paths.items():
+                    results = report["endpoints"][endpoint] = {}
+                    for mode, backend, encoding in modes:
+                        use_json_backend(backend)
+                        results[mode] = await measure(client, path, encoding, requests)
+                    before = results["before"]["requestsPerSecond"]
+                    for result in results.values():
+                        result["speedup"] = round(result["requestsPerSecond"] / before, 2)
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            use_json_backend("auto")
+            await engine.dispose()
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=REQUESTS)
+    parser.add_argument("--assignments", type=int, default=ASSIGNMENTS)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests, args.assignments)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
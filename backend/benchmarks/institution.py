@@ -0,0 +1,123 @@
+"""Synthetic institutions for benchmarks.
+
+Generates a time slot grid, rooms, faculty, courses, students and their
+enrollments at a configurable scale, plus a ruleset and scenario ready to
+solve. Courses come in blocks of `courses_per_student`; every student
+takes one block, so each block's students form cohorts by branch, the
+way a program's sections do. Generation is deterministic for a seed.
+"""
+from dataclasses import asdict, dataclass
+import random
+import time
+import uuid
+
+from sqlalchemy import insert
+
+from app.models.academic import (
+    Course, CourseType, DayOfWeek, Enrollment, Faculty, Room, RoomType, Student, TimeSlot,
+)
+from app.models.scheduling import Ruleset, Scenario
+
+DAYS = [DayOfWeek.MONDAY, DayOfWeek.TUESDAY, DayOfWeek.WEDNESDAY, DayOfWeek.THURSDAY, DayOfWeek.FRIDAY, DayOfWeek.SATURDAY]
+BRANCHES = ("CSE", "ECE", "ME", "CE")
+
+# Rows per INSERT, so large institutions don't build one huge statement
+INSERT_BATCH = 5000
+
+
+@dataclass(frozen=True)
+class InstitutionSpec:
+    students: int = 300
+    courses: int = 32
+    rooms: int = 15
+    faculty: int = 16
+    days: int = 5
+    slots_per_day: int = 8
+    courses_per_student: int = 4
+    branches: int = 2
+    # Every n-th course has a lab, and every n-th room is one
+    lab_every: int = 4
+    program: str = "FYUP"
+    semester: int = 1
+
+
+SCALES = {
+    "small": InstitutionSpec(),
+    "medium": InstitutionSpec(students=2000, courses=80, rooms=30, faculty=40),
+    "large": InstitutionSpec(students=10000, courses=200, rooms=80, faculty=100, days=6, branches=4),
+}
+
+
+async def _insert(db, model, rows):
+    for start in range(0, len(rows), INSERT_BATCH):
+        await db.execute(insert(model), rows[start:start + INSERT_BATCH])
+
+
+async def generate_institution(sessionmaker, spec: InstitutionSpec, seed: int = 7) -> dict:
+    """Insert an institution into an empty database; returns its scenario id and counts"""
+    rnd = random.Random(seed)
+    started = time.perf_counter()
+    branches = BRANCHES[:spec.branches]
+
+    slots = [
+        {"id": uuid.uuid4(), "day": day, "start_time": f"{8 + i:02d}:00", "end_time": f"{9 + i:02d}:00",
+         "slot_index": i, "duration_minutes": 60}
+        for day in DAYS[:spec.days] for i in range(spec.slots_per_day)
+    ]
+    rooms = [
+        {"id": uuid.uuid4(), "code": f"R{i:03d}", "name": f"Room {i}",
+         "type": RoomType.LAB if i % spec.lab_every == 0 else RoomType.CLASS,
+         "capacity": rnd.choice([60, 80, 120, 180]), "features": [], "building": "ABCD"[i % 4], "floor": i % 5}
+        for i in range(spec.rooms)
+    ]
+    faculty = [
+        {"id": uuid.uuid4(), "code": f"F{i:04d}", "name": f"Faculty {i}", "short_name": f"F{i}",
+         "department": branches[i % len(branches)], "max_load": 20, "expertise_tags": [], "availability_json": {}}
+        for i in range(spec.faculty)
+    ]
+    courses = [
+        {"id": uuid.uuid4(), "code": f"C{i:04d}", "title": f"Course {i}", "type": CourseType.MAJOR, "credits": 4,
+         "hours_theory": 3, "hours_practical": 2 if i % spec.lab_every == 0 else 0,
+         "has_lab": i % spec.lab_every == 0, "branch": branches[i % len(branches)], "prerequisites": []}
+        for i in range(spec.courses)
+    ]
+    students = [
+        {"id": uuid.uuid4(), "enrollment_number": f"S{i:06d}", "name": f"Student {i}", "program": spec.program,
+         "semester": spec.semester, "branch": branches[i % len(branches)]}
+        for i in range(spec.students)
+    ]
+    blocks = max(spec.courses // spec.courses_per_student, 1)
+    enrollments = []
+    for student in students:
+        block = rnd.randrange(blocks)
+        for course in courses[block * spec.courses_per_student:(block + 1) * spec.courses_per_student]:
+            enrollments.append({
+                "id": uuid.uuid4(), "student_id": student["id"], "course_id": course["id"],
+                "semester": spec.semester, "academic_year": "2024-25",
+            })
+
+    async with sessionmaker() as db:
+        for model, rows in (
+            (TimeSlot, slots), (Room, rooms), (Faculty, faculty), (Course, courses),
+            (Student, students), (Enrollment, enrollments),
+        ):
+            await _insert(db, model, rows)
+        ruleset = Ruleset(name="Benchmark", program=spec.program, semester=spec.semester)
+        db.add(ruleset)
+        await db.flush()
+        scenario = Scenario(name="Benchmark", program=spec.program, semester=spec.semester, ruleset_id=ruleset.id)
+        db.add(scenario)
+        await db.commit()
+        scenario_id = scenario.id
+
+    return {
+        "scenarioId": str(scenario_id),
+        "spec": asdict(spec),
+        "rows": {
+            "timeSlots": len(slots), "rooms": len(rooms), "faculty": len(faculty), "courses": len(courses),
+            "students": len(students), "enrollments": len(enrollments),
+        },
+        "seconds": round(time.perf_counter() - started, 3),
+        "enrollmentNumbers": [student["enrollment_number"] for student in students],
+        "facultyCodes": [member["code"] for member in faculty],
+    }
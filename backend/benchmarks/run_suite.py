@@ -0,0 +1,98 @@
+"""Benchmark the solver, read endpoints, CSV import and exports at a scale.
+
+Generates a synthetic institution into a fresh SQLite file (or the
+PostgreSQL database given with --database-url, which should be a
+scratch one), runs the suite and writes a JSON report. With --baseline,
+compares against an earlier report and exits 1 when a duration grew or
+a throughput fell by more than --tolerance.
+
+    cd backend && python -m benchmarks.run_suite --scale small --output report.json
+    cd backend && python -m benchmarks.run_suite --baseline report.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", default="small", help="small, medium or large")
+    parser.add_argument("--students", type=int, help="override the scale's student count")
+    parser.add_argument("--database-url", help="scratch database; defaults to a temporary SQLite file")
+    parser.add_argument("--reset", action="store_true", help="drop existing tables first")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--solver-time-limit", type=float, default=30.0)
+    parser.add_argument("--csv-rows", type=int, default=5000)
+    parser.add_argument("--export-students", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    return parser, parser.parse_args()
+
+
+def main():
+    parser, args = _parse_args()
+    workdir = tempfile.TemporaryDirectory(prefix="kairo-bench-")
+    # Before the application is imported: its engine, cache and file outputs read these at import
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite+aiosqlite:///{workdir.name}/bench.db"
+    os.environ["CACHE_BACKEND"] = "memory"
+    os.environ.setdefault("EXPORT_CACHE_DIR", os.path.join(workdir.name, "exports"))
+    os.environ.setdefault("EXPORT_BATCH_DIR", os.path.join(workdir.name, "batches"))
+
+    from dataclasses import replace
+
+    from benchmarks.institution import SCALES
+    from benchmarks.suite import run
+    from benchmarks.support import compare_reports
+
+    if args.scale not in SCALES:
+        parser.error(f"--scale must be one of: {', '.join(SCALES)}")
+    spec = SCALES[args.scale]
+    if args.students:
+        spec = replace(spec, students=args.students)
+    with workdir:
+        report = asyncio.run(run(
+            spec,
+            scale=args.scale,
+            reset=args.reset,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            solver_time_limit=args.solver_time_limit,
+            csv_rows=args.csv_rows,
+            export_students=args.export_students,
+            seed=args.seed,
+        ))
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        report["regressions"] = compare_reports(baseline, report, args.tolerance)
+        report["meta"]["baseline"] = baseline.get("meta", {}).get("commit")
+        for key in ("database", "spec", "requests", "concurrency"):
+            if baseline.get("meta", {}).get(key) != report["meta"][key]:
+                print(f"warning: baseline was run with a different {key}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    else:
+        print(output)
+
+    for regression in report.get("regressions", []):
+        print(
+            f"regression: {regression['metric']} {regression['baseline']} -> {regression['current']} "
+            f"({regression['change']:.0%} worse)",
+            file=sys.stderr,
+        )
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""End-to-end benchmark suite over a synthetic institution.
+
+Generates an institution, solves and finalizes its timetable, then drives
+the read endpoints, a CSV import and the exports through the application
+in-process. Run through `benchmarks.run_suite`, which points the
+application at the benchmark database before this module is imported.
+"""
+import asyncio
+import csv
+import io
+import itertools
+import platform
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.support import create_database, git_revision, percentiles
+
+import httpx
+from sqlalchemy.engine import make_url
+
+from app.core.database import database_url, engine as app_engine, read_engine
+from app.main import app
+from app.solver.engine import SolveOptions, persist_result, solve_problem
+from app.solver.problem import load_problem
+from benchmarks.institution import InstitutionSpec, generate_institution
+
+BASE_URL = "http://bench/api/v1"
+_DB_QUERIES = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+async def _wait(client: httpx.AsyncClient, path: str, done: Callable[[dict], bool], timeout: float = 600) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        status = (await client.get(path)).json()
+        if done(status):
+            return status
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{path} did not finish in {timeout}s")
+        await asyncio.sleep(0.05)
+
+
+async def bench_solver(sessionmaker, scenario_id: uuid.UUID, time_limit: float) -> dict:
+    """Solve the scenario once, recording when each improving solution arrived"""
+    async with sessionmaker() as db:
+        started = time.perf_counter()
+        problem = await load_problem(db, scenario_id)
+        load_seconds = time.perf_counter() - started
+
+    solutions = []
+
+    def on_progress(event: dict):
+        if event["event"] == "solution":
+            solutions.append({"seconds": round(event["wallTime"], 3), "objective": event["objective"]})
+
+    options = SolveOptions(time_limit_seconds=time_limit)
+    result = await asyncio.to_thread(solve_problem, problem, options, on_progress)
+
+    async with sessionmaker() as db:
+        started = time.perf_counter()
+        timetable = await persist_result(db, problem, result)
+        await db.commit()
+        persist_seconds = time.perf_counter() - started
+
+    return {
+        "timetableId": str(timetable.id) if timetable else None,
+        "status": result.status,
+        "units": len(problem.units),
+        "assignments": len(result.placements),
+        "loadSeconds": round(load_seconds, 3),
+        "buildSeconds": result.stats["buildSeconds"],
+        "firstSolutionSeconds": result.stats["firstSolutionSeconds"],
+        "totalSeconds": round(result.wall_time, 3),
+        "persistSeconds": round(persist_seconds, 3),
+        "firstObjective": solutions[0]["objective"] if solutions else None,
+        "objective": result.objective,
+        "bound": result.bound,
+        "improvements": len(solutions),
+    }
+
+
+async def bench_endpoint(client: httpx.AsyncClient, paths: List[str], requests: int, concurrency: int) -> dict:
+    """Latency percentiles of GETs cycling through `paths`, `concurrency` at a time"""
+    latencies: List[float] = []
+    queries: List[int] = []
+    pending = itertools.islice(itertools.cycle(paths), requests)
+
+    async def worker():
+        for path in pending:
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, (path, response.status_code)
+            match = _DB_QUERIES.search(response.headers.get("server-timing", ""))
+            if match:
+                queries.append(int(match.group(1)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        **percentiles(latencies),
+        "requestsPerSecond": round(requests / elapsed, 1),
+        "dbQueriesPerRequest": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def _csv_upload(header: List[str], rows: List[list]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def _import(client: httpx.AsyncClient, data_type: str, body: bytes) -> dict:
+    started = time.perf_counter()
+    response = await client.post(
+        f"/admin/upload/csv?data_type={data_type}", files={"file": (f"{data_type}.csv", body, "text/csv")},
+    )
+    import_id = response.json()["importId"]
+    status = await _wait(client, f"/admin/upload/csv/{import_id}", lambda s: s["status"] in ("completed", "failed"))
+    seconds = time.perf_counter() - started
+    return {
+        "status": status["status"],
+        "rows": status["rowsRead"],
+        "rowsFailed": status["rowsFailed"],
+        "bytes": len(body),
+        "seconds": round(seconds, 3),
+        "rowsPerSecond": round(status["rowsRead"] / seconds, 1),
+    }
+
+
+async def bench_csv_import(client: httpx.AsyncClient, spec: InstitutionSpec, rows: int, course_codes: List[str]) -> dict:
+    """Import new students, then their enrollments, which resolve natural keys"""
+    numbers = [f"I{i:06d}" for i in range(rows)]
+    students = _csv_upload(
+        ["enrollment_number", "name", "program", "semester", "branch"],
+        [[number, f"Imported {i}", spec.program, spec.semester, "CSE"] for i, number in enumerate(numbers)],
+    )
+    enrollments = _csv_upload(
+        ["enrollment_number", "course_code", "semester", "academic_year"],
+        [[number, course_codes[i % len(course_codes)], spec.semester, "2024-25"] for i, number in enumerate(numbers)],
+    )
+    return {
+        "students": await _import(client, "students", students),
+        "enrollments": await _import(client, "enrollments", enrollments),
+    }
+
+
+async def bench_exports(client: httpx.AsyncClient, timetable_id: str, enrollment_numbers: List[str], students: int) -> dict:
+    """Per-student exports when first rendered and when served again, then a bulk export"""
+    report = {}
+    sample = enrollment_numbers[:students]
+    # Start the renderer pool outside the timings, with a student left out of the sample
+    await client.get(f"/students/{enrollment_numbers[-1]}/export/pdf")
+    for export in ("pdf", "ical"):
+        paths = [f"/students/{number}/export/{export}" for number in sample]
+        cold = await bench_endpoint(client, paths, len(paths), 1)
+        warm = await bench_endpoint(client, paths, len(paths), 1)
+        report[export] = {"cold": cold, "warm": warm}
+
+    started = time.perf_counter()
+    response = await client.post(
+        "/admin/exports/students", json={"timetableId": timetable_id, "formats": ["pdf", "ical"], "package": "directory"},
+    )
+    export_id = response.json()["exportId"]
+    status = await _wait(client, f"/admin/exports/students/{export_id}", lambda s: s["status"] in ("completed", "failed"))
+    seconds = time.perf_counter() - started
+    report["bulk"] = {
+        "status": status["status"],
+        "students": status["studentsDone"],
+        "seconds": round(seconds, 3),
+        "studentsPerSecond": round(status["studentsDone"] / seconds, 1) if seconds else None,
+    }
+    return report
+
+
+def _database_name(url: str) -> str:
+    parsed = make_url(url)
+    return parsed.get_backend_name() if parsed.get_backend_name() == "sqlite" else parsed.render_as_string(hide_password=True)
+
+
+async def run(
+    spec: InstitutionSpec,
+    scale: Optional[str] = None,
+    reset: bool = False,
+    requests: int = 200,
+    concurrency: int = 1,
+    solver_time_limit: float = 30.0,
+    csv_rows: int = 5000,
+    export_students: int = 20,
+    seed: int = 7,
+) -> Dict[str, dict]:
+    engine, sessionmaker = await create_database(database_url, reset=reset)
+    report: Dict[str, dict] = {
+        "meta": {
+            "commit": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": _database_name(database_url),
+            "scale": scale,
+            "seed": seed,
+            "requests": requests,
+            "concurrency": concurrency,
+        },
+    }
+    try:
+        generated = await generate_institution(sessionmaker, spec, seed)
+        report["generation"] = {"seconds": generated["seconds"], "rows": generated["rows"]}
+        report["meta"]["spec"] = generated["spec"]
+
+        solver = report["solver"] = await bench_solver(sessionmaker, uuid.UUID(generated["scenarioId"]), solver_time_limit)
+        timetable_id = solver["timetableId"]
+        if timetable_id is None:
+            raise RuntimeError(f"Solver found no timetable ({solver['status']}); raise --solver-time-limit")
+
+        async with httpx.AsyncClient(app=app, base_url=BASE_URL, timeout=600) as client:
+            response = await client.post(f"/timetables/{timetable_id}/finalize")
+            assert response.status_code == 200, response.text
+
+            students = generated["enrollmentNumbers"]
+            faculty = generated["facultyCodes"]
+            report["endpoints"] = {}
+            for name, paths in (
+                ("studentTimetable", [f"/students/{number}/timetable" for number in students]),
+                ("studentSync", [f"/students/{number}/sync" for number in students]),
+                ("facultySchedule", [f"/faculty/{code}/schedule" for code in faculty]),
+                ("facultyWorkload", ["/faculty/workload"]),
+                ("timetable", [f"/timetables/{timetable_id}"]),
+            ):
+                report["endpoints"][name] = await bench_endpoint(client, paths, requests, concurrency)
+
+            report["exports"] = await bench_exports(client, timetable_id, students, export_students)
+            course_codes = [f"C{i:04d}" for i in range(spec.courses)]
+            report["csvImport"] = await bench_csv_import(client, spec, csv_rows, course_codes)
+    finally:
+        await engine.dispose()
+        await app_engine.dispose()
+        if read_engine is not app_engine:
+            await read_engine.dispose()
+    return report
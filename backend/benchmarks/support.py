@@ -0,0 +1,129 @@
+"""Shared helpers for the backend benchmarks.
+
+Benchmarks run against SQLite by default so they need nothing but
+aiosqlite; pass a PostgreSQL URL to measure the real thing.
+"""
+from contextlib import contextmanager
+from typing import Dict, List, Sequence
+import os
+import subprocess
+import time
+
+# Keep the application's module-level engine off the configured database
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+from app.core.database import Base
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite://"
+
+
+@compiles(UUID, "sqlite")
+def _compile_uuid_sqlite(type_, compiler, **kw):
+    # The models use the PostgreSQL UUID type; store it as hex text on SQLite
+    return "CHAR(32)"
+
+
+async def create_database(url: str = DEFAULT_DATABASE_URL, reset: bool = False):
+    """Engine + session factory with all tables created, dropping existing ones on reset"""
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        if reset:
+            await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+class QueryCounter:
+    """Count statements sent to the database while active"""
+
+    def __init__(self, engine):
+        self._engine = engine.sync_engine
+        self.count = 0
+        self.statements = []
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    @contextmanager
+    def measure(self):
+        self.count = 0
+        self.statements = []
+        event.listen(self._engine, "before_cursor_execute", self._before_execute)
+        try:
+            yield self
+        finally:
+            event.remove(self._engine, "before_cursor_execute", self._before_execute)
+
+
+@contextmanager
+def timed(results: dict, name: str):
+    started = time.perf_counter()
+    yield
+    results[name] = round(time.perf_counter() - started, 4)
+
+
+def percentiles(samples: Sequence[float], points: Sequence[int] = (50, 90, 99)) -> Dict[str, float]:
+    """Nearest-rank percentiles and the maximum of samples in seconds, as milliseconds"""
+    ordered = sorted(samples)
+    result = {}
+    for point in points:
+        rank = max(-(-point * len(ordered) // 100) - 1, 0)
+        result[f"p{point}Ms"] = round(ordered[rank] * 1000, 2)
+    result["maxMs"] = round(ordered[-1] * 1000, 2)
+    return result
+
+
+def git_revision() -> str:
+    """Commit of the working tree, marked dirty when it has changes"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def _flatten(report: dict, prefix: str = "") -> Dict[str, float]:
+    values = {}
+    for key, value in report.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            values.update(_flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = value
+    return values
+
+
+def compare_reports(baseline: dict, current: dict, tolerance: float) -> List[dict]:
+    """Metrics of `current` that are worse than `baseline` by more than `tolerance` (0.2 = 20%).
+
+    Keys ending in Ms or Seconds are durations, lower is better; keys
+    ending in PerSecond are throughputs, higher is better. Maxima are
+    single samples and too noisy to gate on; other numbers (row counts,
+    the objective) are context and not compared.
+    """
+    before = _flatten({key: baseline.get(key) or {} for key in baseline if key != "meta"})
+    regressions = []
+    for path, value in _flatten({key: current[key] for key in current if key != "meta"}).items():
+        old = before.get(path)
+        if not old or path.endswith("maxMs"):
+            continue
+        if path.endswith("PerSecond"):
+            change = (old - value) / old
+        elif path.endswith(("Ms", "Seconds")):
+            change = (value - old) / old
+        else:
+            continue
+        if change > tolerance:
+            regressions.append({"metric": path, "baseline": old, "current": value, "change": round(change, 3)})
+    return regressions
@@ -0,0 +1,99 @@
+"""Run the application against a throwaway SQLite database and in-memory cache.
+
+The settings are read when the application is imported, so the
+environment is set before anything from `app` is.
+"""
+import asyncio
+import os
+import tempfile
+import uuid
+
+_workdir = tempfile.mkdtemp(prefix="kairo-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_workdir}/tests.db"
+os.environ["DATABASE_READ_URL"] = ""
+os.environ["CACHE_BACKEND"] = "memory"
+os.environ["SOLVER_EXECUTOR"] = "inline"
+os.environ["NL_TRANSLATION_BACKEND"] = "local"
+os.environ["EXPORT_CACHE_DIR"] = os.path.join(_workdir, "exports")
+os.environ["NOTIFICATION_DEAD_LETTER_PATH"] = os.path.join(_workdir, "dead-letter.jsonl")
+os.environ["DEBUG"] = "false"
+
+import httpx
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+
+import app.models.academic  # noqa: F401 - register the tables
+import app.models.audit  # noqa: F401
+import app.models.scheduling  # noqa: F401
+from app.core.database import AsyncSessionLocal, Base, engine
+from app.main import app
+from app.solver.engine import SolveOptions, persist_result, solve_problem
+from app.solver.problem import load_problem
+from benchmarks.institution import InstitutionSpec, generate_institution
+
+# Small enough to solve to a first solution in well under a second
+SPEC = InstitutionSpec(students=60, courses=8, rooms=6, faculty=6, days=5, slots_per_day=6, branches=2)
+
+
+@compiles(UUID, "sqlite")
+def _compile_uuid_sqlite(type_, compiler, **kw):
+    # The models use the PostgreSQL UUID type; store it as hex text on SQLite
+    return "CHAR(32)"
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    # The engine's pooled connections belong to the loop that opened them
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+async def institution() -> dict:
+    """A solvable institution, generated once for the session"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    generated = await generate_institution(AsyncSessionLocal, SPEC)
+    yield generated
+    await engine.dispose()
+
+
+@pytest.fixture(scope="session")
+async def client():
+    async with httpx.AsyncClient(app=app, base_url="http://test/api/v1", timeout=60) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+async def final_timetable(institution, client) -> str:
+    """Id of a solved timetable of the institution, finalized through the API"""
+    async with AsyncSessionLocal() as db:
+        problem = await load_problem(db, uuid.UUID(institution["scenarioId"]))
+    result = await asyncio.to_thread(solve_problem, problem, SolveOptions(time_limit_seconds=10, num_workers=2))
+    async with AsyncSessionLocal() as db:
+        timetable = await persist_result(db, problem, result)
+    response = await client.post(f"/timetables/{timetable.id}/finalize")
+    assert response.status_code == 200, response.text
+    return str(timetable.id)
+
+
+@pytest.fixture
+def connections():
+    """Number of the primary engine's connections checked out since the test started, as a callable"""
+    pool = engine.sync_engine.pool
+    out = set()
+
+    def checkout(dbapi_connection, record, proxy):
+        out.add(id(record))
+
+    def checkin(dbapi_connection, record):
+        out.discard(id(record))
+
+    event.listen(pool, "checkout", checkout)
+    event.listen(pool, "checkin", checkin)
+    yield lambda: len(out)
+    event.remove(pool, "checkout", checkout)
+    event.remove(pool, "checkin", checkin)
@@ -0,0 +1,28 @@
+import pytest
+
+from app.core.compression import entity_tags, etag_matches, negotiate
+
+
+def test_negotiation_follows_client_preferences():
+    assert negotiate("gzip;q=0.5, br", ["br", "gzip"]) == "br"
+    assert negotiate("br;q=0, gzip", ["br", "gzip"]) == "gzip"
+    assert negotiate("identity", ["br", "gzip"]) is None
+
+
+@pytest.mark.parametrize("header, matches", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", W/"abc" ,"y"', True),
+    ("*", True),
+    ('"abcd"', False),
+    ('"x, abc"', False),
+    ("", False),
+    (None, False),
+])
+def test_if_none_match_uses_weak_comparison(header, matches):
+    assert etag_matches(header, 'W/"abc"') is matches
+    assert etag_matches(header, '"abc"') is matches
+
+
+def test_entity_tags_keep_commas_inside_tags():
+    assert entity_tags('W/"a,b", "c"') == ['"a,b"', '"c"']
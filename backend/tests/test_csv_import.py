@@ -0,0 +1,96 @@
+import csv
+
+import pytest
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionLocal
+from app.models.academic import Faculty, Student
+from app.services.csv_import import (
+    IMPORT_SPECS, RowError, RowValidator, _parse_availability, _parse_list, run_import, start_import,
+)
+from app.services.exports import _cache_dir
+
+
+async def import_csv(tmp_path, data_type: str, header: list, rows: list) -> dict:
+    path = tmp_path / f"{data_type}.csv"
+    with open(path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(header)
+        writer.writerows(rows)
+    status = start_import(data_type, path.name)
+    await run_import(status, str(path))
+    return status.as_dict()
+
+
+def test_list_columns_accept_separated_values():
+    assert _parse_list("Projector; Whiteboard;") == ["Projector", "Whiteboard"]
+    assert _parse_list('["a;b", "c"]') == ["a;b", "c"]
+    with pytest.raises(RowError):
+        _parse_list("[1, 2")
+
+
+def test_availability_must_be_an_object_of_days():
+    assert _parse_availability('{"Monday": ["09:00-13:00", 2]}') == {"Monday": ["09:00-13:00", 2]}
+    for value in ("Monday;Tuesday", '["Monday"]', '{"Funday": []}', '{"Monday": "09:00-13:00"}', '{"Monday": ["9am"]}'):
+        with pytest.raises(RowError):
+            _parse_availability(value)
+
+
+def test_validator_uses_the_column_parsers():
+    header = ["code", "name", "short_name", "department", "expertise_tags", "availability_json"]
+    validator = RowValidator(IMPORT_SPECS["faculty"], header, {})
+    row = validator.convert(["F1", "Faculty 1", "F1", "CSE", "ai;ml", '{"Friday": [0, 1]}'])
+    assert row["expertise_tags"] == ["ai", "ml"]
+    assert row["availability_json"] == {"Friday": [0, 1]}
+    with pytest.raises(RowError, match="availability_json"):
+        validator.convert(["F1", "Faculty 1", "F1", "CSE", "", "Monday;Tuesday"])
+
+
+async def test_blank_cells_keep_stored_values(tmp_path, institution):
+    code = institution["facultyCodes"][0]
+    status = await import_csv(
+        tmp_path, "faculty", ["code", "name", "short_name", "department", "max_load"],
+        [[code, "Renamed", "RN", "CSE", ""], ["FNEW1", "New", "NW", "ECE", ""]],
+    )
+    assert status["status"] == "completed" and status["rowsWritten"] == 2
+    async with AsyncSessionLocal() as db:
+        loads = dict((await db.execute(select(Faculty.code, Faculty.max_load).where(Faculty.code.in_([code, "FNEW1"])))).all())
+    assert loads == {code: 20, "FNEW1": 20}
+
+
+async def test_rejected_rows_are_reported_one_by_one(tmp_path, institution):
+    # Out of range for the integer column, so the database rejects the whole statement
+    status = await import_csv(
+        tmp_path, "students", ["enrollment_number", "name", "program", "semester", "branch"],
+        [
+            ["X000001", "One", "OTHER", "1", "CSE"],
+            ["X000002", "Two", "OTHER", str(2 ** 70), "CSE"],
+            ["X000003", "Three", "OTHER", "1", "CSE"],
+        ],
+    )
+    assert status["status"] == "completed"
+    assert status["rowsWritten"] == 2
+    assert status["rowsFailed"] == 1
+    assert [error["line"] for error in status["errors"]] == [3]
+    async with AsyncSessionLocal() as db:
+        written = (await db.execute(select(Student.enrollment_number).where(Student.program == "OTHER"))).scalars().all()
+    assert sorted(written) == ["X000001", "X000003"]
+
+
+async def test_course_import_refreshes_cached_views(tmp_path, client, institution, final_timetable):
+    number = institution["enrollmentNumbers"][0]
+    before = (await client.get(f"/students/{number}/timetable")).json()
+    card = before["assignments"][0]
+    assert (await client.get(f"/students/{number}/export/ical")).status_code == 200
+    assert (_cache_dir() / final_timetable).exists()
+
+    status = await import_csv(
+        tmp_path, "courses", ["code", "title", "type", "credits", "branch"],
+        [[card["courseCode"], "Renamed Course", "Major", "4", card["branch"]]],
+    )
+    assert status["status"] == "completed", status["errors"]
+
+    after = (await client.get(f"/students/{number}/timetable")).json()
+    titles = {c["courseTitle"] for c in after["assignments"] if c["courseCode"] == card["courseCode"]}
+    assert titles == {"Renamed Course"}
+    assert not (_cache_dir() / final_timetable).exists()
@@ -0,0 +1,57 @@
+import os
+import time
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.services.exports import prune_export_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def artifact(directory, name: str, size: int, age: float):
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_least_recently_used_artifacts_go_first(cache_dir):
+    timetable = cache_dir / str(uuid.uuid4())
+    oldest = artifact(timetable, "a.pdf", 100, age=30)
+    older = artifact(timetable, "b.ics", 100, age=20)
+    recent = artifact(cache_dir / str(uuid.uuid4()), "c.xlsx", 100, age=10)
+
+    assert prune_export_cache(max_bytes=150, max_age_seconds=0) == 2
+    assert not oldest.exists() and not older.exists() and recent.exists()
+
+
+def test_artifacts_past_the_age_bound_go(cache_dir):
+    timetable = cache_dir / str(uuid.uuid4())
+    stale = artifact(timetable, "a.pdf", 10, age=7200)
+    fresh = artifact(timetable, "b.pdf", 10, age=60)
+
+    assert prune_export_cache(max_bytes=0, max_age_seconds=3600) == 1
+    assert not stale.exists() and fresh.exists()
+
+
+def test_batches_and_renders_in_progress_are_kept(cache_dir):
+    batch = artifact(cache_dir / "batches" / "job", "students.zip", 1000, age=7200)
+    rendering = artifact(cache_dir / str(uuid.uuid4()), "a.pdf.1a2b3c4d.part", 1000, age=60)
+    abandoned = artifact(cache_dir / str(uuid.uuid4()), "b.pdf.5e6f7a8b.part", 1000, age=7200)
+
+    prune_export_cache(max_bytes=1, max_age_seconds=1)
+    assert batch.exists() and rendering.exists()
+    assert not abandoned.exists()
+
+
+def test_missing_cache_directory_is_fine(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_CACHE_DIR", str(tmp_path / "missing"))
+    assert prune_export_cache(max_bytes=1, max_age_seconds=1) == 0
@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.core import instrumentation
+from app.core.instrumentation import InstrumentationMiddleware
+from app.core.metrics import HTTP_REQUEST_DB_QUERIES, HTTP_REQUEST_SECONDS
+
+
+def query():
+    """Count a statement as the engine listener would"""
+    instrumentation._request_db.get()[0] += 1
+
+
+async def slow_cleanup():
+    await asyncio.sleep(0.3)
+    query()
+
+
+async def with_background_task(request):
+    query()
+    return PlainTextResponse("ok", background=BackgroundTask(slow_cleanup))
+
+
+async def failing(request):
+    query()
+    raise RuntimeError("boom")
+
+
+def observed(histogram, **labels):
+    counts, total = histogram._values[histogram._key(labels)]
+    return sum(counts), total
+
+
+async def test_requests_are_timed_up_to_their_last_body_message():
+    app = Starlette(routes=[Route("/instrumented/background", with_background_task)])
+    app.add_middleware(InstrumentationMiddleware)
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        assert (await client.get("/instrumented/background")).status_code == 200
+
+    count, seconds = observed(HTTP_REQUEST_SECONDS, method="GET", route="/instrumented/background", status=200)
+    assert count == 1 and seconds < 0.3
+    assert observed(HTTP_REQUEST_DB_QUERIES, method="GET", route="/instrumented/background") == (1, 1)
+
+
+async def test_failed_requests_are_still_recorded():
+    app = Starlette(routes=[Route("/instrumented/failing", failing)])
+    app.add_middleware(InstrumentationMiddleware)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.get("/instrumented/failing")).status_code == 500
+
+    count, _ = observed(HTTP_REQUEST_SECONDS, method="GET", route="/instrumented/failing", status=500)
+    assert count == 1
+    assert observed(HTTP_REQUEST_DB_QUERIES, method="GET", route="/instrumented/failing") == (1, 1)
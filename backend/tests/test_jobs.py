@@ -0,0 +1,141 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+
+from app.core.database import AsyncSessionLocal
+from app.models.scheduling import Scenario, ScenarioStatus
+from app.solver.engine import SolveOptions
+from app.solver.jobs import FINISHED_STATES, InlineJobRunner, JobState, JobStatusStore
+
+
+async def wait_for(runner, job_id: str, states, timeout: float = 60) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        status = runner.status(job_id)
+        if status["status"] in {state.value for state in states}:
+            return status
+        assert time.monotonic() < deadline, f"job stayed {status['status']}"
+        await asyncio.sleep(0.02)
+
+
+@pytest.fixture
+async def runner():
+    runner = InlineJobRunner(JobStatusStore(), cpu_budget=4, max_concurrent_jobs=2)
+    yield runner
+    await runner.shutdown()
+
+
+def test_store_reports_gap_and_progress():
+    store = JobStatusStore()
+    store.create("job", timeLimit=10)
+    assert store.get("job")["progress"] == 0
+    assert store.get("job")["estimatedTimeRemaining"] == 10
+
+    store.update("job", status=JobState.SOLVING.value, startedAt=time.monotonic() - 5)
+    store.apply_event("job", {"event": "solution", "objective": 120.0, "bound": 90.0, "solutions": 3})
+    status = store.get("job")
+    assert status["gap"] == pytest.approx(0.25)
+    assert status["solutions"] == 3
+    assert 45 <= status["progress"] <= 55
+    assert status["estimatedTimeRemaining"] <= 5
+
+    store.update("job", status=JobState.COMPLETED.value)
+    assert store.get("job")["progress"] == 100
+    assert store.get("job")["estimatedTimeRemaining"] == 0
+
+
+def test_store_evicts_oldest_finished_jobs():
+    store = JobStatusStore(max_finished=2)
+    for job_id in ("a", "b", "c"):
+        store.create(job_id)
+        store.update(job_id, status=JobState.COMPLETED.value)
+    assert store.get("a") is None
+    assert store.get("b") is not None and store.get("c") is not None
+
+
+async def test_submit_solves_and_persists(runner, institution):
+    seen = []
+    store_update = runner.store.update
+
+    def record(job_id, **fields):
+        seen.append(fields.get("status"))
+        return store_update(job_id, **fields)
+
+    runner.store.update = record
+    job_id = await runner.submit(uuid.UUID(institution["scenarioId"]), SolveOptions(time_limit_seconds=10, num_workers=2))
+    status = await wait_for(runner, job_id, FINISHED_STATES)
+
+    assert status["status"] == JobState.COMPLETED.value, status["error"]
+    assert status["timetableId"] is not None
+    assert status["solutions"] >= 1
+    assert status["gap"] is not None and status["gap"] >= 0
+    assert status["progress"] == 100
+    # Out of the queue through each stage, in order
+    states = [state for state in seen if state is not None]
+    assert states == ["loading", "solving", "persisting", "completed"]
+
+
+async def test_submit_clamps_workers_to_the_budget(runner, institution):
+    job_id = await runner.submit(uuid.UUID(institution["scenarioId"]), SolveOptions(time_limit_seconds=5, num_workers=16))
+    assert runner.status(job_id)["numWorkers"] == 4
+    await wait_for(runner, job_id, FINISHED_STATES)
+
+
+async def test_cancel_while_solving(runner, institution):
+    scenario_id = uuid.UUID(institution["scenarioId"])
+    # No time to prove optimality, so the search is still running when cancelled
+    job_id = await runner.submit(scenario_id, SolveOptions(time_limit_seconds=120, num_workers=1))
+    await wait_for(runner, job_id, {JobState.SOLVING})
+    started = time.monotonic()
+    assert runner.cancel(job_id)
+
+    status = await wait_for(runner, job_id, FINISHED_STATES, timeout=30)
+    assert status["status"] == JobState.CANCELLED.value
+    assert time.monotonic() - started < 30
+    # The scenario is reset right after the status reports the cancellation
+    await asyncio.gather(*(job.task for job in list(runner._jobs.values())))
+    async with AsyncSessionLocal() as db:
+        assert (await db.get(Scenario, scenario_id)).status == ScenarioStatus.DRAFT
+
+
+async def test_cancel_queued_job(runner, institution):
+    async with runner.reserve_cores(runner.cpu_budget):
+        job_id = await runner.submit(uuid.UUID(institution["scenarioId"]), SolveOptions(time_limit_seconds=5, num_workers=1))
+        await asyncio.sleep(0.05)
+        assert runner.status(job_id)["status"] == JobState.QUEUED.value
+        assert runner.cancel(job_id)
+        status = await wait_for(runner, job_id, FINISHED_STATES)
+    assert status["status"] == JobState.CANCELLED.value
+    assert not runner.cancel("job_unknown")
+
+
+async def test_jobs_wait_for_reserved_cores(runner, institution):
+    async with runner.reserve_cores(100) as held:
+        assert held == runner.cpu_budget
+        job_id = await runner.submit(uuid.UUID(institution["scenarioId"]), SolveOptions(time_limit_seconds=5, num_workers=2))
+        await asyncio.sleep(0.2)
+        assert runner.status(job_id)["status"] == JobState.QUEUED.value
+    status = await wait_for(runner, job_id, FINISHED_STATES)
+    assert status["status"] == JobState.COMPLETED.value
+
+
+async def test_reservations_share_the_budget(runner):
+    order = []
+
+    async def reserve(name: str, count: int, hold: float):
+        async with runner.reserve_cores(count) as held:
+            order.append((name, held))
+            await asyncio.sleep(hold)
+
+    first = asyncio.create_task(reserve("first", 3, 0.2))
+    await asyncio.sleep(0.01)
+    # Needs 2 of the 4 cores while only 1 is free, so it runs after the first
+    second = asyncio.create_task(reserve("second", 2, 0))
+    await asyncio.sleep(0.05)
+    assert order == [("first", 3)]
+    await asyncio.gather(first, second)
+    assert order == [("first", 3), ("second", 2)]
+    async with runner.reserve_cores(0) as held:
+        assert held == 1
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.services import notifications
+from app.services.notifications import NotificationDispatcher, dead_letter_path, start_batch
+from app.services.smtp_sink import SmtpSink
+
+
+@pytest.fixture
+async def sink(monkeypatch):
+    async with SmtpSink() as sink:
+        monkeypatch.setattr(settings, "SMTP_HOST", sink.host)
+        monkeypatch.setattr(settings, "SMTP_PORT", sink.port)
+        monkeypatch.setattr(settings, "SMTP_STARTTLS", False)
+        monkeypatch.setattr(settings, "SMTP_USER", None)
+        monkeypatch.setattr(settings, "NOTIFICATION_RETRY_SECONDS", 0.01)
+        yield sink
+
+
+@pytest.fixture
+async def dispatcher(sink):
+    dispatcher = NotificationDispatcher(pool_size=2, rate_per_second=0, max_attempts=3, queue_size=10)
+    yield dispatcher
+    await dispatcher.shutdown(timeout=1)
+
+
+async def settled(batch, timeout: float = 5):
+    async def wait():
+        while batch.status not in ("completed", "failed"):
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(wait(), timeout)
+    return batch.as_dict()
+
+
+async def test_messages_are_delivered(sink, dispatcher):
+    batch = start_batch("class_moved")
+    details = {"courseCode": "CS101", "from": "Monday 09:00", "to": "Tuesday 11:00"}
+    dispatcher.enqueue_batch(batch, details, emails=["a@kairo.local", "b@kairo.local", "A@kairo.local"])
+
+    result = await settled(batch)
+    assert result["status"] == "completed"
+    assert (result["total"], result["sent"], result["failed"]) == (2, 2, 0)
+    assert sorted(r for m in sink.messages for r in m.recipients) == ["a@kairo.local", "b@kairo.local"]
+    assert {m.parsed()["Subject"] for m in sink.messages} == {"Class moved: CS101"}
+
+
+async def test_deferred_recipients_are_retried(sink, dispatcher):
+    sink.defer = {"late@kairo.local": 2}
+    batch = start_batch("timetable_published")
+    dispatcher.enqueue_batch(batch, {}, emails=["late@kairo.local"])
+
+    result = await settled(batch)
+    assert (result["sent"], result["failed"], result["retries"]) == (1, 0, 2)
+    assert [m.recipients for m in sink.messages] == [["late@kairo.local"]]
+
+
+async def test_refused_recipients_are_dead_lettered(sink, dispatcher):
+    sink.reject = {"gone@kairo.local"}
+    sink.defer = {"busy@kairo.local": 10}
+    batch = start_batch("timetable_published")
+    dispatcher.enqueue_batch(batch, {}, emails=["gone@kairo.local", "busy@kairo.local", "ok@kairo.local"])
+
+    result = await settled(batch)
+    assert (result["sent"], result["failed"]) == (1, 2)
+    letters = {letter["address"]: letter for letter in result["deadLetters"]}
+    # A permanent refusal is not retried; a temporary one is, until attempts run out
+    assert letters["gone@kairo.local"]["attempts"] == 1
+    assert letters["busy@kairo.local"]["attempts"] == 3
+    logged = [json.loads(line) for line in dead_letter_path().read_text().splitlines()]
+    assert {"gone@kairo.local", "busy@kairo.local"} <= {entry["address"] for entry in logged}
+
+
+async def test_send_endpoint_returns_before_queueing(client, sink, monkeypatch):
+    # A queue of one keeps queueing waiting on delivery, which must not hold up the response
+    monkeypatch.setattr(settings, "NOTIFICATION_QUEUE_SIZE", 1)
+    monkeypatch.setattr(settings, "SMTP_RATE_PER_SECOND", 20)
+    await notifications.shutdown_notifications()
+    emails = [f"s{i}@kairo.local" for i in range(10)]
+
+    response = await client.post("/admin/notifications/send", json={"kind": "timetable_published", "emails": emails})
+    assert response.status_code == 200, response.text
+    batch = notifications.get_notification_batch(response.json()["batchId"])
+    assert not batch.queued_all
+
+    result = await settled(batch)
+    assert result["sent"] == len(emails)
+    await notifications.shutdown_notifications()
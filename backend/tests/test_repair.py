@@ -0,0 +1,32 @@
+import asyncio
+import uuid
+
+from app.solver.jobs import get_job_runner
+from app.solver.repair import RepairOptions, repair_timetable
+
+
+async def test_repair_moves_sessions_out_of_a_closed_room(client, final_timetable):
+    timetable = (await client.get(f"/timetables/{final_timetable}")).json()
+    room = timetable["assignments"][0]["roomNumber"]
+
+    response = await client.post(f"/timetables/{final_timetable}/repair", json={"roomOutages": [{"roomCode": room}]})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["status"] in ("OPTIMAL", "FEASIBLE")
+    assert result["changes"] and all(change["from"]["roomNumber"] == room for change in result["changes"])
+    assert all(change["to"]["roomNumber"] != room for change in result["changes"] if change["to"])
+    assert result["timetableId"] not in (None, final_timetable)
+
+    missing = await client.post(f"/timetables/{uuid.uuid4()}/repair", json={})
+    assert missing.status_code == 404
+
+
+async def test_repair_holds_no_connection_while_waiting_for_cores(final_timetable, connections):
+    runner = get_job_runner()
+    async with runner.reserve_cores(runner.cpu_budget):
+        repair = asyncio.create_task(repair_timetable(uuid.UUID(final_timetable), RepairOptions(time_limit_seconds=5)))
+        await asyncio.sleep(0.3)
+        assert not repair.done()
+        assert connections() == 0
+    result = await repair
+    assert result["status"] in ("OPTIMAL", "FEASIBLE")
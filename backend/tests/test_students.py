@@ -0,0 +1,31 @@
+async def test_student_timetable_etag_is_shared_by_every_encoding(client, institution, final_timetable):
+    path = f"/students/{institution['enrollmentNumbers'][0]}/timetable"
+    compressed = await client.get(path, headers={"accept-encoding": "gzip"})
+    plain = await client.get(path, headers={"accept-encoding": "identity"})
+
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in plain.headers
+    assert compressed.json() == plain.json()
+    etag = plain.headers["etag"]
+    assert etag.startswith("W/") and compressed.headers["etag"] == etag
+
+    for header in (etag, etag.removeprefix("W/"), f'"other", {etag}', "*"):
+        revalidated = await client.get(path, headers={"if-none-match": header})
+        assert revalidated.status_code == 304, header
+    assert (await client.get(path, headers={"if-none-match": '"other"'})).status_code == 200
+
+
+async def test_sync_accepts_its_weak_etag(client, institution, final_timetable):
+    path = f"/students/{institution['enrollmentNumbers'][0]}/sync"
+    first = await client.get(path)
+    etag = first.headers["etag"]
+    assert etag.startswith("W/")
+    assert (await client.get(path, headers={"if-none-match": etag})).status_code == 304
+
+
+async def test_dashboard_revalidates_compressed_responses(client, institution):
+    first = await client.get("/admin/dashboard/stats", headers={"accept-encoding": "gzip"})
+    etag = first.headers["etag"]
+    assert etag.startswith("W/")
+    again = await client.get("/admin/dashboard/stats", headers={"if-none-match": etag})
+    assert again.status_code == 304
@@ -0,0 +1,77 @@
+from datetime import date, datetime, timezone
+import uuid
+
+import pytest
+
+from app.core.cache import get_cache
+from app.core.database import AsyncSessionLocal
+from app.repositories.assignments import AssignmentRow
+from app.services import substitutes
+from app.services.substitutes import SubstituteIndex, _Member, get_substitute_index, leave_recorded
+from app.solver.problem import SlotInfo
+
+SLOTS = [SlotInfo(uuid.uuid4(), "Monday", f"{9 + i:02d}:00", f"{10 + i:02d}:00", i, 60) for i in range(3)]
+
+
+def member(code: str, max_hours: int, tags=(), department: str = "CSE") -> _Member:
+    return _Member(uuid.uuid4(), code, code, department, max_hours * 60, frozenset(tags))
+
+
+def booking(faculty: _Member, slot: int, minutes: int = 60) -> AssignmentRow:
+    return AssignmentRow(
+        uuid.uuid4(), uuid.uuid4(), "C1", "Course", "Major", "CSE", uuid.uuid4(), "R1",
+        faculty.id, faculty.code, faculty.code, faculty.code,
+        SLOTS[slot].id, "Monday", SLOTS[slot].start_time, SLOTS[slot].end_time, slot, minutes, "cohort",
+    )
+
+
+def test_faculty_without_a_maximum_load_are_never_out_of_hours():
+    absent, capped, uncapped, full = member("A", 10), member("B", 10), member("C", 0), member("D", 1)
+    index = SubstituteIndex(SLOTS, [absent, capped, uncapped, full], [0b111] * 4, date(2024, 1, 1))
+    index.add_timetable(uuid.uuid4(), [booking(absent, 0), booking(capped, 1), booking(uncapped, 2), booking(full, 2)])
+
+    [suggestion] = index.suggest(absent.id)
+    candidates = suggestion["candidates"]
+    assert [c["code"] for c in candidates] == ["C", "B"]
+    assert candidates[0]["remainingHours"] is None
+    assert candidates[1]["remainingHours"] == 9
+
+
+@pytest.fixture
+async def fresh_index(institution):
+    substitutes._index = None
+    substitutes._index_version = None
+    async with AsyncSessionLocal() as db:
+        yield await get_substitute_index(db)
+    substitutes._index = None
+
+
+async def lookup():
+    async with AsyncSessionLocal() as db:
+        return await get_substitute_index(db)
+
+
+async def test_own_writes_update_the_index_in_place(fresh_index):
+    faculty_id = fresh_index.members[0].id
+    now = datetime.now(timezone.utc)
+    await leave_recorded(faculty_id, now, now)
+    assert await lookup() is fresh_index
+    assert fresh_index.leaves[0] == [(now, now)]
+
+
+async def test_other_workers_writes_trigger_a_rebuild(fresh_index):
+    cache = await get_cache()
+    await cache.incr(substitutes.VERSION_KEY)
+    rebuilt = await lookup()
+    assert rebuilt is not fresh_index
+    assert await lookup() is rebuilt
+
+
+async def test_a_write_racing_another_worker_is_not_applied_in_place(fresh_index):
+    cache = await get_cache()
+    # Another worker's write lands between this worker's lookup and its own write
+    await cache.incr(substitutes.VERSION_KEY)
+    now = datetime.now(timezone.utc)
+    await leave_recorded(fresh_index.members[0].id, now, now)
+    assert substitutes._index is None
+    assert await lookup() is not fresh_index
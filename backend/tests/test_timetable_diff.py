@@ -0,0 +1,58 @@
+from collections import Counter
+import random
+import uuid
+
+import pytest
+
+from app.core.database import AsyncSessionLocal
+from app.repositories.assignments import SessionKey, fetch_session_keys
+from app.services.timetable_diff import DiffError, apply_changes, diff_sessions, store_delta
+
+
+def test_applying_a_diff_round_trips():
+    rng = random.Random(7)
+    courses, slots, rooms, faculty = ([uuid.uuid4() for _ in range(n)] for n in (3, 6, 3, 3))
+
+    def timetable(size: int):
+        # A cohort attends one session of a course per slot
+        sessions = {(rng.choice(courses), rng.choice(["A", "B"]), rng.choice(slots)) for _ in range(size)}
+        return [SessionKey(*session, rng.choice(rooms), rng.choice(faculty)) for session in sessions]
+
+    for _ in range(50):
+        before, after = timetable(rng.randint(0, 12)), timetable(rng.randint(0, 12))
+        changes = diff_sessions(before, after)
+        assert Counter(apply_changes(before, changes)) == Counter(after)
+        assert diff_sessions(after, after) == []
+
+
+def test_a_diff_against_other_sessions_is_refused():
+    session = SessionKey(uuid.uuid4(), "A", uuid.uuid4(), uuid.uuid4(), uuid.uuid4())
+    changes = diff_sessions([session], [])
+    with pytest.raises(DiffError):
+        apply_changes([], changes)
+
+
+async def repaired(client, timetable_id: str, room: str) -> str:
+    response = await client.post(f"/timetables/{timetable_id}/repair", json={"roomOutages": [{"roomCode": room}]})
+    repaired_id = response.json()["timetableId"]
+    await store_delta(uuid.UUID(timetable_id), uuid.UUID(repaired_id))
+    return repaired_id
+
+
+async def test_timetables_are_rebuilt_through_a_chain_of_diffs(client, final_timetable):
+    rooms = sorted({a["roomNumber"] for a in (await client.get(f"/timetables/{final_timetable}")).json()["assignments"]})
+    first = await repaired(client, final_timetable, rooms[0])
+    second = await repaired(client, first, rooms[1])
+
+    response = await client.get(f"/timetables/{second}/reconstruct", params={"from": final_timetable})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["matchesStored"] is True
+    async with AsyncSessionLocal() as db:
+        assert len(result["sessions"]) == len(await fetch_session_keys(db, uuid.UUID(second)))
+
+    # Diffs only go forwards
+    backwards = await client.get(f"/timetables/{final_timetable}/reconstruct", params={"from": second})
+    assert backwards.status_code == 400
+    missing = await client.get(f"/timetables/{second}/reconstruct", params={"from": str(uuid.uuid4())})
+    assert missing.status_code == 404
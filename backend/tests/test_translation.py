@@ -0,0 +1,117 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.services.translation import RuleBasedBackend, TranslationBackend, TranslationService, normalize
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+
+class RecordingBackend(TranslationBackend):
+    """Echoes each sentence back, recording the batches it was sent"""
+    max_batch_size = 2
+
+    def __init__(self):
+        # Unique per test, so the shared cache holds nothing for it yet
+        self.name = f"recording-{uuid.uuid4().hex[:8]}"
+        self.batches = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def translate_batch(self, sentences):
+        self.batches.append(list(sentences))
+        await self.release.wait()
+        return [({"type": "echo", "text": sentence}, 1.0, sentence) for sentence in sentences]
+
+
+def service(backend: TranslationBackend) -> TranslationService:
+    return TranslationService(backend, max_concurrency=2, timeout_seconds=5)
+
+
+@pytest.mark.parametrize("sentence, expected", [
+    ("No classes on Saturday.", {"type": "time_restriction", "day": "Saturday"}),
+    (
+        "Dr ABC12 is unavailable on Monday after 2pm",
+        {"type": "faculty_unavailable", "facultyCode": "ABC12", "day": "Monday", "afterTime": "14:00"},
+    ),
+    (
+        "CS101 labs only in rooms LAB1 or LAB2",
+        {
+            "type": "room_restriction", "roomCodes": ["LAB1", "LAB2"],
+            "scope": {"courseCodes": ["CS101"], "sessionKinds": ["practical"]},
+        },
+    ),
+    (
+        "At most two sessions per day for each faculty",
+        {"type": "max_sessions_per_day", "maxSessions": 2, "per": "faculty"},
+    ),
+    (
+        "Avoid lectures before 9am on weekdays for ECE branch",
+        {
+            "type": "time_restriction", "day": WEEKDAYS, "beforeTime": "09:00",
+            "scope": {"branches": ["ECE"], "sessionKinds": ["theory"]},
+        },
+    ),
+    ("No classes between noon and 2 on Friday", {"type": "time_restriction", "day": "Friday", "afterTime": "12:00", "beforeTime": "14:00"}),
+])
+async def test_rule_based_patterns(sentence, expected):
+    [(expression, confidence, explanation)] = await RuleBasedBackend().translate_batch([sentence])
+    assert expression == expected
+    assert confidence == 0.9 and explanation
+
+
+async def test_rule_based_backend_rejects_unknown_sentences():
+    [(expression, confidence, _)] = await RuleBasedBackend().translate_batch(["Make everyone happy"])
+    assert expression is None and confidence == 0.0
+
+
+def test_normalize_folds_case_spacing_and_end_punctuation():
+    assert normalize("  No classes  on SATURDAY!  ") == normalize("no classes on saturday.") == "no classes on saturday"
+
+
+async def test_sentences_are_deduplicated_and_sent_as_written():
+    backend = RecordingBackend()
+    translations = await service(backend).translate(["Dr ABC12 away", "dr abc12  AWAY.", "CS101 labs", "Third one"])
+
+    sent = [sentence for batch in backend.batches for sentence in batch]
+    assert sent == ["Dr ABC12 away", "CS101 labs", "Third one"]
+    assert [len(batch) for batch in backend.batches] == [2, 1]
+    assert [t.structured_constraint["text"] for t in translations] == [
+        "Dr ABC12 away", "Dr ABC12 away", "CS101 labs", "Third one",
+    ]
+    assert [t.input for t in translations][1] == "dr abc12  AWAY."
+    assert not any(t.cached for t in translations)
+
+
+async def test_translations_are_cached():
+    backend = RecordingBackend()
+    await service(backend).translate(["No classes on Saturday"])
+    again = await service(backend).translate(["no classes on saturday."])
+    assert len(backend.batches) == 1
+    assert again[0].cached and again[0].structured_constraint["text"] == "No classes on Saturday"
+
+
+async def test_concurrent_requests_share_in_flight_translations():
+    backend = RecordingBackend()
+    backend.release.clear()
+    shared = service(backend)
+    first = asyncio.create_task(shared.translate(["No classes on Saturday"]))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(shared.translate(["NO CLASSES ON SATURDAY", "Dr ABC12 away"]))
+    await asyncio.sleep(0.01)
+    backend.release.set()
+    first, second = await asyncio.gather(first, second)
+
+    assert backend.batches == [["No classes on Saturday"], ["Dr ABC12 away"]]
+    assert second[0].structured_constraint == first[0].structured_constraint
+
+
+async def test_failed_batches_report_errors():
+    class FailingBackend(RecordingBackend):
+        async def translate_batch(self, sentences):
+            raise RuntimeError("backend down")
+
+    [translation] = await service(FailingBackend()).translate(["No classes on Saturday"])
+    assert translation.structured_constraint is None
+    assert translation.error == "backend down"
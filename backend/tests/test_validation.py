@@ -0,0 +1,24 @@
+import asyncio
+import uuid
+
+from app.solver.jobs import get_job_runner
+from app.solver.validation import ValidationOptions, validate_ruleset
+
+
+async def test_validate_endpoint(client, institution):
+    response = await client.post("/constraints/validate", json={"scenarioId": institution["scenarioId"]})
+    assert response.status_code == 200, response.text
+    assert response.json()["valid"] is True
+
+    missing = await client.post("/constraints/validate", json={"scenarioId": str(uuid.uuid4())})
+    assert missing.status_code == 404
+
+
+async def test_validation_holds_no_connection_while_waiting_for_cores(institution, connections):
+    runner = get_job_runner()
+    async with runner.reserve_cores(runner.cpu_budget):
+        validation = asyncio.create_task(validate_ruleset(uuid.UUID(institution["scenarioId"]), ValidationOptions()))
+        await asyncio.sleep(0.3)
+        assert not validation.done()
+        assert connections() == 0
+    assert (await validation)["valid"] is True
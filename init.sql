@@ -3,7 +3,8 @@
 -- Create extensions
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
--- Performance-critical indexes will be created by SQLAlchemy migrations
+-- Tables and performance-critical indexes are created by the Alembic
+-- migrations in backend/alembic (run `alembic upgrade head`)
 -- This file contains any additional database setup
 
 -- Create a sample admin user (in production, this should be done securely)